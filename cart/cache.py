@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.cache import cache
+from .models import CartItem
+from .services import get_cart_totals
+
+CART_SUMMARY_KEY = 'cart_summary:{}'
+
+
+def _summary_key(cart_id):
+    return CART_SUMMARY_KEY.format(cart_id)
+
+
+def get_cart_summary(cart_id):
+    """
+    Return the total, quantity and line count for a cart,
+    answering from the cache when the cart hasn't changed
+    """
+    key = _summary_key(cart_id)
+    summary = cache.get(key)
+    if summary is None:
+        summary = get_cart_totals(cart_id)
+        cache.set(key, summary, settings.CART_SUMMARY_CACHE_TIMEOUT)
+    return summary
+
+
+def invalidate_cart_summary(cart_id):
+    """ Drop the cached summary after the cart has been modified """
+    if cart_id:
+        cache.delete(_summary_key(cart_id))
+
+
+def invalidate_product_cart_summaries(product_id):
+    """ Drop the cached summary of every cart holding the product """
+    cart_ids = CartItem.objects.filter(
+        product_id=product_id
+    ).values_list('cart__cart_id', flat=True).distinct()
+    cache.delete_many(
+        [_summary_key(cart_id) for cart_id in cart_ids if cart_id]
+    )
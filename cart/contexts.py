@@ -1,12 +1,34 @@
-from .models import Cart, CartItem
+from .cache import get_cart_summary
+from .services import get_cart_items
 
 
-def _cart_id(request):
-    """ Helper function to get or create cart_id """
-    cart = request.session.session_key
-    if not cart:
-        cart = request.session.create()
-    return cart
+class LazyCartItems:
+    """
+    Stand-in for the cart items queryset that only hits the
+    database when a template actually iterates over the items.
+    Length and truthiness are answered from the cached summary.
+    """
+
+    def __init__(self, cart_id, summary):
+        self.cart_id = cart_id
+        self.summary = summary
+        self._items = None
+
+    def _load(self):
+        if self._items is None:
+            self._items = get_cart_items(self.cart_id)
+        return self._items
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        if self._items is not None:
+            return len(self._items)
+        return self.summary['count']
+
+    def __bool__(self):
+        return len(self) > 0
 
 
 def cart_contents(request):
@@ -14,25 +36,21 @@ def cart_contents(request):
     Context processor to make cart contents available
     across all templates
     """
-    try:
-        cart = Cart.objects.get(cart_id=_cart_id(request))
-        cart_items = CartItem.objects.filter(cart=cart, is_active=True)
-        total = 0
-        quantity = 0
-        for cart_item in cart_items:
-            total += (
-                cart_item.product.price * cart_item.quantity
-            )
-            quantity += cart_item.quantity
-    except Cart.DoesNotExist:
-        cart_items = []
-        total = 0
-        quantity = 0
+    # A request without a session can't own a cart yet
+    cart_id = request.session.session_key
+    if not cart_id:
+        return {
+            'cart_items': [],
+            'total': 0,
+            'quantity': 0,
+        }
+
+    summary = get_cart_summary(cart_id)
 
     context = {
-        'cart_items': cart_items,
-        'total': total,
-        'quantity': quantity,
+        'cart_items': LazyCartItems(cart_id, summary),
+        'total': summary['total'],
+        'quantity': summary['quantity'],
     }
 
     return context
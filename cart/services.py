@@ -0,0 +1,67 @@
+from decimal import Decimal
+from django.db.models import Count, DecimalField, F, Sum
+from products.models import Product
+from .models import CartItem
+
+
+def _active_items(cart_id):
+    return CartItem.objects.filter(cart__cart_id=cart_id, is_active=True)
+
+
+def get_cart_items(cart_id):
+    """
+    Load the active items of a cart together with their
+    products in a single query
+    """
+    if not cart_id:
+        return []
+    return list(
+        _active_items(cart_id)
+        .select_related('product')
+        .order_by('id')
+    )
+
+
+def get_cart_totals(cart_id):
+    """
+    Aggregate the total, quantity and line count of a cart
+    in the database
+    """
+    if not cart_id:
+        return {'total': Decimal('0'), 'quantity': 0, 'count': 0}
+    totals = _active_items(cart_id).aggregate(
+        total=Sum(
+            F('product__price') * F('quantity'),
+            output_field=DecimalField(max_digits=12, decimal_places=2)
+        ),
+        quantity=Sum('quantity'),
+        count=Count('id'),
+    )
+    return {
+        'total': totals['total'] or Decimal('0'),
+        'quantity': totals['quantity'] or 0,
+        'count': totals['count'],
+    }
+
+
+def get_session_cart_items(session_cart):
+    """
+    Resolve a session cart into item dicts, fetching every
+    product with one batched query
+    """
+    products = Product.objects.in_bulk(
+        [int(product_id) for product_id in session_cart]
+    )
+    cart_items = []
+    for product_id, item_data in session_cart.items():
+        product = products.get(int(product_id))
+        if product is None:
+            continue
+        price = Decimal(item_data['price'])
+        cart_items.append({
+            'product': product,
+            'quantity': item_data['quantity'],
+            'price': price,
+            'sub_total': price * item_data['quantity'],
+        })
+    return cart_items
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+from products.models import Product
+from .cache import invalidate_product_cart_summaries
+
+
+@receiver(post_save, sender=Product)
+def refresh_cart_summaries(sender, instance, **kwargs):
+    """Cart totals follow the product's current price"""
+    invalidate_product_cart_summaries(instance.id)
+
+
+@receiver(pre_delete, sender=Product)
+def drop_cart_summaries(sender, instance, **kwargs):
+    """Deleting a product removes it from every cart"""
+    invalidate_product_cart_summaries(instance.id)
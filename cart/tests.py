@@ -1,7 +1,14 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.urls import reverse
+from django.contrib.sessions.backends.db import SessionStore
+from decimal import Decimal
 from products.models import Product
 from .models import Cart, CartItem
+from .contexts import cart_contents
+from .cache import invalidate_cart_summary
+from .services import get_cart_items, get_cart_totals, get_session_cart_items
 
 
 class CartTests(TestCase):
@@ -103,3 +110,151 @@ class CartTests(TestCase):
         response = self.client.get(reverse('cart:view_cart'))
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.context['total'], 0)
+
+
+class CartContextTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            name='Test Product',
+            description='Test Description',
+            price=10.00,
+            stock=10
+        )
+        self.client = Client()
+        self.session = self.client.session
+        self.cart = Cart.objects.create(cart_id=self.session.session_key)
+        CartItem.objects.create(
+            product=self.product,
+            quantity=3,
+            cart=self.cart
+        )
+        self.factory = RequestFactory()
+
+    def _request(self):
+        request = self.factory.get('/')
+        request.session = self.session
+        return request
+
+    def test_summary_served_from_cache(self):
+        """Test that a warm cart summary costs no queries"""
+        context = cart_contents(self._request())
+        self.assertEqual(context['total'], Decimal('30.00'))
+        self.assertEqual(context['quantity'], 3)
+
+        with self.assertNumQueries(0):
+            context = cart_contents(self._request())
+            self.assertEqual(len(context['cart_items']), 1)
+            self.assertTrue(context['cart_items'])
+
+    def test_cart_items_loaded_lazily(self):
+        """Test that cart items are only queried when iterated"""
+        context = cart_contents(self._request())
+        with self.assertNumQueries(1):
+            items = list(context['cart_items'])
+            self.assertEqual(items[0].product, self.product)
+
+    def test_summary_invalidated_on_add(self):
+        """Test that adding to the cart refreshes the summary"""
+        cart_contents(self._request())
+        self.client.post(
+            reverse('cart:cart_add', args=[self.product.id]),
+            {'quantity': 2, 'override': False}
+        )
+        context = cart_contents(self._request())
+        self.assertEqual(context['quantity'], 5)
+        self.assertEqual(context['total'], Decimal('50.00'))
+
+    def test_summary_follows_product_changes(self):
+        """Test that editing or deleting a product refreshes the summary"""
+        cart_contents(self._request())
+        self.product.price = Decimal('12.00')
+        self.product.save()
+        context = cart_contents(self._request())
+        self.assertEqual(context['total'], Decimal('36.00'))
+
+        self.product.delete()
+        context = cart_contents(self._request())
+        self.assertEqual(context['quantity'], 0)
+        self.assertFalse(context['cart_items'])
+
+    def test_no_session_returns_empty_cart(self):
+        """Test that requests without a session skip the database"""
+        request = self.factory.get('/')
+        request.session = SessionStore()
+        with self.assertNumQueries(0):
+            context = cart_contents(request)
+        self.assertEqual(context['quantity'], 0)
+
+
+class CartServiceTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.session = self.client.session
+        self.cart = Cart.objects.create(cart_id=self.session.session_key)
+
+    def _add_products(self, count):
+        start = CartItem.objects.count()
+        for i in range(start, start + count):
+            product = Product.objects.create(
+                name=f'Product {i}',
+                description='Test Description',
+                price=5.00,
+                stock=10
+            )
+            CartItem.objects.create(
+                product=product,
+                quantity=2,
+                cart=self.cart
+            )
+
+    def _view_cart_queries(self):
+        invalidate_cart_summary(self.cart.cart_id)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('cart:view_cart'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_view_cart_queries_independent_of_size(self):
+        """Test that the cart page costs the same queries for any size"""
+        self._add_products(1)
+        small = self._view_cart_queries()
+        self._add_products(10)
+        self.assertEqual(self._view_cart_queries(), small)
+
+    def test_cart_items_single_query(self):
+        """Test that items and their products load in one query"""
+        self._add_products(5)
+        with self.assertNumQueries(1):
+            items = get_cart_items(self.cart.cart_id)
+            prices = [item.product.price for item in items]
+        self.assertEqual(len(prices), 5)
+
+    def test_cart_totals_aggregated(self):
+        """Test that cart totals are aggregated in the database"""
+        self._add_products(3)
+        with self.assertNumQueries(1):
+            totals = get_cart_totals(self.cart.cart_id)
+        self.assertEqual(totals['total'], Decimal('30.00'))
+        self.assertEqual(totals['quantity'], 6)
+        self.assertEqual(totals['count'], 3)
+
+    def test_session_cart_items_batched(self):
+        """Test that session cart products are fetched in one query"""
+        products = [
+            Product.objects.create(
+                name=f'Session Product {i}',
+                description='Test Description',
+                price=4.00,
+                stock=10
+            )
+            for i in range(3)
+        ]
+        session_cart = {
+            str(product.id): {'quantity': 1, 'price': '4.00'}
+            for product in products
+        }
+        session_cart['999999'] = {'quantity': 1, 'price': '1.00'}
+        with self.assertNumQueries(1):
+            items = get_session_cart_items(session_cart)
+        self.assertEqual(len(items), 3)
+        self.assertEqual(items[0]['sub_total'], Decimal('4.00'))
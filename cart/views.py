@@ -3,6 +3,8 @@ from django.views.decorators.http import require_POST
 from products.models import Product
 from .models import Cart, CartItem
 from .forms import CartAddProductForm
+from .cache import invalidate_cart_summary
+from .services import get_cart_items, get_cart_totals
 from django.contrib import messages
 
 
@@ -41,6 +43,7 @@ def add_cart(request, product_id):
                 cart=cart
             )
             cart_item.save()
+        invalidate_cart_summary(cart.cart_id)
 
         messages.success(
             request,
@@ -60,6 +63,7 @@ def remove_cart(request, product_id):
         cart_item.save()
     else:
         cart_item.delete()
+    invalidate_cart_summary(cart.cart_id)
     messages.success(
         request,
         f'{product.name} quantity updated!'
@@ -73,6 +77,7 @@ def remove_cart_item(request, product_id):
     product = get_object_or_404(Product, id=product_id)
     cart_item = CartItem.objects.get(product=product, cart=cart)
     cart_item.delete()
+    invalidate_cart_summary(cart.cart_id)
     messages.success(
         request,
         f'{product.name} removed from your cart!'
@@ -82,29 +87,14 @@ def remove_cart_item(request, product_id):
 
 def view_cart(request):
     """Display the contents of the cart."""
-    try:
-        cart = Cart.objects.get(cart_id=_cart_id(request))
-        cart_items = CartItem.objects.filter(cart=cart, is_active=True)
-        total = 0
-        quantity = 0
-
-        for cart_item in cart_items:
-            total += (
-                cart_item.product.price *
-                cart_item.quantity
-            )
-            quantity += cart_item.quantity
-
-        context = {
-            'total': total,
-            'quantity': quantity,
-            'cart_items': cart_items,
-        }
-    except Cart.DoesNotExist:
-        context = {
-            'total': 0,
-            'quantity': 0,
-            'cart_items': None,
-        }
+    cart_id = _cart_id(request)
+    cart_items = get_cart_items(cart_id)
+    totals = get_cart_totals(cart_id)
+
+    context = {
+        'total': totals['total'],
+        'quantity': totals['quantity'],
+        'cart_items': cart_items,
+    }
 
     return render(request, 'cart/cart.html', context)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, OrderItem, Payment
+from .models import Order, OrderItem, Payment, WebhookEvent
 
 
 class OrderItemInline(admin.TabularInline):
@@ -16,14 +16,16 @@ class PaymentInline(admin.TabularInline):
 
 class OrderAdmin(admin.ModelAdmin):
     list_display = (
-        'id', 'user', 'first_name', 'last_name', 'email', 'paid', 'created'
+        'id', 'user', 'first_name', 'last_name', 'email', 'total', 'paid',
+        'created'
     )
     list_filter = ('paid', 'created')
     search_fields = ('first_name', 'last_name', 'email')
     inlines = [OrderItemInline, PaymentInline]
     readonly_fields = (
         'user', 'first_name', 'last_name', 'email', 'address',
-        'postal_code', 'city', 'country', 'created', 'updated', 'paid'
+        'postal_code', 'city', 'country', 'created', 'updated', 'paid',
+        'total', 'item_count'
     )
     ordering = ('-created',)
 
@@ -42,5 +44,20 @@ class PaymentAdmin(admin.ModelAdmin):
     ordering = ('-created_at',)
 
 
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = (
+        'stripe_id', 'type', 'status', 'attempts', 'next_attempt_at',
+        'received_at'
+    )
+    list_filter = ('status', 'type')
+    search_fields = ('stripe_id',)
+    readonly_fields = (
+        'stripe_id', 'type', 'payload', 'attempts', 'last_error',
+        'received_at', 'processed_at'
+    )
+    ordering = ('-received_at',)
+
+
 admin.site.register(Order, OrderAdmin)
 admin.site.register(Payment, PaymentAdmin)
+admin.site.register(WebhookEvent, WebhookEventAdmin)
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.mail import send_mail
+from django.template.loader import render_to_string
+from django.utils.html import strip_tags
+import stripe
+from jobs.queue import job
+from .models import Order, Payment
+from .webhooks import process_webhook_events
+
+
+@job()
+def verify_order_payment(order_id):
+    """Confirm the order's PaymentIntent succeeded and record the payment"""
+    order = Order.objects.get(id=order_id)
+    intent = stripe.PaymentIntent.retrieve(order.stripe_id)
+    if intent.status != 'succeeded':
+        return
+
+    order.paid = True
+    order.save()
+    # Retried runs must not record the payment twice
+    Payment.objects.get_or_create(
+        order=order,
+        payment_id=intent.id,
+        defaults={
+            'payment_method': (
+                intent.payment_method_types[0]
+                if intent.payment_method_types
+                else 'card'
+            ),
+            'amount_paid': order.get_total_cost(),
+            'status': 'completed',
+        }
+    )
+
+
+@job()
+def send_order_confirmation(order_id):
+    order = Order.objects.get(id=order_id)
+    subject = f'Order Confirmation - #{order.order_number}'
+    html_message = render_to_string(
+        'checkout/email/order_confirmation.html',
+        {
+            'order': order,
+            'site': Site.objects.get_current()
+        }
+    )
+    plain_message = strip_tags(html_message)
+    send_mail(
+        subject,
+        plain_message,
+        settings.DEFAULT_FROM_EMAIL,
+        [order.email],
+        html_message=html_message
+    )
+
+
+@job()
+def process_stripe_webhooks():
+    """Process every due webhook event in the inbox"""
+    while process_webhook_events():
+        pass
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, DecimalField, F, Sum
+from checkout.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Backfills the stored total and item count on every order'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of orders to update per query'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        orders = Order.objects.annotate(
+            computed_total=Sum(
+                F('items__price') * F('items__quantity'),
+                output_field=DecimalField(max_digits=10, decimal_places=2)
+            ),
+            computed_item_count=Count('items'),
+        ).only('id', 'total', 'item_count').order_by('id')
+
+        pending = []
+        updated_count = 0
+        for order in orders.iterator(chunk_size=batch_size):
+            total = order.computed_total or 0
+            if (
+                order.total != total or
+                order.item_count != order.computed_item_count
+            ):
+                order.total = total
+                order.item_count = order.computed_item_count
+                pending.append(order)
+            if len(pending) >= batch_size:
+                Order.objects.bulk_update(pending, ['total', 'item_count'])
+                updated_count += len(pending)
+                pending = []
+
+        if pending:
+            Order.objects.bulk_update(pending, ['total', 'item_count'])
+            updated_count += len(pending)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully backfilled totals for {updated_count} orders'
+            )
+        )
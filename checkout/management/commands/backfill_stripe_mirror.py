@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+import stripe
+from checkout.stripe_sync import BACKFILL_PAGE_SIZE, backfill
+
+
+class Command(BaseCommand):
+    help = (
+        'Copies Stripe customers, payment methods, subscriptions and '
+        'invoices into the local mirror tables'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=BACKFILL_PAGE_SIZE,
+            help='Number of objects to request from Stripe per page'
+        )
+
+    def handle(self, *args, **options):
+        stripe.api_key = settings.STRIPE_SECRET_KEY
+        counts = backfill(page_size=options['page_size'])
+        summary = ', '.join(
+            f'{count} {object_type}s' for object_type, count in counts.items()
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully mirrored {summary}')
+        )
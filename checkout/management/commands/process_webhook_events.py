@@ -0,0 +1,44 @@
+import time
+from django.core.management.base import BaseCommand
+from checkout.webhooks import process_webhook_events
+
+
+class Command(BaseCommand):
+    help = (
+        'Processes stored Stripe webhook events in batches, outside the '
+        'background jobs the worker runs for each event'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Number of webhook events to process per transaction'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=None,
+            help=(
+                'Keep running, checking for new events this many seconds '
+                'after the inbox is drained'
+            )
+        )
+
+    def handle(self, *args, **options):
+        processed_count = 0
+        while True:
+            processed = process_webhook_events(options['batch_size'])
+            processed_count += processed
+            if processed:
+                continue
+            if options['poll_interval'] is None:
+                break
+            time.sleep(options['poll_interval'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully processed {processed_count} webhook events'
+            )
+        )
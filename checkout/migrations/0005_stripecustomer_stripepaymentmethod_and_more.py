@@ -0,0 +1,86 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checkout', '0004_order_total_order_item_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeCustomer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stripe_id', models.CharField(max_length=100, unique=True)),
+                ('data', models.JSONField(default=dict)),
+                ('stripe_updated', models.DateTimeField(blank=True, null=True)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('default_payment_method', models.CharField(blank=True, max_length=100)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='StripePaymentMethod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stripe_id', models.CharField(max_length=100, unique=True)),
+                ('data', models.JSONField(default=dict)),
+                ('stripe_updated', models.DateTimeField(blank=True, null=True)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+                ('customer_id', models.CharField(blank=True, db_index=True, max_length=100)),
+                ('type', models.CharField(max_length=30)),
+                ('brand', models.CharField(blank=True, max_length=30)),
+                ('last4', models.CharField(blank=True, max_length=4)),
+                ('exp_month', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('exp_year', models.PositiveSmallIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='StripeSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stripe_id', models.CharField(max_length=100, unique=True)),
+                ('data', models.JSONField(default=dict)),
+                ('stripe_updated', models.DateTimeField(blank=True, null=True)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+                ('customer_id', models.CharField(db_index=True, max_length=100)),
+                ('status', models.CharField(max_length=30)),
+                ('current_period_end', models.DateTimeField(blank=True, null=True)),
+                ('cancel_at_period_end', models.BooleanField(default=False)),
+                ('default_payment_method', models.CharField(blank=True, max_length=100)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='StripeInvoice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stripe_id', models.CharField(max_length=100, unique=True)),
+                ('data', models.JSONField(default=dict)),
+                ('stripe_updated', models.DateTimeField(blank=True, null=True)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+                ('customer_id', models.CharField(max_length=100)),
+                ('subscription_id', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(blank=True, max_length=30)),
+                ('amount_due', models.PositiveIntegerField(default=0)),
+                ('currency', models.CharField(blank=True, max_length=3)),
+                ('invoice_pdf', models.URLField(blank=True, max_length=500)),
+                ('created', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-created'],
+                'indexes': [models.Index(fields=['customer_id', '-created'], name='checkout_st_custome_0ab30b_idx')],
+            },
+        ),
+    ]
@@ -1,5 +1,10 @@
 from django.db import models
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.conf import settings
+from django.utils import timezone
+from decimal import Decimal
 import uuid
 import time
 
@@ -50,6 +55,14 @@ class Order(models.Model):
     )
     payment_method = models.CharField(max_length=50, default='card')
 
+    # Denormalized totals, kept in sync with the order's items
+    total = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0
+    )
+    item_count = models.PositiveIntegerField(default=0)
+
     class Meta:
         ordering = ['-created']
         indexes = [
@@ -60,7 +73,20 @@ class Order(models.Model):
         return f'Order {self.order_number}'
 
     def get_total_cost(self):
-        return sum(item.get_cost() for item in self.items.all())
+        return self.total
+
+    def update_totals(self):
+        """Recalculate the stored total and item count from the items"""
+        totals = self.items.aggregate(
+            total=Sum(
+                F('price') * F('quantity'),
+                output_field=DecimalField(max_digits=10, decimal_places=2)
+            ),
+            item_count=Count('id'),
+        )
+        self.total = totals['total'] or 0
+        self.item_count = totals['item_count']
+        self.save(update_fields=['total', 'item_count'])
 
     def get_total_cost_with_shipping(self):
         return self.get_total_cost() + self.shipping_cost
@@ -129,3 +155,118 @@ class Payment(models.Model):
 
     def __str__(self):
         return f'Payment {self.payment_id} for Order {self.order.order_number}'
+
+
+class StripeMirror(models.Model):
+    """
+    Local copy of a Stripe object, kept up to date by webhooks so that
+    pages can read billing data without calling Stripe
+    """
+    stripe_id = models.CharField(max_length=100, unique=True)
+    data = models.JSONField(default=dict)
+    # Creation time of the event or fetch the copy was taken from
+    stripe_updated = models.DateTimeField(null=True, blank=True)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.stripe_id
+
+
+class StripeCustomer(StripeMirror):
+    email = models.EmailField(blank=True)
+    default_payment_method = models.CharField(max_length=100, blank=True)
+
+
+class StripeSubscription(StripeMirror):
+    customer_id = models.CharField(max_length=100, db_index=True)
+    status = models.CharField(max_length=30)
+    current_period_end = models.DateTimeField(null=True, blank=True)
+    cancel_at_period_end = models.BooleanField(default=False)
+    default_payment_method = models.CharField(max_length=100, blank=True)
+
+
+class StripeInvoice(StripeMirror):
+    customer_id = models.CharField(max_length=100)
+    subscription_id = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=30, blank=True)
+    # Amounts are in the currency's smallest unit, as Stripe sends them
+    amount_due = models.PositiveIntegerField(default=0)
+    currency = models.CharField(max_length=3, blank=True)
+    invoice_pdf = models.URLField(max_length=500, blank=True)
+    created = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [
+            models.Index(fields=['customer_id', '-created']),
+        ]
+
+    @property
+    def amount_due_decimal(self):
+        return Decimal(self.amount_due) / 100
+
+
+class StripePaymentMethod(StripeMirror):
+    # Blank once the payment method has been detached
+    customer_id = models.CharField(max_length=100, blank=True, db_index=True)
+    type = models.CharField(max_length=30)
+    brand = models.CharField(max_length=30, blank=True)
+    last4 = models.CharField(max_length=4, blank=True)
+    exp_month = models.PositiveSmallIntegerField(null=True, blank=True)
+    exp_year = models.PositiveSmallIntegerField(null=True, blank=True)
+
+
+class WebhookEvent(models.Model):
+    """
+    A verified Stripe webhook event, stored as soon as it arrives and
+    processed later by the process_webhook_events command
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+    ]
+
+    stripe_id = models.CharField(max_length=100, unique=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending'
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.type} ({self.stripe_id})'
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def update_order_totals(sender, instance, **kwargs):
+    """
+    Keep the order totals in sync when items are written one at a time.
+    Bulk writes must set the totals on the order themselves.
+    """
+    origin = kwargs.get('origin')
+    if isinstance(origin, Order) or getattr(origin, 'model', None) is Order:
+        # The order itself is being deleted
+        return
+    try:
+        order = instance.order
+    except Order.DoesNotExist:
+        return
+    order.update_totals()
@@ -0,0 +1,210 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+from django.db import transaction
+from django.utils import timezone
+import stripe
+from .models import (
+    StripeCustomer, StripeInvoice, StripePaymentMethod, StripeSubscription
+)
+
+BACKFILL_PAGE_SIZE = 100
+
+
+def _timestamp(value):
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+
+
+def _id(value):
+    """Stripe sends related objects either as IDs or expanded"""
+    if isinstance(value, dict):
+        return value.get('id', '')
+    return value or ''
+
+
+def _to_dict(stripe_object):
+    to_dict = getattr(stripe_object, 'to_dict_recursive', None)
+    return to_dict() if to_dict else dict(stripe_object)
+
+
+def _customer_fields(data):
+    invoice_settings = data.get('invoice_settings') or {}
+    return {
+        'email': data.get('email') or '',
+        'default_payment_method': _id(
+            invoice_settings.get('default_payment_method')
+        ),
+    }
+
+
+def _subscription_fields(data):
+    return {
+        'customer_id': _id(data['customer']),
+        'status': data['status'],
+        'current_period_end': _timestamp(data.get('current_period_end')),
+        'cancel_at_period_end': bool(data.get('cancel_at_period_end')),
+        'default_payment_method': _id(data.get('default_payment_method')),
+    }
+
+
+def _invoice_fields(data):
+    return {
+        'customer_id': _id(data['customer']),
+        'subscription_id': _id(data.get('subscription')),
+        'status': data.get('status') or '',
+        'amount_due': data.get('amount_due') or 0,
+        'currency': data.get('currency') or '',
+        'invoice_pdf': data.get('invoice_pdf') or '',
+        'created': _timestamp(data['created']),
+    }
+
+
+def _payment_method_fields(data):
+    card = data.get('card') or {}
+    return {
+        'customer_id': _id(data.get('customer')),
+        'type': data['type'],
+        'brand': card.get('brand') or '',
+        'last4': card.get('last4') or '',
+        'exp_month': card.get('exp_month'),
+        'exp_year': card.get('exp_year'),
+    }
+
+
+# Mirrored Stripe object types, by the 'object' field Stripe sends
+MIRRORS = {
+    'customer': (StripeCustomer, _customer_fields),
+    'subscription': (StripeSubscription, _subscription_fields),
+    'invoice': (StripeInvoice, _invoice_fields),
+    'payment_method': (StripePaymentMethod, _payment_method_fields),
+}
+
+
+def sync_object(stripe_object, updated):
+    """
+    Store a Stripe object in its mirror table, unless the table already
+    holds a copy taken after `updated`, so events delivered out of order
+    never overwrite newer data.
+    Returns the mirror row, or None for object types that aren't
+    mirrored.
+    """
+    data = _to_dict(stripe_object)
+    if data.get('object') not in MIRRORS:
+        return None
+    model, fields = MIRRORS[data['object']]
+    defaults = dict(fields(data), data=data, stripe_updated=updated)
+
+    with transaction.atomic():
+        instance, created = model.objects.select_for_update().get_or_create(
+            stripe_id=data['id'],
+            defaults=defaults
+        )
+        if not created and (
+            instance.stripe_updated is None or
+            instance.stripe_updated <= updated
+        ):
+            for name, value in defaults.items():
+                setattr(instance, name, value)
+            instance.save()
+    return instance
+
+
+def apply_event(event):
+    """Bring the mirror tables up to date with a webhook event"""
+    data = event['data']['object']
+    if data.get('object') not in MIRRORS:
+        return None
+    if event['type'] in ('customer.deleted', 'invoice.deleted'):
+        model, _ = MIRRORS[data['object']]
+        model.objects.filter(stripe_id=data['id']).delete()
+        return None
+    return sync_object(data, _timestamp(event['created']))
+
+
+def _list_all(resource, page_size, **params):
+    """Yield every object of a Stripe list endpoint, a page at a time"""
+    starting_after = None
+    while True:
+        if starting_after:
+            params['starting_after'] = starting_after
+        page = resource.list(limit=page_size, **params)
+        yield from page.data
+        if not page.has_more or not page.data:
+            return
+        starting_after = page.data[-1]['id']
+
+
+def backfill(client=None, page_size=BACKFILL_PAGE_SIZE):
+    """
+    Copy every customer, card payment method, subscription and invoice
+    from Stripe into the mirror tables.
+    Returns the number of objects stored per type.
+    """
+    client = client or stripe
+    fetched_at = timezone.now()
+    counts = dict.fromkeys(MIRRORS, 0)
+
+    for customer in _list_all(client.Customer, page_size):
+        sync_object(customer, fetched_at)
+        counts['customer'] += 1
+        # Payment methods can only be listed per customer
+        for payment_method in _list_all(
+            client.PaymentMethod, page_size,
+            customer=customer['id'], type='card'
+        ):
+            sync_object(payment_method, fetched_at)
+            counts['payment_method'] += 1
+    for subscription in _list_all(
+        client.Subscription, page_size, status='all'
+    ):
+        sync_object(subscription, fetched_at)
+        counts['subscription'] += 1
+    for invoice in _list_all(client.Invoice, page_size):
+        sync_object(invoice, fetched_at)
+        counts['invoice'] += 1
+    return counts
+
+
+def mirror_subscription(user_subscription, client=None):
+    """
+    Return the mirrored Stripe subscription behind a UserSubscription.
+    A subscription the webhooks haven't delivered yet is fetched once,
+    together with its customer's payment methods and invoices, with the
+    independent calls made concurrently.
+    """
+    mirrored = StripeSubscription.objects.filter(
+        stripe_id=user_subscription.stripe_subscription_id
+    ).first()
+    if mirrored is not None:
+        return mirrored
+
+    client = client or stripe
+    customer_id = user_subscription.stripe_customer_id
+    fetched_at = timezone.now()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [
+            executor.submit(
+                client.Subscription.retrieve,
+                user_subscription.stripe_subscription_id
+            ),
+            executor.submit(client.Customer.retrieve, customer_id),
+            executor.submit(
+                lambda: list(_list_all(
+                    client.PaymentMethod, BACKFILL_PAGE_SIZE,
+                    customer=customer_id, type='card'
+                ))
+            ),
+            executor.submit(
+                lambda: list(_list_all(
+                    client.Invoice, BACKFILL_PAGE_SIZE, customer=customer_id
+                ))
+            ),
+        ]
+    # Any StripeError is raised here, before anything is stored
+    subscription, customer, payment_methods, invoices = [
+        future.result() for future in futures
+    ]
+    for stripe_object in [customer, *payment_methods, *invoices]:
+        sync_object(stripe_object, fetched_at)
+    return sync_object(subscription, fetched_at)
@@ -1,14 +1,33 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.urls import reverse
+from django.core import mail
 from django.contrib.auth.models import User
-from products.models import Product, Category
+from django.utils import timezone
+from products.models import (
+    Product, Category, SubscriptionPlan, UserSubscription
+)
 from django.contrib.sessions.middleware import SessionMiddleware
 from django.http import HttpRequest
 from cart.models import Cart, CartItem
-from .models import Order, OrderItem, Payment
+from jobs.models import Job
+from jobs.queue import run_pending_jobs
+from .models import (
+    Order, OrderItem, Payment, StripeCustomer, StripeInvoice,
+    StripePaymentMethod, StripeSubscription, WebhookEvent
+)
+from .stripe_sync import backfill
+from .webhooks import process_webhook_events
+from datetime import timedelta
+from threading import Barrier
+from types import SimpleNamespace
 from decimal import Decimal
 from unittest.mock import patch
 import json
+import os
+from io import StringIO
+from django.core.management import call_command
 import stripe
 
 
@@ -378,7 +397,10 @@ class CheckoutTests(TestCase):
         # Should redirect to order history
         self.assertEqual(response.status_code, 302)
 
-        # Check that order is marked as paid
+        # Check that the worker marks the order as paid
+        order.refresh_from_db()
+        self.assertFalse(order.paid)
+        run_pending_jobs()
         order.refresh_from_db()
         self.assertTrue(order.paid)
 
@@ -391,6 +413,10 @@ class CheckoutTests(TestCase):
             Cart.objects.filter(cart_id=session.session_key).exists()
         )
 
+        # Check that the confirmation email was sent
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('TEST456', mail.outbox[0].subject)
+
     def test_payment_cancel_flow(self):
         """Test the payment cancellation flow"""
         self.client.login(username='testuser', password='testpass123')
@@ -426,6 +452,7 @@ class CheckoutTests(TestCase):
 
         # Mock the Stripe webhook event
         mock_construct_event.return_value = {
+            'id': 'evt_checkout',
             'type': 'checkout.session.completed',
             'data': {
                 'object': {
@@ -460,6 +487,7 @@ class CheckoutTests(TestCase):
         )
 
         self.assertEqual(response.status_code, 200)
+        process_webhook_events()
 
         # Check that payment status was updated
         payment.refresh_from_db()
@@ -489,3 +517,389 @@ class CheckoutTests(TestCase):
         # Should redirect to payment page
         self.assertEqual(response.status_code, 302)
         self.assertFalse(Order.objects.filter(email='invalid-email').exists())
+
+
+class CheckoutQueryCountTests(TestCase):
+    """Benchmark query counts for placing an order against cart size"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='bulkbuyer',
+            email='bulk@example.com',
+            password='testpass123'
+        )
+        self.client = Client()
+        self.client.login(username='bulkbuyer', password='testpass123')
+        self.order_data = {
+            'first_name': 'Bulk',
+            'last_name': 'Buyer',
+            'email': 'bulk@example.com',
+            'address': '1 Warehouse Rd',
+            'postal_code': '12345',
+            'city': 'Test City',
+            'country': 'US'
+        }
+
+    def _fill_cart(self, size):
+        Cart.objects.all().delete()
+        cart = Cart.objects.create(cart_id=self.client.session.session_key)
+        start = Product.objects.count()
+        for i in range(start, start + size):
+            product = Product.objects.create(
+                name=f'Bulk Product {i}',
+                description='Bulk Description',
+                price=Decimal('2.50'),
+                stock=100
+            )
+            CartItem.objects.create(product=product, cart=cart, quantity=2)
+
+    @patch('checkout.views.stripe.PaymentIntent.create')
+    def _place_order(self, size, mock_payment_intent):
+        mock_payment_intent.return_value = type('PaymentIntent', (), {
+            'id': 'pi_bulk',
+            'client_secret': 'secret_bulk',
+        })()
+        self._fill_cart(size)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('checkout:checkout'), self.order_data
+            )
+        self.assertEqual(response.status_code, 200)
+        amount = mock_payment_intent.call_args.kwargs['amount']
+        self.assertEqual(amount, size * 500)
+        return len(queries)
+
+    def test_query_count_constant_in_cart_size(self):
+        """Test that placing an order costs the same for any cart size"""
+        query_counts = {
+            size: self._place_order(size) for size in (1, 10, 50)
+        }
+        self.assertEqual(len(set(query_counts.values())), 1, query_counts)
+
+        order = Order.objects.latest('id')
+        self.assertEqual(order.items.count(), 50)
+        self.assertEqual(order.stripe_id, 'pi_bulk')
+
+
+STRIPE_EVENTS_PATH = os.path.join(
+    os.path.dirname(__file__), 'test_data', 'stripe_events.json'
+)
+
+
+class FakeStripeResource:
+    """A Stripe API resource serving objects from memory"""
+
+    def __init__(self, client, name, objects):
+        self.client = client
+        self.name = name
+        self.objects = objects
+
+    def retrieve(self, object_id):
+        self.client.record(f'{self.name}.retrieve')
+        return next(obj for obj in self.objects if obj['id'] == object_id)
+
+    def list(self, limit, starting_after=None, **filters):
+        self.client.record(f'{self.name}.list')
+        matches = [
+            obj for obj in self.objects
+            if all(
+                obj.get(key) == value for key, value in filters.items()
+                if key in ('customer',)
+            )
+        ]
+        if starting_after:
+            ids = [obj['id'] for obj in matches]
+            matches = matches[ids.index(starting_after) + 1:]
+        return SimpleNamespace(
+            data=matches[:limit], has_more=len(matches) > limit
+        )
+
+
+class FakeStripe:
+    """
+    Local stand-in for the stripe module that records each API call.
+    With a barrier, every call waits for the others, so the calls only
+    complete if they are made concurrently.
+    """
+
+    def __init__(self, events, barrier=None):
+        self.calls = []
+        self.barrier = barrier
+        objects = {}
+        for event in events.values():
+            data = event['data']['object']
+            # Keep the first copy seen of each object
+            if not data.get('deleted'):
+                objects.setdefault(data['object'], {}).setdefault(
+                    data['id'], data
+                )
+        for attribute, object_type in [
+            ('Customer', 'customer'),
+            ('Subscription', 'subscription'),
+            ('Invoice', 'invoice'),
+            ('PaymentMethod', 'payment_method'),
+        ]:
+            setattr(self, attribute, FakeStripeResource(
+                self, attribute,
+                list(objects.get(object_type, {}).values())
+            ))
+
+    def record(self, call):
+        self.calls.append(call)
+        if self.barrier:
+            self.barrier.wait()
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET='whsec_test')
+class StripeMirrorTests(TestCase):
+    def setUp(self):
+        with open(STRIPE_EVENTS_PATH) as events_file:
+            self.events = json.load(events_file)
+        self.user = User.objects.create_user(
+            username='member',
+            password='testpass123'
+        )
+        plan = SubscriptionPlan.objects.create(
+            name='Premium',
+            description='Premium plan',
+            price=Decimal('19.99'),
+            plan_type='monthly',
+            features='Everything'
+        )
+        self.subscription = UserSubscription.objects.create(
+            user=self.user,
+            plan=plan,
+            stripe_subscription_id='sub_test',
+            stripe_customer_id='cus_test',
+            end_date=timezone.now() + timedelta(days=30)
+        )
+
+    def _replay(self, *names):
+        for name in names:
+            with patch(
+                'checkout.views.stripe.Webhook.construct_event',
+                return_value=self.events[name]
+            ):
+                response = self.client.post(
+                    reverse('checkout:stripe_webhook'),
+                    data=json.dumps(self.events[name]),
+                    content_type='application/json',
+                    HTTP_STRIPE_SIGNATURE='test_signature'
+                )
+            self.assertEqual(response.status_code, 200)
+        process_webhook_events()
+
+    def test_webhooks_populate_mirror(self):
+        """Test that recorded webhook events fill the mirror tables"""
+        self._replay(
+            'customer.created', 'payment_method.attached',
+            'customer.subscription.created', 'invoice.paid'
+        )
+        self.assertEqual(
+            StripeCustomer.objects.get().email, 'member@example.com'
+        )
+        self.assertEqual(
+            StripePaymentMethod.objects.get(customer_id='cus_test').last4,
+            '4242'
+        )
+        stripe_subscription = StripeSubscription.objects.get()
+        self.assertEqual(stripe_subscription.status, 'active')
+        self.assertEqual(
+            stripe_subscription.current_period_end.timestamp(), 1702592020
+        )
+        invoice = StripeInvoice.objects.get()
+        self.assertEqual(invoice.amount_due_decimal, Decimal('19.99'))
+        self.assertEqual(invoice.subscription_id, 'sub_test')
+
+    def test_out_of_order_events_keep_newest_copy(self):
+        """Test that an older event never overwrites a newer one"""
+        self._replay(
+            'customer.subscription.updated', 'customer.subscription.created'
+        )
+        self.assertTrue(StripeSubscription.objects.get().cancel_at_period_end)
+
+    def test_detach_and_delete(self):
+        """Test that detached cards and deleted customers are dropped"""
+        self._replay(
+            'customer.created', 'payment_method.attached',
+            'payment_method.detached', 'customer.deleted'
+        )
+        self.assertFalse(
+            StripePaymentMethod.objects.filter(customer_id='cus_test').exists()
+        )
+        self.assertFalse(StripeCustomer.objects.exists())
+
+    def test_backfill_pages_through_stripe(self):
+        """Test that the backfill walks every page of every list"""
+        client = FakeStripe(self.events)
+        invoice = self.events['invoice.paid']['data']['object']
+        client.Invoice.objects += [
+            dict(invoice, id='in_test_2'), dict(invoice, id='in_test_3')
+        ]
+        counts = backfill(client, page_size=1)
+        self.assertEqual(counts, {
+            'customer': 1,
+            'subscription': 1,
+            'invoice': 3,
+            'payment_method': 1,
+        })
+        self.assertEqual(client.calls.count('Invoice.list'), 3)
+        self.assertEqual(StripeInvoice.objects.count(), 3)
+        self.assertTrue(StripeSubscription.objects.filter(
+            stripe_id='sub_test', customer_id='cus_test'
+        ).exists())
+
+    def test_management_page_reads_mirror(self):
+        """Test that the management page never calls Stripe once mirrored"""
+        self._replay(
+            'customer.created', 'payment_method.attached',
+            'customer.subscription.created', 'invoice.paid'
+        )
+        client = FakeStripe(self.events)
+        self.client.login(username='member', password='testpass123')
+        with patch('checkout.stripe_sync.stripe', client):
+            response = self.client.get(
+                reverse('products:subscription_management')
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '4242')
+        self.assertContains(response, '19.99')
+        self.assertEqual(client.calls, [])
+
+    def test_unmirrored_subscription_is_fetched_once(self):
+        """Test that a missing subscription is fetched concurrently once"""
+        client = FakeStripe(self.events, barrier=Barrier(4, timeout=5))
+        self.client.login(username='member', password='testpass123')
+        url = reverse('products:subscription_management')
+        with patch('checkout.stripe_sync.stripe', client):
+            response = self.client.get(url)
+            self.assertContains(response, '4242')
+            self.assertEqual(len(client.calls), 4)
+
+            self.client.get(url)
+            self.assertEqual(len(client.calls), 4)
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET='whsec_test')
+class WebhookInboxTests(TestCase):
+    def setUp(self):
+        self.order = Order.objects.create(
+            first_name='Test',
+            last_name='User',
+            email='test@example.com',
+            address='123 Test St',
+            postal_code='12345',
+            city='Test City',
+            country='Test Country'
+        )
+        self.event = {
+            'id': 'evt_session',
+            'type': 'checkout.session.completed',
+            'created': 1700000000,
+            'data': {
+                'object': {
+                    'object': 'checkout.session',
+                    'payment_intent': 'pi_test',
+                    'metadata': {'order_id': str(self.order.id)},
+                }
+            },
+        }
+
+    def _deliver(self, event):
+        with patch(
+            'checkout.views.stripe.Webhook.construct_event',
+            return_value=event
+        ):
+            return self.client.post(
+                reverse('checkout:stripe_webhook'),
+                data=json.dumps(event),
+                content_type='application/json',
+                HTTP_STRIPE_SIGNATURE='test_signature'
+            )
+
+    def test_webhook_is_acknowledged_before_processing(self):
+        """Test that the webhook only stores the event"""
+        response = self._deliver(self.event)
+        self.assertEqual(response.status_code, 200)
+        self.order.refresh_from_db()
+        self.assertFalse(self.order.paid)
+        self.assertEqual(WebhookEvent.objects.get().status, 'pending')
+
+        self.assertEqual(process_webhook_events(), 1)
+        self.order.refresh_from_db()
+        self.assertTrue(self.order.paid)
+        self.assertEqual(self.order.stripe_id, 'pi_test')
+        self.assertEqual(WebhookEvent.objects.get().status, 'processed')
+
+    def test_redelivered_event_is_stored_once(self):
+        """Test that Stripe retries of one event are deduplicated"""
+        self._deliver(self.event)
+        process_webhook_events()
+        self._deliver(self.event)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+        self.assertEqual(process_webhook_events(), 0)
+
+    def test_order_without_payment_does_not_fail(self):
+        """Test that a session for an order with no payment is handled"""
+        self._deliver(self.event)
+        process_webhook_events()
+        self.assertEqual(WebhookEvent.objects.get().status, 'processed')
+        self.assertFalse(Payment.objects.exists())
+
+    @override_settings(STRIPE_WEBHOOK_MAX_ATTEMPTS=2)
+    def test_failed_event_is_retried_with_backoff(self):
+        """Test that failures back off and are given up after retries"""
+        del self.event['data']['object']['payment_intent']
+        self._deliver(self.event)
+
+        process_webhook_events()
+        webhook_event = WebhookEvent.objects.get()
+        self.assertEqual(webhook_event.status, 'pending')
+        self.assertEqual(webhook_event.attempts, 1)
+        self.assertIn('payment_intent', webhook_event.last_error)
+        self.assertGreater(webhook_event.next_attempt_at, timezone.now())
+        # Not due yet
+        self.assertEqual(process_webhook_events(), 0)
+
+        WebhookEvent.objects.update(next_attempt_at=timezone.now())
+        process_webhook_events()
+        webhook_event.refresh_from_db()
+        self.assertEqual(webhook_event.status, 'failed')
+        self.assertEqual(webhook_event.attempts, 2)
+
+    def test_worker_processes_stored_events(self):
+        """Test that the deployed worker applies stored webhook events"""
+        self._deliver(self.event)
+        call_command('runworker', once=True, stdout=StringIO())
+        self.order.refresh_from_db()
+        self.assertTrue(self.order.paid)
+        self.assertEqual(WebhookEvent.objects.get().status, 'processed')
+
+    @override_settings(STRIPE_WEBHOOK_MAX_ATTEMPTS=2)
+    def test_worker_retries_failed_events(self):
+        """Test that a failed event queues a job for its next attempt"""
+        del self.event['data']['object']['payment_intent']
+        self._deliver(self.event)
+        call_command('runworker', once=True, stdout=StringIO())
+        webhook_event = WebhookEvent.objects.get()
+        self.assertEqual(webhook_event.attempts, 1)
+        retry = Job.objects.get(status='queued')
+        self.assertEqual(retry.name, 'checkout.jobs.process_stripe_webhooks')
+        self.assertEqual(retry.run_at, webhook_event.next_attempt_at)
+
+        Job.objects.update(run_at=timezone.now())
+        WebhookEvent.objects.update(next_attempt_at=timezone.now())
+        call_command('runworker', once=True, stdout=StringIO())
+        webhook_event.refresh_from_db()
+        self.assertEqual(webhook_event.status, 'failed')
+
+    def test_command_drains_inbox_in_batches(self):
+        """Test that the worker command processes every pending event"""
+        for number in range(3):
+            self._deliver(dict(self.event, id=f'evt_{number}'))
+        out = StringIO()
+        call_command('process_webhook_events', batch_size=2, stdout=out)
+        self.assertIn('processed 3 webhook events', out.getvalue())
+        self.assertFalse(
+            WebhookEvent.objects.filter(status='pending').exists()
+        )
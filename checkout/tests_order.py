@@ -6,7 +6,9 @@ from django.http import HttpRequest
 from products.models import Product, Category
 from cart.models import Cart, CartItem
 from .models import Order, OrderItem, Payment
+from django.core.management import call_command
 from decimal import Decimal
+from io import StringIO
 
 
 class OrderManagementTests(TestCase):
@@ -161,3 +163,35 @@ class OrderManagementTests(TestCase):
             reverse('checkout:order_detail', args=[self.order.id])
         )
         self.assertEqual(response.status_code, 302)  # Redirect to login
+
+    def test_order_totals_maintained(self):
+        """Test that the stored total follows item writes"""
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total, Decimal('40.00'))
+        self.assertEqual(self.order.item_count, 2)
+
+        self.order.items.get(product=self.product2).delete()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total, Decimal('20.00'))
+        self.assertEqual(self.order.item_count, 1)
+
+    def test_order_total_needs_no_item_queries(self):
+        """Test that reading the total does not touch the items"""
+        order = Order.objects.get(id=self.order.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(order.get_total_cost(), Decimal('40.00'))
+
+    def test_order_deletion_cascades_items(self):
+        """Test that deleting an order still removes its items"""
+        self.order.delete()
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_backfill_order_totals(self):
+        """Test that the backfill command repairs stored totals"""
+        Order.objects.update(total=0, item_count=0)
+        out = StringIO()
+        call_command('backfill_order_totals', stdout=out)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total, Decimal('40.00'))
+        self.assertEqual(self.order.item_count, 2)
+        self.assertIn('1 orders', out.getvalue())
@@ -6,78 +6,91 @@ from django.shortcuts import (
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
 from django.views.decorators.csrf import csrf_exempt
-from django.contrib.sites.shortcuts import get_current_site
-from decimal import Decimal
+from django.db import transaction
 
 from .forms import OrderCreateForm
 from .models import Order, OrderItem, Payment
-from products.models import Product
+from .webhooks import record_event
+from .jobs import send_order_confirmation, verify_order_payment
 from cart.models import Cart, CartItem
+from cart.cache import invalidate_cart_summary
+from cart.services import get_cart_items, get_session_cart_items
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
 
+def _order_lines(cart_items):
+    """
+    Normalise session and database cart items into
+    (product, price, quantity) tuples
+    """
+    order_lines = []
+    for cart_item in cart_items:
+        if isinstance(cart_item, dict):
+            # Handle session-based cart items
+            order_lines.append((
+                cart_item['product'],
+                cart_item['price'],
+                cart_item['quantity']
+            ))
+        else:
+            # Handle database-based cart items
+            order_lines.append((
+                cart_item.product,
+                cart_item.product.price,
+                cart_item.quantity
+            ))
+    return order_lines
+
+
 @login_required
 def checkout(request):
     # Try to get cart from database first
-    try:
-        cart = Cart.objects.get(cart_id=request.session.session_key)
-        cart_items = CartItem.objects.filter(cart=cart, is_active=True)
-    except Cart.DoesNotExist:
+    cart_id = request.session.session_key
+    cart_items = get_cart_items(cart_id)
+    if not cart_items:
         # If no database cart, check session cart
-        cart_items = []
-        if 'cart' in request.session:
-            cart_items_data = request.session['cart']
-            for product_id, item_data in cart_items_data.items():
-                try:
-                    product = Product.objects.get(id=product_id)
-                    cart_items.append({
-                        'product': product,
-                        'quantity': item_data['quantity'],
-                        'price': Decimal(item_data['price'])
-                    })
-                except Product.DoesNotExist:
-                    continue
+        cart_items = get_session_cart_items(request.session.get('cart', {}))
 
     if not cart_items:
         messages.warning(request, 'Your cart is empty')
         return redirect('cart:view_cart')
 
+    # Build the order lines once and total them in Python
+    order_lines = _order_lines(cart_items)
+    order_total = sum(
+        price * quantity for _, price, quantity in order_lines
+    )
+
     if request.method == 'POST':
         form = OrderCreateForm(request.POST)
         if form.is_valid():
             order = form.save(commit=False)
             if request.user.is_authenticated:
                 order.user = request.user
-            order.save()
 
-            # Create order items from cart items
-            for cart_item in cart_items:
-                if isinstance(cart_item, dict):
-                    # Handle session-based cart items
-                    OrderItem.objects.create(
-                        order=order,
-                        product=cart_item['product'],
-                        price=cart_item['price'],
-                        quantity=cart_item['quantity']
-                    )
-                else:
-                    # Handle database-based cart items
-                    OrderItem.objects.create(
+            # Bulk creation skips the item signals, so set the totals here
+            order.total = order_total
+            order.item_count = len(order_lines)
+
+            # Create the order and all of its items in one transaction
+            with transaction.atomic():
+                order.save()
+                OrderItem.objects.bulk_create([
+                    OrderItem(
                         order=order,
-                        product=cart_item.product,
-                        price=cart_item.product.price,
-                        quantity=cart_item.quantity
+                        product=product,
+                        price=price,
+                        quantity=quantity
                     )
+                    for product, price, quantity in order_lines
+                ])
 
             try:
                 # Create a PaymentIntent with the order amount and currency
                 intent = stripe.PaymentIntent.create(
-                    amount=int(order.get_total_cost() * 100),
+                    amount=int(order_total * 100),
                     currency='usd',
                     automatic_payment_methods={
                         'enabled': True,
@@ -89,14 +102,18 @@ def checkout(request):
 
                 # Update the order with the payment intent ID
                 order.stripe_id = intent.id
-                order.save()
+                update_fields = ['stripe_id', 'updated']
 
                 # For testing purposes, if the order number starts with 'TEST',
                 # skip payment
-                if order.order_number.startswith('TEST'):
-                    # Mark the order as paid and redirect to success
+                is_test_order = order.order_number.startswith('TEST')
+                if is_test_order:
                     order.paid = True
-                    order.save()
+                    update_fields.append('paid')
+                order.save(update_fields=update_fields)
+
+                if is_test_order:
+                    # Redirect straight to success
                     return JsonResponse({
                         'success': True,
                         'order_id': order.order_number,
@@ -159,6 +176,7 @@ def checkout(request):
 
     return render(request, 'checkout/checkout.html', {
         'cart_items': cart_items,
+        'total': order_total,
         'form': form,
         'stripe_public_key': settings.STRIPE_PUBLIC_KEY,
         'order_id': None
@@ -175,27 +193,10 @@ def payment_success(request, order_number):
         ):
             return HttpResponse(status=404)
 
-        # If the order already has a stripe_id, verify the payment
+        # If the order already has a stripe_id, verify the payment in
+        # the background
         if order.stripe_id:
-            # Retrieve the PaymentIntent to confirm the payment status
-            intent = stripe.PaymentIntent.retrieve(order.stripe_id)
-
-            if intent.status == 'succeeded':
-                order.paid = True
-                order.save()
-
-                # Create a Payment record
-                Payment.objects.create(
-                    order=order,
-                    payment_id=intent.id,
-                    payment_method=(
-                        intent.payment_method_types[0]
-                        if intent.payment_method_types
-                        else 'card'
-                    ),
-                    amount_paid=order.get_total_cost(),
-                    status='completed'
-                )
+            verify_order_payment.delay(order.id)
         else:
             # If no stripe_id, mark as paid anyway (for testing purposes)
             order.paid = True
@@ -218,24 +219,10 @@ def payment_success(request, order_number):
             cart.delete()
         except Cart.DoesNotExist:
             pass
+        invalidate_cart_summary(request.session.session_key)
 
-        # Send confirmation email
-        subject = f'Order Confirmation - #{order.order_number}'
-        html_message = render_to_string(
-            'checkout/email/order_confirmation.html',
-            {
-                'order': order,
-                'site': get_current_site(request)
-            }
-        )
-        plain_message = strip_tags(html_message)
-        send_mail(
-            subject,
-            plain_message,
-            settings.DEFAULT_FROM_EMAIL,
-            [order.email],
-            html_message=html_message
-        )
+        # Send confirmation email in the background
+        send_order_confirmation.delay(order.id)
 
         messages.success(
             request,
@@ -251,9 +238,6 @@ def payment_success(request, order_number):
     except Order.DoesNotExist:
         messages.error(request, 'Order not found.')
         return redirect('checkout:checkout')
-    except stripe.error.StripeError as error:
-        messages.error(request, f'Error verifying payment: {str(error)}')
-        return redirect('checkout:checkout')
     except Exception as error:
         messages.error(request, f'An unexpected error occurred: {str(error)}')
         return redirect('checkout:checkout')
@@ -282,23 +266,8 @@ def stripe_webhook(request):
     except stripe.error.SignatureVerificationError:
         return HttpResponse(status=400)
 
-    if event['type'] == 'checkout.session.completed':
-        session = event['data']['object']
-        order_id = session['metadata']['order_id']
-        try:
-            order = Order.objects.get(id=order_id)
-            order.paid = True
-            order.stripe_id = session['payment_intent']
-            order.save()
-
-            # Update payment record
-            payment = Payment.objects.get(order=order)
-            payment.status = 'completed'
-            payment.save()
-
-        except Order.DoesNotExist:
-            return HttpResponse(status=404)
-
+    # Acknowledge at once; process_webhook_events does the work
+    record_event(event)
     return HttpResponse(status=200)
 
 
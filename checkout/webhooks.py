@@ -0,0 +1,129 @@
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from products.models import UserSubscription
+from .models import Order, Payment, WebhookEvent
+from .stripe_sync import apply_event
+
+logger = logging.getLogger(__name__)
+
+
+def _checkout_session_completed(event):
+    session = event['data']['object']
+    # Subscription checkouts carry a plan instead of an order
+    order_id = (session.get('metadata') or {}).get('order_id')
+    if not order_id:
+        return
+    updated = Order.objects.filter(id=order_id).update(
+        paid=True,
+        stripe_id=session['payment_intent']
+    )
+    if not updated:
+        logger.warning(
+            'Webhook %s names unknown order %s', event['id'], order_id
+        )
+        return
+    Payment.objects.filter(order_id=order_id).update(status='completed')
+
+
+def _subscription_changed(event):
+    stripe_subscription = event['data']['object']
+    is_active = (
+        event['type'] == 'customer.subscription.updated' and
+        stripe_subscription['status'] in ('active', 'trialing')
+    )
+    end_date = datetime.fromtimestamp(
+        stripe_subscription['current_period_end'], tz=dt_timezone.utc
+    )
+    # Saving each row also drops the user's cached entitlement
+    for subscription in UserSubscription.objects.filter(
+        stripe_subscription_id=stripe_subscription['id']
+    ):
+        subscription.is_active = is_active
+        subscription.end_date = end_date
+        subscription.save()
+
+
+HANDLERS = {
+    'checkout.session.completed': _checkout_session_completed,
+    'customer.subscription.updated': _subscription_changed,
+    'customer.subscription.deleted': _subscription_changed,
+}
+
+
+def record_event(event):
+    """
+    Store a verified webhook event and queue the job that processes it.
+    Stripe resends events it isn't sure were delivered; those are stored
+    only once. Returns True for events not seen before.
+    """
+    from .jobs import process_stripe_webhooks
+    _, created = WebhookEvent.objects.get_or_create(
+        stripe_id=event['id'],
+        defaults={'type': event['type'], 'payload': event}
+    )
+    if created:
+        process_stripe_webhooks.delay()
+    return created
+
+
+def _retry_delay(attempts):
+    """Exponential backoff: the base delay, doubled for each attempt"""
+    delay = settings.STRIPE_WEBHOOK_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, 24 * 60 * 60))
+
+
+def process_webhook_events(batch_size=None):
+    """
+    Process one batch of due webhook events, oldest first. Each event is
+    handled in its own savepoint; a failing event is retried with
+    backoff, by a job scheduled for its next attempt, until
+    STRIPE_WEBHOOK_MAX_ATTEMPTS and then marked failed.
+    Rows are claimed with SKIP LOCKED where the database supports it,
+    so several workers can share the inbox.
+    Returns the number of events handled.
+    """
+    from .jobs import process_stripe_webhooks
+    batch_size = batch_size or settings.STRIPE_WEBHOOK_BATCH_SIZE
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True).filter(
+                status='pending',
+                next_attempt_at__lte=now
+            ).order_by('id')[:batch_size]
+        )
+        for webhook_event in events:
+            webhook_event.attempts += 1
+            try:
+                with transaction.atomic():
+                    apply_event(webhook_event.payload)
+                    handler = HANDLERS.get(webhook_event.type)
+                    if handler:
+                        handler(webhook_event.payload)
+            except Exception as error:
+                logger.exception('Webhook %s failed', webhook_event.stripe_id)
+                webhook_event.last_error = repr(error)
+                if (
+                    webhook_event.attempts >=
+                    settings.STRIPE_WEBHOOK_MAX_ATTEMPTS
+                ):
+                    webhook_event.status = 'failed'
+                else:
+                    webhook_event.next_attempt_at = (
+                        now + _retry_delay(webhook_event.attempts)
+                    )
+                    process_stripe_webhooks.schedule(
+                        webhook_event.next_attempt_at
+                    )
+            else:
+                webhook_event.status = 'processed'
+                webhook_event.processed_at = timezone.now()
+                webhook_event.last_error = ''
+            webhook_event.save(update_fields=[
+                'attempts', 'status', 'next_attempt_at', 'last_error',
+                'processed_at'
+            ])
+    return len(events)
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Achievement, Badge, UserBadge, Challenge, ChallengeParticipation,
-    ProgressEntry, SocialPost, Comment, GroupWorkout
+    ProgressEntry, SocialPost, Comment, GroupWorkout, Follow
 )
 
 
@@ -49,9 +49,18 @@ class ProgressEntryAdmin(admin.ModelAdmin):
 
 @admin.register(SocialPost)
 class SocialPostAdmin(admin.ModelAdmin):
-    list_display = ('user', 'created_at', 'updated_at')
+    list_display = (
+        'user', 'created_at', 'updated_at', 'like_count', 'comment_count'
+    )
     list_filter = ('created_at', 'updated_at')
     search_fields = ('user__username', 'content')
+    readonly_fields = ('like_count', 'comment_count')
+
+
+@admin.register(Follow)
+class FollowAdmin(admin.ModelAdmin):
+    list_display = ('follower', 'following', 'created_at')
+    search_fields = ('follower__username', 'following__username')
 
 
 @admin.register(Comment)
@@ -0,0 +1,59 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from .models import AuthorStats, Comment, Follow, SocialPost
+
+
+def _count_subquery(queryset, field):
+    """Count the rows of a related queryset that point at the outer post"""
+    counts = queryset.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(total=Count('*')).values('total')
+    return Coalesce(
+        Subquery(counts, output_field=IntegerField()), Value(0)
+    )
+
+
+def actual_like_count():
+    likes = SocialPost.likes.through.objects.all()
+    return _count_subquery(likes, 'socialpost')
+
+
+def actual_comment_count():
+    return _count_subquery(Comment.objects.all(), 'post')
+
+
+def adjust_counter(post_id, field, delta):
+    """
+    Add delta to one of a post's counters in a single UPDATE, so
+    concurrent likes and comments never overwrite each other.
+    """
+    SocialPost.objects.filter(pk=post_id).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def recount(post_ids):
+    """Recompute both counters of the given posts from scratch"""
+    SocialPost.objects.filter(pk__in=post_ids).update(
+        like_count=actual_like_count(),
+        comment_count=actual_comment_count()
+    )
+
+
+def adjust_follower_count(user_id, delta):
+    """
+    Add delta to an author's follower count in a single UPDATE. The
+    first change counts the author's followers from scratch instead.
+    """
+    _, created = AuthorStats.objects.get_or_create(
+        user_id=user_id,
+        defaults={
+            'follower_count': Follow.objects.filter(
+                following_id=user_id
+            ).count()
+        }
+    )
+    if not created:
+        AuthorStats.objects.filter(user_id=user_id).update(
+            follower_count=Greatest(F('follower_count') + delta, 0)
+        )
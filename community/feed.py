@@ -0,0 +1,46 @@
+from django.db.models import (
+    BooleanField, Exists, F, OuterRef, Prefetch, Value, Window
+)
+from django.db.models.functions import RowNumber
+from .models import SocialPost, Comment
+
+# Comments shown inline under each post in the feed
+RECENT_COMMENTS_PER_POST = 3
+
+
+def recent_comments(limit=RECENT_COMMENTS_PER_POST):
+    """
+    Prefetch only the latest few comments of each post, with their
+    authors, using a row number per post rather than loading every
+    comment and slicing in Python.
+    """
+    latest = Comment.objects.select_related('user__userprofile').annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=F('post'),
+            order_by=[F('created_at').desc(), F('id').desc()]
+        )
+    ).filter(position__lte=limit).order_by('created_at', 'id')
+    return Prefetch('comments', queryset=latest, to_attr='recent_comments')
+
+
+def feed_posts(user):
+    """
+    Posts annotated with everything the feed template needs, so
+    a page costs one query for the posts and one for their comments.
+    Like and comment totals come from the stored counters.
+    """
+    if user.is_authenticated:
+        liked_by_me = Exists(
+            SocialPost.likes.through.objects.filter(
+                socialpost=OuterRef('pk'), user=user
+            )
+        )
+    else:
+        liked_by_me = Value(False, output_field=BooleanField())
+
+    return SocialPost.objects.select_related(
+        'user__userprofile'
+    ).annotate(
+        liked_by_me=liked_by_me
+    ).prefetch_related(recent_comments())
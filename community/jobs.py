@@ -0,0 +1,8 @@
+from jobs.queue import job
+from .likes import flush_like_buffer
+
+
+@job()
+def flush_likes():
+    """Apply the buffered likes and unlikes"""
+    flush_like_buffer()
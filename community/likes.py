@@ -0,0 +1,94 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from jobs.models import Job
+from .counters import recount
+from .models import LikeEvent, SocialPost
+
+
+def record_like(post, user, liked):
+    """
+    Buffer a like (or unlike) instead of writing it straight to the
+    likes table, so a busy post does not lock its row on every click.
+    Returns the like count to show the user, counting their own
+    pending choice.
+    """
+    Like = SocialPost.likes.through
+    counted = Like.objects.filter(
+        socialpost_id=post.pk, user_id=user.pk
+    ).exists()
+    LikeEvent.objects.create(post=post, user=user, liked=liked)
+    transaction.on_commit(schedule_flush)
+    return max(post.like_count - counted + liked, 0)
+
+
+def schedule_flush():
+    """
+    Queue a flush LIKE_FLUSH_INTERVAL seconds from now, unless one is
+    already queued. A queued flush has not read the buffer yet, so it
+    applies this like too.
+    """
+    from .jobs import flush_likes
+    if not Job.objects.filter(
+        name=flush_likes.name, status='queued'
+    ).exists():
+        flush_likes.schedule(
+            timezone.now() + timedelta(seconds=settings.LIKE_FLUSH_INTERVAL)
+        )
+
+
+def _apply(events):
+    """Apply one batch of (post_id, user_id, liked) events, oldest first"""
+    Like = SocialPost.likes.through
+    # Only the latest choice of each user on each post matters
+    latest = {}
+    for post_id, user_id, liked in events:
+        latest[(post_id, user_id)] = liked
+
+    Like.objects.bulk_create(
+        [
+            Like(socialpost_id=post_id, user_id=user_id)
+            for (post_id, user_id), liked in latest.items() if liked
+        ],
+        ignore_conflicts=True
+    )
+    unliked = {}
+    for (post_id, user_id), liked in latest.items():
+        if not liked:
+            unliked.setdefault(post_id, []).append(user_id)
+    if unliked:
+        removals = Q()
+        for post_id, user_ids in unliked.items():
+            removals |= Q(socialpost_id=post_id, user_id__in=user_ids)
+        Like.objects.filter(removals).delete()
+
+    recount({post_id for post_id, _ in latest})
+
+
+def flush_like_buffer(batch_size=None):
+    """
+    Apply every buffered like event. Each batch is locked with SKIP
+    LOCKED where the database supports it, so concurrent flushes never
+    apply the same events. Returns how many were applied.
+    """
+    batch_size = batch_size or settings.LIKE_FLUSH_BATCH_SIZE
+    applied = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                LikeEvent.objects.select_for_update(
+                    skip_locked=True
+                ).order_by('id').values_list(
+                    'id', 'post_id', 'user_id', 'liked'
+                )[:batch_size]
+            )
+            if not batch:
+                break
+            _apply([event[1:] for event in batch])
+            LikeEvent.objects.filter(
+                id__in=[event[0] for event in batch]
+            ).delete()
+        applied += len(batch)
+    return applied
@@ -0,0 +1,79 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from community.timeline import read_timeline, read_timeline_from_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares reading home timelines from the timeline store '
+        '(fan-out on write) with building them from the posts table '
+        '(fan-out on read). Only writes to rebuild empty timelines.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=50,
+            help='Number of users who follow someone to sample'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Number of reads per user and strategy'
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=20,
+            help='Number of posts per timeline page'
+        )
+
+    def _measure(self, reader, users, repeat, page_size):
+        elapsed = 0.0
+        queries = 0
+        for user in users:
+            for _ in range(repeat):
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    reader(user, count=page_size)
+                    elapsed += time.perf_counter() - started
+                queries += len(captured)
+        reads = len(users) * repeat
+        return elapsed / reads * 1000, queries / reads
+
+    def handle(self, *args, **options):
+        users = list(
+            User.objects.filter(following__isnull=False).distinct()[
+                :options['users']
+            ]
+        )
+        if not users:
+            self.stdout.write('No users follow anyone yet, nothing to measure')
+            return
+
+        # Warm every timeline so the first read is not a rebuild
+        for user in users:
+            read_timeline(user, count=options['page_size'])
+
+        for label, reader in [
+            ('fan-out on write', read_timeline),
+            ('fan-out on read', read_timeline_from_database),
+        ]:
+            milliseconds, queries = self._measure(
+                reader, users, options['repeat'], options['page_size']
+            )
+            self.stdout.write(
+                f'{label}: {milliseconds:.2f} ms and '
+                f'{queries:.1f} queries per page'
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully benchmarked timelines for {len(users)} users'
+            )
+        )
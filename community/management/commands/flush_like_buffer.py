@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from community.likes import flush_like_buffer
+
+
+class Command(BaseCommand):
+    help = 'Applies buffered likes and unlikes to social posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Number of like events to apply per transaction'
+        )
+
+    def handle(self, *args, **options):
+        applied = flush_like_buffer(options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully applied {applied} like events')
+        )
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from community.counters import actual_comment_count, actual_like_count
+from community.models import SocialPost
+
+
+class Command(BaseCommand):
+    help = 'Repairs like and comment counters that have drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of posts to update per query'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        drifted = SocialPost.objects.annotate(
+            actual_likes=actual_like_count(),
+            actual_comments=actual_comment_count(),
+        ).filter(
+            ~Q(like_count=F('actual_likes')) |
+            ~Q(comment_count=F('actual_comments'))
+        ).only('id', 'like_count', 'comment_count').order_by('id')
+
+        pending = []
+        repaired_count = 0
+        for post in drifted.iterator(chunk_size=batch_size):
+            post.like_count = post.actual_likes
+            post.comment_count = post.actual_comments
+            pending.append(post)
+            if len(pending) >= batch_size:
+                SocialPost.objects.bulk_update(
+                    pending, ['like_count', 'comment_count']
+                )
+                repaired_count += len(pending)
+                pending = []
+
+        if pending:
+            SocialPost.objects.bulk_update(
+                pending, ['like_count', 'comment_count']
+            )
+            repaired_count += len(pending)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully repaired counters on {repaired_count} posts'
+            )
+        )
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:00
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    SocialPost = apps.get_model('community', 'SocialPost')
+    Comment = apps.get_model('community', 'Comment')
+
+    def count(queryset, field):
+        counts = queryset.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(total=Count('*')).values('total')
+        return Coalesce(
+            Subquery(counts, output_field=IntegerField()), Value(0)
+        )
+
+    SocialPost.objects.update(
+        like_count=count(SocialPost.likes.through.objects.all(), 'socialpost'),
+        comment_count=count(Comment.objects.all(), 'post')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0003_challengerequirement_challengereward_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='socialpost',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='socialpost',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:04
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def populate_follower_counts(apps, schema_editor):
+    Follow = apps.get_model('community', 'Follow')
+    AuthorStats = apps.get_model('community', 'AuthorStats')
+    counts = Follow.objects.order_by().values('following_id').annotate(
+        total=Count('*')
+    ).values_list('following_id', 'total')
+    AuthorStats.objects.bulk_create(
+        [
+            AuthorStats(user_id=user_id, follower_count=total)
+            for user_id, total in counts
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('community', '0006_likeevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='author_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('follower_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(
+            populate_follower_counts, migrations.RunPython.noop
+        ),
+    ]
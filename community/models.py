@@ -182,11 +182,92 @@ class SocialPost(models.Model):
         related_name='liked_posts',
         blank=True
     )
+    # Denormalized from likes and comments, see community.counters
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.user.username}'s post: {self.content[:50]}..."
 
 
+class LikeEvent(models.Model):
+    """
+    A buffered like or unlike, applied to SocialPost.likes in batches
+    by community.likes.flush_like_buffer.
+    """
+    post = models.ForeignKey(
+        SocialPost,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    liked = models.BooleanField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        action = 'likes' if self.liked else 'unlikes'
+        return f"{self.user_id} {action} {self.post_id}"
+
+
+class Follow(models.Model):
+    follower = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following'
+    )
+    following = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='followers'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('follower', 'following')
+
+    def __str__(self):
+        return f"{self.follower.username} follows {self.following.username}"
+
+
+class AuthorStats(models.Model):
+    """
+    Denormalized totals for an author, see community.counters. Rows are
+    created on the author's first follower.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='author_stats'
+    )
+    follower_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.follower_count} followers"
+
+
+class TimelineEntry(models.Model):
+    """A post in a home timeline, used by the database timeline store"""
+    key = models.CharField(max_length=64)
+    post = models.ForeignKey(
+        SocialPost,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('key', 'post')
+        indexes = [models.Index(fields=['key', '-score'])]
+
+    def __str__(self):
+        return f"{self.key}: {self.post_id}"
+
+
 class Comment(models.Model):
     post = models.ForeignKey(
         SocialPost,
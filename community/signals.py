@@ -1,8 +1,11 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.db import transaction
 from django.dispatch import receiver
+from .counters import adjust_counter, adjust_follower_count, recount
+from .timeline import fan_out_post, retract_post
 from .models import (
     Achievement, Badge, UserBadge, Challenge, ChallengeParticipation,
-    ProgressEntry, SocialPost, Comment, GroupWorkout
+    ProgressEntry, SocialPost, Comment, GroupWorkout, Follow
 )
 
 
@@ -58,16 +61,64 @@ def progress_entry_created(sender, instance, created, **kwargs):
 @receiver(post_save, sender=SocialPost)
 def social_post_created(sender, instance, created, **kwargs):
     if created:
-        # Add any post-creation logic here
-        pass
+        transaction.on_commit(lambda: fan_out_post(instance))
+
+
+@receiver(post_delete, sender=SocialPost)
+def social_post_deleted(sender, instance, **kwargs):
+    # The collector clears instance.pk before an outer transaction commits
+    post_id, user_id = instance.pk, instance.user_id
+    transaction.on_commit(lambda: retract_post(post_id, user_id))
+
+
+# Changes to likes made through the related manager, e.g. in the admin.
+# Buffered likes are recounted by community.likes when they are applied.
+@receiver(m2m_changed, sender=SocialPost.likes.through)
+def social_post_likes_changed(sender, instance, action, reverse, pk_set,
+                              **kwargs):
+    if action == 'pre_clear' and reverse:
+        # Remember which posts lose a like before the rows disappear
+        instance._cleared_post_ids = list(
+            instance.liked_posts.values_list('pk', flat=True)
+        )
+    elif action in ('post_add', 'post_remove') and pk_set:
+        recount(pk_set if reverse else [instance.pk])
+    elif action == 'post_clear':
+        if reverse:
+            recount(getattr(instance, '_cleared_post_ids', []))
+        else:
+            recount([instance.pk])
 
 
 # Signal handlers for Comment model
 @receiver(post_save, sender=Comment)
 def comment_created(sender, instance, created, **kwargs):
     if created:
-        # Add any post-creation logic here
-        pass
+        adjust_counter(instance.post_id, 'comment_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    # No need to count down when the post itself is being deleted
+    origin = kwargs.get('origin')
+    if (
+        isinstance(origin, SocialPost) or
+        getattr(origin, 'model', None) is SocialPost
+    ):
+        return
+    adjust_counter(instance.post_id, 'comment_count', -1)
+
+
+# Signal handlers for Follow model
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        adjust_follower_count(instance.following_id, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    adjust_follower_count(instance.following_id, -1)
 
 
 # Signal handlers for GroupWorkout model
@@ -1 +1,404 @@
-# Create your tests here.
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth.models import User
+from jobs.models import Job
+from jobs.queue import run_pending_jobs
+from .jobs import flush_likes
+from .models import SocialPost, Comment, LikeEvent, TimelineEntry
+from .likes import flush_like_buffer, record_like
+from .feed import feed_posts, RECENT_COMMENTS_PER_POST
+from .timeline import (
+    follow, get_timeline_store, read_timeline, read_timeline_from_database,
+    timeline_key, unfollow
+)
+
+
+class SocialFeedQueryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+
+    def _add_posts(self, count):
+        for index in range(count):
+            author = User.objects.create_user(
+                username=f'author{SocialPost.objects.count()}'
+            )
+            post = SocialPost.objects.create(
+                user=author,
+                content=f'Workout {index}'
+            )
+            post.likes.add(self.user, author)
+            for number in range(5):
+                Comment.objects.create(
+                    post=post,
+                    user=author,
+                    content=f'Comment {number}'
+                )
+
+    def _feed_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('community:social_feed'))
+        self.assertEqual(response.status_code, 200)
+        return len(captured), response
+
+    def test_query_count_does_not_grow_with_posts(self):
+        """Test that a feed page costs the same queries for 2 or 20 posts"""
+        self._add_posts(2)
+        # The first request also fills the cart summary cache
+        self._feed_queries()
+        small, _ = self._feed_queries()
+        self._add_posts(18)
+        large, response = self._feed_queries()
+        self.assertEqual(small, large)
+        # Session, user, follow check, posts and their recent comments
+        self.assertEqual(large, 5)
+        self.assertEqual(len(response.context['posts']), 20)
+
+    def test_feed_annotations(self):
+        """Test that counts, liked state and recent comments are loaded"""
+        self._add_posts(1)
+        SocialPost.objects.create(user=self.user, content='Unliked')
+        posts = {post.content: post for post in feed_posts(self.user)}
+
+        liked = posts['Workout 0']
+        self.assertEqual(liked.like_count, 2)
+        self.assertEqual(liked.comment_count, 5)
+        self.assertTrue(liked.liked_by_me)
+        self.assertEqual(
+            [comment.content for comment in liked.recent_comments],
+            [f'Comment {number}' for number in range(5)][
+                -RECENT_COMMENTS_PER_POST:
+            ]
+        )
+
+        unliked = posts['Unliked']
+        self.assertEqual(unliked.like_count, 0)
+        self.assertEqual(unliked.comment_count, 0)
+        self.assertFalse(unliked.liked_by_me)
+        self.assertEqual(unliked.recent_comments, [])
+
+
+class SocialPostCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.post = SocialPost.objects.create(
+            user=self.user,
+            content='Leg day'
+        )
+        self.client.login(username='testuser', password='testpass123')
+
+    def test_like_and_unlike_endpoints(self):
+        """Test that liking is idempotent and keeps the counter in step"""
+        like_url = reverse('community:like_post', args=[self.post.id])
+        unlike_url = reverse('community:unlike_post', args=[self.post.id])
+
+        self.assertEqual(self.client.post(like_url).json()['like_count'], 1)
+        self.assertEqual(self.client.post(like_url).json()['like_count'], 1)
+        response = self.client.post(unlike_url).json()
+        self.assertFalse(response['liked'])
+        self.assertEqual(response['like_count'], 0)
+        self.assertEqual(self.client.post(unlike_url).json()['like_count'], 0)
+
+    def test_comment_counter_follows_comments(self):
+        """Test that creating and deleting comments updates the counter"""
+        comments = [
+            Comment.objects.create(
+                post=self.post,
+                user=self.user,
+                content=f'Comment {number}'
+            )
+            for number in range(3)
+        ]
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 3)
+
+        comments[0].delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+
+    def test_related_manager_changes_are_counted(self):
+        """Test that likes added through the manager update the counter"""
+        other = User.objects.create_user(username='other')
+        self.post.likes.add(self.user, other)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 2)
+
+        other.liked_posts.clear()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+    def test_reconcile_command_repairs_drift(self):
+        """Test that the reconcile command fixes wrong counters"""
+        Comment.objects.create(post=self.post, user=self.user, content='Hi')
+        self.post.likes.add(self.user)
+        SocialPost.objects.update(like_count=7, comment_count=0)
+
+        out = StringIO()
+        call_command('reconcile_post_counters', stdout=out)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertIn('1 posts', out.getvalue())
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(
+            username='reader',
+            password='testpass123'
+        )
+        self.author = User.objects.create_user(username='author')
+        follow(self.reader, self.author)
+
+    def _post(self, user, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            return SocialPost.objects.create(user=user, content=content)
+
+    def _stored_ids(self, user):
+        return [
+            post_id for post_id, _ in get_timeline_store().range(
+                timeline_key(user.id), None, 100
+            )
+        ]
+
+    def test_new_posts_fan_out_to_followers(self):
+        """Test that a post lands in the author's and followers' timelines"""
+        post = self._post(self.author, 'Morning run')
+        self.assertEqual(self._stored_ids(self.reader), [post.id])
+        self.assertEqual(self._stored_ids(self.author), [post.id])
+
+        posts, next_score = read_timeline(self.reader)
+        self.assertEqual(posts, [post])
+        self.assertIsNone(next_score)
+
+    @override_settings(COMMUNITY_TIMELINE_LENGTH=3)
+    def test_timelines_are_bounded(self):
+        """Test that timelines keep only the newest entries"""
+        posts = [self._post(self.author, f'Post {n}') for n in range(5)]
+        self.assertEqual(
+            self._stored_ids(self.reader),
+            [post.id for post in reversed(posts[2:])]
+        )
+
+    @override_settings(COMMUNITY_FANOUT_LIMIT=1)
+    def test_popular_authors_are_merged_on_read(self):
+        """Test that posts by popular authors are read from the database"""
+        follow(User.objects.create_user(username='fan'), self.author)
+        own = self._post(self.reader, 'My own post')
+        popular = self._post(self.author, 'Popular post')
+
+        self.assertNotIn(popular.id, self._stored_ids(self.reader))
+        posts, _ = read_timeline(self.reader)
+        self.assertEqual(posts, [popular, own])
+
+    def test_follower_counts_are_kept(self):
+        """Test that follows keep the stored follower count up to date"""
+        fans = [
+            User.objects.create_user(username=f'fan{number}')
+            for number in range(3)
+        ]
+        for fan in fans:
+            follow(fan, self.author)
+        unfollow(fans[0], self.author)
+        fans[1].delete()
+        self.assertEqual(self.author.author_stats.follower_count, 2)
+
+    def test_timeline_read_skips_follower_aggregation(self):
+        """Test that reads find popular authors without counting follows"""
+        self._post(self.author, 'Morning run')
+        with CaptureQueriesContext(connection) as captured:
+            read_timeline(self.reader)
+        for query in captured.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'].upper())
+
+    def test_both_strategies_agree(self):
+        """Test that fan-out on write and on read return the same pages"""
+        stranger = User.objects.create_user(username='stranger')
+        for number in range(5):
+            self._post(self.author, f'Author {number}')
+            self._post(self.reader, f'Reader {number}')
+            self._post(stranger, f'Stranger {number}')
+
+        written, written_next = read_timeline(self.reader, count=4)
+        read, read_next = read_timeline_from_database(self.reader, count=4)
+        self.assertEqual(written, read)
+        self.assertEqual(written_next, read_next)
+        self.assertEqual(
+            read_timeline(self.reader, written_next, count=4)[0],
+            read_timeline_from_database(self.reader, read_next, count=4)[0]
+        )
+
+    def test_delete_in_outer_transaction_retracts_post(self):
+        """Test that a delete committed later still retracts its post id"""
+        post = self._post(self.author, 'Deleted in the admin')
+        post_id = post.id
+        with patch('community.signals.retract_post') as retract:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    post.delete()
+        retract.assert_called_once_with(post_id, self.author.id)
+
+    def test_posts_sharing_a_score_are_all_paged(self):
+        """Test that paging never skips posts created at the same time"""
+        posts = [self._post(self.author, f'Tied {n}') for n in range(5)]
+        created_at = timezone.now()
+        SocialPost.objects.update(created_at=created_at)
+        TimelineEntry.objects.update(score=created_at.timestamp())
+
+        for read in (read_timeline, read_timeline_from_database):
+            seen, cursor = [], None
+            while True:
+                page, cursor = read(self.reader, cursor, count=2)
+                seen += page
+                if cursor is None:
+                    break
+            self.assertEqual(seen, list(reversed(posts)))
+
+        # The feed hands the same cursor out between pages
+        self.client.login(username='reader', password='testpass123')
+        url = reverse('community:social_feed')
+        seen, cursor = [], ''
+        with patch('community.views.FEED_PAGE_SIZE', 2):
+            while cursor is not None:
+                page = self.client.get(url, {'cursor': cursor}).context[
+                    'posts'
+                ]
+                seen += page
+                self.assertFalse(page.has_previous)
+                cursor = page.next_cursor
+        self.assertEqual(seen, list(reversed(posts)))
+
+    def test_community_home_without_follows_shows_recent_posts(self):
+        """Test that users who follow nobody still see community posts"""
+        post = self._post(self.author, 'Everyone can see this')
+        User.objects.create_user(
+            username='loner',
+            password='testpass123'
+        )
+        self.client.login(username='loner', password='testpass123')
+        response = self.client.get(reverse('community:community_home'))
+        self.assertEqual(list(response.context['recent_posts']), [post])
+
+        self.client.login(username='reader', password='testpass123')
+        response = self.client.get(reverse('community:community_home'))
+        self.assertEqual(list(response.context['recent_posts']), [post])
+
+    def test_unfollow_and_delete_remove_posts(self):
+        """Test that unfollowing or deleting drops posts from timelines"""
+        first = self._post(self.author, 'First')
+        self._post(self.author, 'Second')
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(len(self._stored_ids(self.reader)), 1)
+
+        unfollow(self.reader, self.author)
+        self.assertEqual(self._stored_ids(self.reader), [])
+
+    def test_social_feed_shows_following_timeline(self):
+        """Test that the feed defaults to the timeline of followed users"""
+        post = self._post(self.author, 'Followed post')
+        self._post(User.objects.create_user(username='other'), 'Other')
+        self.client.login(username='reader', password='testpass123')
+
+        response = self.client.get(reverse('community:social_feed'))
+        self.assertEqual(response.context['feed'], 'following')
+        self.assertEqual(list(response.context['posts']), [post])
+
+        response = self.client.get(
+            reverse('community:social_feed'), {'feed': 'all'}
+        )
+        self.assertEqual(len(response.context['posts']), 2)
+
+    def test_benchmark_command(self):
+        """Test that the benchmark reports both strategies"""
+        self._post(self.author, 'Benchmarked')
+        out = StringIO()
+        call_command('benchmark_timelines', repeat=1, stdout=out)
+        self.assertIn('fan-out on write', out.getvalue())
+        self.assertIn('fan-out on read', out.getvalue())
+
+
+class LikeBufferTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.post = SocialPost.objects.create(
+            user=self.author,
+            content='Deadlift PR'
+        )
+        self.fans = [
+            User.objects.create_user(username=f'fan{number}')
+            for number in range(5)
+        ]
+
+    def test_likes_are_buffered_until_flushed(self):
+        """Test that likes are applied in one batch on flush"""
+        for fan in self.fans:
+            record_like(self.post, fan, True)
+        self.assertEqual(self.post.likes.count(), 0)
+
+        self.assertEqual(flush_like_buffer(), 5)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 5)
+        self.assertEqual(LikeEvent.objects.count(), 0)
+
+    def test_flush_keeps_latest_choice(self):
+        """Test that repeated clicks collapse to the user's last choice"""
+        record_like(self.post, self.fans[0], True)
+        record_like(self.post, self.fans[0], False)
+        record_like(self.post, self.fans[1], True)
+        record_like(self.post, self.fans[1], True)
+        flush_like_buffer(batch_size=2)
+
+        self.assertEqual(list(self.post.likes.all()), [self.fans[1]])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+        record_like(self.post, self.fans[1], False)
+        flush_like_buffer()
+        self.assertEqual(self.post.likes.count(), 0)
+
+    def test_endpoint_schedules_one_flush_per_interval(self):
+        """Test that likes are applied by one delayed flush job"""
+        url = reverse('community:like_post', args=[self.post.id])
+        for fan in self.fans[:2]:
+            self.client.force_login(fan)
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(url)
+            # Until the flush, each fan sees their own pending like
+            self.assertEqual(response.json()['like_count'], 1)
+
+        flush = Job.objects.get(name=flush_likes.name)
+        self.assertGreater(flush.run_at, timezone.now())
+        self.assertEqual(run_pending_jobs(), 0)
+        self.assertEqual(self.post.likes.count(), 0)
+
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(run_pending_jobs(), 1)
+        self.assertEqual(self.post.likes.count(), 2)
+
+        # The next like queues a new flush
+        self.client.force_login(self.fans[2])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url)
+        self.assertEqual(Job.objects.filter(status='queued').count(), 1)
+
+    def test_flush_command_applies_buffer(self):
+        """Test that the command applies buffered likes right away"""
+        record_like(self.post, self.fans[0], True)
+        out = StringIO()
+        call_command('flush_like_buffer', stdout=out)
+        self.assertIn('1 like events', out.getvalue())
+        self.assertEqual(self.post.likes.count(), 1)
@@ -0,0 +1,302 @@
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from .feed import feed_posts
+from .models import Follow, SocialPost, TimelineEntry
+
+TIMELINE_KEY = 'timeline:{}'
+# Timelines written per round trip when fanning out a post
+FANOUT_BATCH_SIZE = 500
+
+
+def timeline_key(user_id):
+    return TIMELINE_KEY.format(user_id)
+
+
+def post_score(post):
+    """Timelines are sorted by post creation time, newest first"""
+    return post.created_at.timestamp()
+
+
+def _before(entries, cursor):
+    """
+    The (post_id, score) entries after `cursor` in timeline order,
+    newest first. Cursors are the (score, post_id) of the last entry
+    read, so posts sharing a score are neither skipped nor repeated.
+    """
+    if cursor is not None:
+        entries = [
+            (post_id, score) for post_id, score in entries
+            if (score, post_id) < tuple(cursor)
+        ]
+    return sorted(
+        set(entries), key=lambda entry: (entry[1], entry[0]), reverse=True
+    )
+
+
+class DatabaseTimelineStore:
+    """
+    Timelines kept in the community_timelineentry table, with the
+    same sorted-set semantics as RedisTimelineStore.
+    """
+
+    def add(self, keys, members, max_length):
+        """
+        Add {post_id: score} members to every timeline in keys and
+        drop anything beyond the newest max_length entries.
+        """
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(key=key, post_id=post_id, score=score)
+                for key in keys
+                for post_id, score in members.items()
+            ],
+            ignore_conflicts=True
+        )
+        overflow = TimelineEntry.objects.filter(key__in=keys).annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F('key'),
+                order_by=[F('score').desc(), F('post_id').desc()]
+            )
+        ).filter(position__gt=max_length).values('pk')
+        TimelineEntry.objects.filter(pk__in=overflow).delete()
+
+    def range(self, key, cursor, count):
+        """
+        Return up to count (post_id, score) pairs, newest first,
+        after the (score, post_id) cursor unless it is None.
+        """
+        entries = TimelineEntry.objects.filter(key=key)
+        if cursor is not None:
+            score, post_id = cursor
+            entries = entries.filter(
+                Q(score__lt=score) | Q(score=score, post_id__lt=post_id)
+            )
+        return list(
+            entries.order_by('-score', '-post_id').values_list(
+                'post_id', 'score'
+            )[:count]
+        )
+
+    def remove(self, keys, post_ids):
+        TimelineEntry.objects.filter(
+            key__in=keys, post_id__in=post_ids
+        ).delete()
+
+
+class RedisTimelineStore:
+    """Timelines kept as Redis sorted sets of post ids"""
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def add(self, keys, members, max_length):
+        pipeline = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.zadd(key, members)
+            pipeline.zremrangebyrank(key, 0, -(max_length + 1))
+        pipeline.execute()
+
+    def range(self, key, cursor, count):
+        maximum = '+inf' if cursor is None else f'({cursor[0]}'
+        entries = self.client.zrevrangebyscore(
+            key, maximum, '-inf', start=0, num=count, withscores=True
+        )
+        # Redis orders members sharing a score as strings, not by post
+        # id, so whole groups of ties at either end of the page are read
+        tied_scores = []
+        if cursor is not None:
+            tied_scores.append(cursor[0])
+        if len(entries) == count:
+            tied_scores.append(entries[-1][1])
+        for score in tied_scores:
+            entries += self.client.zrangebyscore(
+                key, score, score, withscores=True
+            )
+        return _before(
+            [(int(post_id), score) for post_id, score in entries], cursor
+        )[:count]
+
+    def remove(self, keys, post_ids):
+        if not post_ids:
+            return
+        pipeline = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.zrem(key, *post_ids)
+        pipeline.execute()
+
+
+_timeline_store = None
+
+
+def get_timeline_store():
+    """Return the store configured by COMMUNITY_TIMELINE_REDIS_URL"""
+    global _timeline_store
+    if _timeline_store is None:
+        redis_url = getattr(settings, 'COMMUNITY_TIMELINE_REDIS_URL', '')
+        if redis_url:
+            _timeline_store = RedisTimelineStore(redis_url)
+        else:
+            _timeline_store = DatabaseTimelineStore()
+    return _timeline_store
+
+
+def _audience(author_id):
+    """
+    The timelines a new post by the author is pushed into, or just
+    the author's own when they have too many followers to fan out to.
+    """
+    limit = settings.COMMUNITY_FANOUT_LIMIT
+    follower_ids = list(
+        Follow.objects.filter(following_id=author_id).values_list(
+            'follower_id', flat=True
+        )[:limit + 1]
+    )
+    if len(follower_ids) > limit:
+        return [author_id]
+    return [author_id] + follower_ids
+
+
+def fan_out_post(post):
+    """Push a new post into the home timelines of its audience"""
+    store = get_timeline_store()
+    keys = [timeline_key(user_id) for user_id in _audience(post.user_id)]
+    for start in range(0, len(keys), FANOUT_BATCH_SIZE):
+        store.add(
+            keys[start:start + FANOUT_BATCH_SIZE],
+            {post.id: post_score(post)},
+            settings.COMMUNITY_TIMELINE_LENGTH
+        )
+
+
+def retract_post(post_id, author_id):
+    """Remove a deleted post from every timeline it was pushed into"""
+    follower_ids = Follow.objects.filter(
+        following_id=author_id
+    ).values_list('follower_id', flat=True)
+    keys = [timeline_key(author_id)] + [
+        timeline_key(user_id) for user_id in follower_ids
+    ]
+    get_timeline_store().remove(keys, [post_id])
+
+
+def _recent_posts(authors, cursor, count):
+    """Newest (post_id, score) pairs by the given authors from the database"""
+    posts = SocialPost.objects.filter(authors)
+    if cursor is not None:
+        score, post_id = cursor
+        created_at = datetime.fromtimestamp(score, dt_timezone.utc)
+        posts = posts.filter(
+            Q(created_at__lt=created_at) |
+            Q(created_at=created_at, id__lt=post_id)
+        )
+    return [
+        (post.id, post_score(post))
+        for post in posts.only('id', 'created_at').order_by(
+            '-created_at', '-id'
+        )[:count]
+    ]
+
+
+def _hydrate(entries, user):
+    """Load the posts behind timeline entries with one batched lookup"""
+    posts = feed_posts(user).in_bulk([post_id for post_id, _ in entries])
+    return [posts[post_id] for post_id, _ in entries if post_id in posts]
+
+
+def _page(entries, user, count):
+    """Merge entries newest first and hydrate one page of posts"""
+    merged = _before(entries, None)[:count]
+    next_cursor = (
+        (merged[-1][1], merged[-1][0]) if len(merged) == count else None
+    )
+    return _hydrate(merged, user), next_cursor
+
+
+def rebuild_timeline(user):
+    """
+    Fill a user's timeline from the database, for when the store has
+    nothing for them yet. Returns the entries it wrote.
+    """
+    followed = Follow.objects.filter(follower=user).values('following_id')
+    entries = _recent_posts(
+        Q(user=user) | Q(user__in=followed),
+        None,
+        settings.COMMUNITY_TIMELINE_LENGTH
+    )
+    if entries:
+        get_timeline_store().add(
+            [timeline_key(user.id)],
+            dict(entries),
+            settings.COMMUNITY_TIMELINE_LENGTH
+        )
+    return entries
+
+
+def read_timeline(user, cursor=None, count=20):
+    """
+    Read a page of a user's home timeline (fan-out on write). Posts
+    by authors too popular to fan out are merged in from the database.
+    Returns the posts and the (score, post_id) cursor to pass for the
+    next page, if any.
+    """
+    entries = get_timeline_store().range(
+        timeline_key(user.id), cursor, count
+    )
+    if not entries and cursor is None:
+        entries = rebuild_timeline(user)[:count]
+
+    popular = Follow.objects.filter(
+        follower=user,
+        following__author_stats__follower_count__gt=(
+            settings.COMMUNITY_FANOUT_LIMIT
+        )
+    ).values('following_id')
+    entries += _recent_posts(Q(user__in=popular), cursor, count)
+    return _page(entries, user, count)
+
+
+def read_timeline_from_database(user, cursor=None, count=20):
+    """
+    Build a page of a user's home timeline straight from the posts
+    table (fan-out on read), bypassing the timeline store.
+    """
+    followed = Follow.objects.filter(follower=user).values('following_id')
+    entries = _recent_posts(
+        Q(user=user) | Q(user__in=followed), cursor, count
+    )
+    return _page(entries, user, count)
+
+
+def follow(user, target):
+    """Follow another user, copying their recent posts into the timeline"""
+    _, created = Follow.objects.get_or_create(
+        follower=user, following=target
+    )
+    if created:
+        entries = _recent_posts(
+            Q(user=target), None, settings.COMMUNITY_TIMELINE_LENGTH
+        )
+        if entries:
+            get_timeline_store().add(
+                [timeline_key(user.id)],
+                dict(entries),
+                settings.COMMUNITY_TIMELINE_LENGTH
+            )
+    return created
+
+
+def unfollow(user, target):
+    """Stop following a user and drop their posts from the timeline"""
+    deleted, _ = Follow.objects.filter(
+        follower=user, following=target
+    ).delete()
+    if deleted:
+        post_ids = SocialPost.objects.filter(user=target).order_by(
+            '-created_at'
+        ).values_list('id', flat=True)[:settings.COMMUNITY_TIMELINE_LENGTH]
+        get_timeline_store().remove([timeline_key(user.id)], list(post_ids))
+    return bool(deleted)
@@ -58,6 +58,16 @@ urlpatterns = [
         views.add_comment,
         name='add_comment'
     ),
+    path(
+        'social/<int:post_id>/like/',
+        views.like_post,
+        name='like_post'
+    ),
+    path(
+        'social/<int:post_id>/unlike/',
+        views.unlike_post,
+        name='unlike_post'
+    ),
     path('workouts/', views.group_workouts, name='group_workouts'),
     path('workouts/create/', views.create_workout, name='create_workout'),
     path(
@@ -90,4 +100,14 @@ urlpatterns = [
         views.user_profile,
         name='user_profile'
     ),
+    path(
+        'profile/<str:username>/follow/',
+        views.follow_user,
+        name='follow_user'
+    ),
+    path(
+        'profile/<str:username>/unfollow/',
+        views.unfollow_user,
+        name='unfollow_user'
+    ),
 ]
@@ -6,12 +6,22 @@ from django.contrib.auth.models import User
 from .models import (
     SocialPost, Comment, Challenge, GroupWorkout,
     UserBadge, ProgressEntry, Achievement, ChallengeParticipation,
-    ChallengeRequirement, ChallengeReward, Badge
+    ChallengeRequirement, ChallengeReward, Badge, Follow
 )
 from .forms import CommentForm
+from .feed import feed_posts
+from .likes import record_like
+from .timeline import follow, read_timeline, unfollow
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.utils.dateparse import parse_datetime
+from fitness_ecommerce.pagination import (
+    CursorPage, decode_cursor, encode_cursor, paginate_by_cursor
+)
+
+FEED_PAGE_SIZE = 20
+# Home timeline cursors hold the (score, post_id) of the last post shown
+TIMELINE_ORDERING = ['-score', '-post_id']
 
 # Create your views here.
 
@@ -21,7 +31,13 @@ def community_home(request):
     challenges = Challenge.objects.filter(
         is_active=True
     ).order_by('-start_date')
-    recent_posts = SocialPost.objects.all().order_by('-created_at')[:5]
+    if request.user.following.exists():
+        recent_posts, _ = read_timeline(request.user, count=5)
+    else:
+        # Nothing to follow yet, so show what the community is posting
+        recent_posts = feed_posts(request.user).order_by(
+            '-created_at', '-id'
+        )[:5]
     upcoming_workouts = GroupWorkout.objects.filter(
         date_time__gte=timezone.now()
     ).order_by('date_time')
@@ -172,11 +188,40 @@ def challenge_detail(request, challenge_id):
 
 @login_required
 def social_feed(request):
-    posts = SocialPost.objects.all().order_by('-created_at')
+    feed = request.GET.get('feed', '')
+    if feed != 'all' and request.user.following.exists():
+        # Home timeline of the people the user follows
+        feed = 'following'
+        decoded = decode_cursor(
+            request.GET.get('cursor'), TIMELINE_ORDERING
+        )
+        try:
+            cursor = (float(decoded[0][0]), int(decoded[0][1]))
+        except (TypeError, ValueError):
+            cursor = None
+        timeline, next_cursor = read_timeline(
+            request.user, cursor, FEED_PAGE_SIZE
+        )
+        posts = CursorPage(
+            timeline,
+            None if next_cursor is None else encode_cursor(
+                TIMELINE_ORDERING, list(next_cursor)
+            ),
+            # Timelines only page towards older posts
+            None
+        )
+    else:
+        feed = 'all'
+        posts = paginate_by_cursor(
+            feed_posts(request.user),
+            ['-created_at', '-id'],
+            request.GET.get('cursor'),
+            page_size=FEED_PAGE_SIZE
+        )
     return render(
         request,
         'community/social_feed.html',
-        {'posts': posts}
+        {'posts': posts, 'feed': feed}
     )
 
 
@@ -450,11 +495,17 @@ def user_profile(request, username):
         user=user
     ).order_by('-date')
 
+    is_following = Follow.objects.filter(
+        follower=request.user, following=user
+    ).exists()
+
     return render(
         request,
         'community/user_profile.html',
         {
             'profile_user': user,
+            'is_following': is_following,
+            'follower_count': user.followers.count(),
             'posts': posts,
             'achievements': achievements,
             'badges': badges,
@@ -712,9 +763,7 @@ def add_comment(request, post_id):
                     'user': {
                         'username': comment.user.username,
                         'profile_picture': (
-                            comment.user.userprofile.profile_picture.url
-                            if comment.user.userprofile.profile_picture
-                            else None
+                            comment.user.userprofile.avatar_url(32)
                         )
                     }
                 }
@@ -737,6 +786,48 @@ def add_comment(request, post_id):
     return redirect('community:post_detail', post_id=post_id)
 
 
+@login_required
+@require_POST
+def like_post(request, post_id):
+    post = get_object_or_404(SocialPost, id=post_id)
+    return JsonResponse({
+        'success': True,
+        'liked': True,
+        'like_count': record_like(post, request.user, True)
+    })
+
+
+@login_required
+@require_POST
+def unlike_post(request, post_id):
+    post = get_object_or_404(SocialPost, id=post_id)
+    return JsonResponse({
+        'success': True,
+        'liked': False,
+        'like_count': record_like(post, request.user, False)
+    })
+
+
+@login_required
+@require_POST
+def follow_user(request, username):
+    target = get_object_or_404(User, username=username)
+    if target == request.user:
+        messages.error(request, 'You cannot follow yourself.')
+    elif follow(request.user, target):
+        messages.success(request, f'You are now following {target.username}.')
+    return redirect('community:user_profile', username=username)
+
+
+@login_required
+@require_POST
+def unfollow_user(request, username):
+    target = get_object_or_404(User, username=username)
+    if unfollow(request.user, target):
+        messages.success(request, f'You unfollowed {target.username}.')
+    return redirect('community:user_profile', username=username)
+
+
 @login_required
 def c25k_challenge(request):
     """Display the C25K challenge details."""
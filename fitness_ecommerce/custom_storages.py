@@ -1,12 +1,17 @@
 from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+from django.core.files.utils import validate_file_name
 from storages.backends.s3boto3 import S3Boto3Storage
+import hashlib
 import logging
+import posixpath
 
 logger = logging.getLogger(__name__)
 
 
 class StaticStorage(S3Boto3Storage):
-    location = settings.STATICFILES_LOCATION
+    location = getattr(settings, 'STATICFILES_LOCATION', 'static')
     file_overwrite = True
     object_parameters = {
         'CacheControl': 'max-age=86400',
@@ -26,7 +31,7 @@ class StaticStorage(S3Boto3Storage):
 
 
 class MediaStorage(S3Boto3Storage):
-    location = settings.MEDIAFILES_LOCATION
+    location = getattr(settings, 'MEDIAFILES_LOCATION', 'media')
     file_overwrite = True
     object_parameters = {
         'CacheControl': 'max-age=86400',
@@ -44,3 +49,52 @@ class MediaStorage(S3Boto3Storage):
         except Exception as e:
             logger.error(f"Error saving media file {name}: {str(e)}")
             raise
+
+
+class ContentHashedStorageMixin:
+    """
+    Stores files under names that include a digest of their content, so
+    a stored name never changes meaning and can be cached indefinitely.
+    Saving content that is already stored returns the existing name
+    without writing it again.
+    """
+    digest_length = 16
+
+    def hashed_name(self, name, content, max_length=None):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        root, ext = posixpath.splitext(name)
+        suffix = f'.{digest.hexdigest()[:self.digest_length]}{ext}'
+        if max_length is not None:
+            root = root[:max_length - len(suffix)]
+        return root + suffix
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content, max_length)
+        validate_file_name(name, allow_relative_path=True)
+        if self.exists(name):
+            logger.info(f"Media file already stored: {name}")
+            return name
+        return self._save(name, content)
+
+    def delete(self, name):
+        # Identical uploads share one stored file, so deleting it for one
+        # of them could break the others. Unreferenced files are left
+        # for the bucket's lifecycle rules to expire.
+        logger.info(f"Keeping content-hashed media file: {name}")
+
+
+class HashedMediaStorage(ContentHashedStorageMixin, MediaStorage):
+    object_parameters = {
+        'CacheControl': 'public, max-age=31536000, immutable',
+    }
+
+
+class HashedFileSystemStorage(ContentHashedStorageMixin, FileSystemStorage):
+    """Content-hashed media on the local filesystem, for development"""
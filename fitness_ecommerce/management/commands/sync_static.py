@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from fitness_ecommerce.static_sync import LocalTarget, S3Target, sync
+
+
+class Command(BaseCommand):
+    help = (
+        'Uploads the collected static files that changed since the last '
+        'deploy to S3, in parallel'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            default=None,
+            help='Directory of collected static files (STATIC_ROOT)'
+        )
+        parser.add_argument(
+            '--target-dir',
+            default=None,
+            help='Publish to this local directory instead of S3'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Number of files to hash and upload at a time'
+        )
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='Remove published files that no longer exist locally'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the changes without uploading anything'
+        )
+
+    def handle(self, *args, **options):
+        source = options['source'] or settings.STATIC_ROOT
+        if options['target_dir']:
+            target = LocalTarget(options['target_dir'])
+        elif getattr(settings, 'AWS_STORAGE_BUCKET_NAME', None):
+            target = S3Target(
+                settings.AWS_STORAGE_BUCKET_NAME,
+                getattr(settings, 'STATICFILES_LOCATION', 'static')
+            )
+        else:
+            raise CommandError(
+                'Set AWS_STORAGE_BUCKET_NAME or pass --target-dir'
+            )
+
+        plan = sync(
+            source,
+            target,
+            workers=options['workers'],
+            delete=options['delete'],
+            dry_run=options['dry_run']
+        )
+        if options['dry_run']:
+            for path in plan.upload:
+                self.stdout.write(f'Would upload {path}')
+            for path in plan.delete:
+                self.stdout.write(f'Would delete {path}')
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully uploaded {len(plan.upload)} static files '
+                f'({plan.unchanged} unchanged, {len(plan.delete)} deleted)'
+            )
+        )
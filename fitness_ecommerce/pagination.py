@@ -0,0 +1,152 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+
+
+class CursorPage:
+    """
+    One page of a keyset-paginated queryset. Cursors are opaque
+    tokens for the neighbouring pages, or None at either end.
+    """
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        # Keep full precision, unlike DjangoJSONEncoder
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'Cannot encode {type(value).__name__} in a cursor')
+
+
+def encode_cursor(ordering, values, forward=True):
+    payload = json.dumps(
+        {'o': ordering, 'v': values, 'f': forward},
+        default=_json_default,
+        separators=(',', ':')
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, ordering):
+    """
+    Return the (values, forward) stored in a cursor, or None if
+    the cursor is malformed or was made for a different ordering.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, forward = payload['v'], payload['f']
+        if payload['o'] != list(ordering) or len(values) != len(ordering):
+            return None
+    except (
+        binascii.Error, ValueError, UnicodeDecodeError,
+        KeyError, TypeError
+    ):
+        return None
+    return values, bool(forward)
+
+
+def _field_name(field):
+    return field.lstrip('-')
+
+
+def _reverse(field):
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+def _keyset_filter(ordering, values, forward):
+    """
+    Match the rows strictly after (or before) the cursor row in
+    the given ordering, as an OR of progressively longer ties.
+    """
+    keyset = Q()
+    for index, field in enumerate(ordering):
+        # Moving forward along a descending field means smaller values
+        lookup = 'lt' if field.startswith('-') == forward else 'gt'
+        clause = Q(**{f'{_field_name(field)}__{lookup}': values[index]})
+        for tied_field, tied_value in zip(ordering[:index], values[:index]):
+            clause &= Q(**{_field_name(tied_field): tied_value})
+        keyset |= clause
+    return keyset
+
+
+def paginate_by_cursor(queryset, ordering, cursor=None, page_size=20):
+    """
+    Fetch one page of a queryset ordered by the given fields, the
+    last of which must be unique (usually 'id' or '-id'). Each page
+    costs one query with no COUNT and no OFFSET, however deep it is.
+    """
+    ordering = list(ordering)
+    decoded = decode_cursor(cursor, ordering)
+    values, forward = decoded if decoded else (None, True)
+
+    if values is not None:
+        try:
+            queryset = queryset.filter(
+                _keyset_filter(ordering, values, forward)
+            )
+        except (ValidationError, ValueError, TypeError):
+            values, forward = None, True
+
+    cursor_fields = {
+        f'cursor_{index}': F(_field_name(field))
+        for index, field in enumerate(ordering)
+    }
+    order_by = ordering if forward else [_reverse(f) for f in ordering]
+    rows = list(
+        queryset.annotate(**cursor_fields).order_by(*order_by)[
+            :page_size + 1
+        ]
+    )
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if not forward:
+        rows.reverse()
+
+    def row_cursor(row, direction):
+        return encode_cursor(
+            ordering,
+            [getattr(row, name) for name in cursor_fields],
+            direction
+        )
+
+    has_next = has_more if forward else values is not None
+    has_previous = values is not None if forward else has_more
+    return CursorPage(
+        rows,
+        row_cursor(rows[-1], True) if rows and has_next else None,
+        row_cursor(rows[0], False) if rows and has_previous else None,
+    )
@@ -0,0 +1,109 @@
+import hashlib
+import posixpath
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+
+
+def rendition_widths(renditions, extension):
+    """
+    [(width, name), ...] of the renditions in one format, narrowest
+    first, from renditions keyed by '<width>.<extension>'
+    """
+    return sorted(
+        (int(key.split('.')[0]), name)
+        for key, name in renditions.items()
+        if key.endswith(f'.{extension}')
+    )
+
+
+def covering_rendition(widths, width):
+    """
+    The name of the narrowest rendition at least `width` wide, or of
+    the widest one, from rendition_widths()
+    """
+    return next(
+        (name for rendition_width, name in widths if rendition_width >= width),
+        widths[-1][1]
+    )
+
+
+def store_renditions(instance, content, render, storage, directory,
+                     unchanged, hash_field, renditions_field):
+    """
+    Store the renditions `render(content)` returns, keyed by
+    '<width>.<extension>', under `directory` as '<hash>_<key>', and
+    record them on the instance's row if it still matches `unchanged`.
+    Content identical to the last rendered source is skipped, and the
+    replaced renditions are deleted. Returns True if renditions were
+    recorded.
+    """
+    content_hash = hashlib.sha256(content).hexdigest()
+    previous = getattr(instance, renditions_field)
+    if content_hash == getattr(instance, hash_field) and previous:
+        # The same image again; its renditions still apply
+        return False
+    try:
+        rendered = render(content)
+    except OSError:
+        # Not an image Pillow can read; templates use the source as it is
+        return False
+
+    names = {
+        key: storage.save(
+            posixpath.join(directory, f'{content_hash[:16]}_{key}'),
+            ContentFile(data)
+        )
+        for key, data in rendered.items()
+    }
+    # Only record the renditions if the source hasn't changed meanwhile
+    rows = type(instance).objects.filter(pk=instance.pk)
+    stored = rows.filter(unchanged).update(**{
+        hash_field: content_hash,
+        renditions_field: names,
+    })
+
+    # Storages that overwrite can hand out the same name again, so
+    # names the row still uses are never deleted
+    live = rows.values_list(renditions_field, flat=True).first() or {}
+    stale = set((previous if stored else names).values())
+    for name in stale - set(live.values()):
+        storage.delete(name)
+    return bool(stored)
+
+
+class RenditionsCommand(BaseCommand):
+    """
+    Queues `job` for every row of `get_queryset()` whose renditions were
+    never made, or for every row with --all
+    """
+    job = None
+    hash_field = None
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Regenerate renditions for every image'
+        )
+
+    def handle(self, *args, **options):
+        queryset = self.get_queryset()
+        if options['all']:
+            # Make the job regenerate instead of skipping unchanged images
+            queryset.update(**{self.hash_field: ''})
+        else:
+            queryset = queryset.filter(**{self.hash_field: ''})
+
+        queued_count = 0
+        for pk in queryset.values_list('pk', flat=True).iterator():
+            self.job.delay(pk)
+            queued_count += 1
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully queued renditions for {queued_count} '
+                f'{queryset.model._meta.verbose_name_plural}'
+            )
+        )
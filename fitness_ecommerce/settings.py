@@ -57,6 +57,7 @@ INSTALLED_APPS = [
     'newsletter',
     'profiles',
     'community',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -117,6 +118,69 @@ if 'test' in sys.argv:
         }
     }
 
+# Product search: 'database' uses PostgreSQL full-text search or SQLite
+# FTS5. 'memory' is an in-process inverted index; every process keeps
+# its own copy, so only opt in for single-process deployments
+PRODUCT_SEARCH_BACKEND = os.getenv('PRODUCT_SEARCH_BACKEND', 'database')
+
+# Premium content: paths that need an active subscription, and how
+# long each user's entitlement is cached (refusals are never cached)
+SUBSCRIPTION_PROTECTED_PATHS = [
+    '/workouts/premium/',
+    '/nutrition/premium/',
+    '/community/premium/',
+]
+SUBSCRIPTION_ENTITLEMENT_CACHE_TIMEOUT = 300
+
+# Stripe webhooks are stored on arrival and processed by a background
+# job run by the runworker process; failed events are retried after
+# STRIPE_WEBHOOK_RETRY_DELAY seconds, doubling each time
+STRIPE_WEBHOOK_BATCH_SIZE = 100
+STRIPE_WEBHOOK_MAX_ATTEMPTS = 8
+STRIPE_WEBHOOK_RETRY_DELAY = 60
+
+# Background jobs run by the runworker command: jobs claimed per batch,
+# the first retry delay in seconds (doubled for each retry), and how
+# long a running job may go unfinished before another worker takes it
+JOBS_BATCH_SIZE = 10
+JOBS_RETRY_DELAY = 30
+JOBS_STALE_AFTER = 600
+
+# Product image renditions are made from uploaded images. Products that
+# only have an external image_url get renditions too when
+# PRODUCT_IMAGE_INGEST_URLS is on, downloading at most
+# PRODUCT_IMAGE_MAX_DOWNLOAD_BYTES per image
+PRODUCT_IMAGE_INGEST_URLS = (
+    os.getenv('PRODUCT_IMAGE_INGEST_URLS', 'False') == 'True'
+)
+PRODUCT_IMAGE_MAX_DOWNLOAD_BYTES = 10 * 1024 * 1024
+
+# Newsletter campaigns save their progress every NEWSLETTER_BATCH_SIZE
+# recipients and send at most NEWSLETTER_RATE_LIMITS messages per second
+# to each recipient domain ('default' for the rest). Each job run sends
+# for up to NEWSLETTER_JOB_TIME_LIMIT seconds before queueing the next.
+NEWSLETTER_BATCH_SIZE = 100
+NEWSLETTER_RATE_LIMITS = {
+    'default': 20,
+    'gmail.com': 10,
+}
+NEWSLETTER_JOB_TIME_LIMIT = 300
+
+# Community home timelines: posts are pushed into the timelines of the
+# author's followers, except for authors with more than
+# COMMUNITY_FANOUT_LIMIT followers whose posts are merged in on read.
+# Timelines live in Redis when COMMUNITY_TIMELINE_REDIS_URL is set and
+# in a database table otherwise.
+COMMUNITY_TIMELINE_LENGTH = 500
+COMMUNITY_FANOUT_LIMIT = 1000
+COMMUNITY_TIMELINE_REDIS_URL = os.getenv('COMMUNITY_TIMELINE_REDIS_URL', '')
+
+# Likes are buffered and applied in batches by a background job queued
+# LIKE_FLUSH_INTERVAL seconds after the first like it picks up; the
+# flush_like_buffer command applies them immediately
+LIKE_FLUSH_INTERVAL = 5
+LIKE_FLUSH_BATCH_SIZE = 1000
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -268,6 +332,34 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 # Cart settings
 CART_SESSION_ID = 'cart'
+CART_SUMMARY_CACHE_TIMEOUT = 300
+
+# Cache: cart summaries and entitlements are invalidated by whichever
+# process changes them, so production needs a cache every web and worker
+# process shares: Redis when REDIS_URL is set, otherwise the django_cache
+# table made by `manage.py createcachetable`.
+# The single-process development server keeps an in-memory cache.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+elif DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'fitness-ecommerce',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        }
+    }
 
 # Authentication settings
 AUTHENTICATION_BACKENDS = [
@@ -311,6 +403,11 @@ LOGGING = {
 # Handler for 404 errors
 handler404 = 'home.views.custom_404'
 
+# Store uploaded media under names that include a digest of their
+# content, served with a year-long immutable Cache-Control on S3.
+# Identical uploads share one file, so media files are never deleted
+MEDIA_CONTENT_HASHED = os.getenv('MEDIA_CONTENT_HASHED', 'False') == 'True'
+
 # AWS Settings
 if (
     'USE_AWS' in os.environ and
@@ -332,7 +429,14 @@ if (
     # Static and media files
     STATICFILES_STORAGE = 'fitness_ecommerce.custom_storages.StaticStorage'
     STATICFILES_LOCATION = 'static'
-    DEFAULT_FILE_STORAGE = 'fitness_ecommerce.custom_storages.MediaStorage'
+    if MEDIA_CONTENT_HASHED:
+        DEFAULT_FILE_STORAGE = (
+            'fitness_ecommerce.custom_storages.HashedMediaStorage'
+        )
+    else:
+        DEFAULT_FILE_STORAGE = (
+            'fitness_ecommerce.custom_storages.MediaStorage'
+        )
     MEDIAFILES_LOCATION = 'media'
 
     # Override static and media URLs in production
@@ -343,4 +447,9 @@ else:
         'whitenoise.storage.'
         'CompressedManifestStaticFilesStorage'
     )
-    DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
+    if MEDIA_CONTENT_HASHED:
+        DEFAULT_FILE_STORAGE = (
+            'fitness_ecommerce.custom_storages.HashedFileSystemStorage'
+        )
+    else:
+        DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
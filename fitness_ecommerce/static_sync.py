@@ -0,0 +1,193 @@
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Where the manifest of the last published files is kept at the target
+MANIFEST_NAME = 'staticfiles-sync.json'
+# Files larger than this are uploaded to S3 in parallel parts
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_manifest(root, workers=8):
+    """Map the path of every file under `root` to its SHA-256"""
+    paths = []
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            paths.append(
+                os.path.relpath(path, root).replace(os.sep, '/')
+            )
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        hashes = executor.map(
+            file_hash, [os.path.join(root, path) for path in paths]
+        )
+        return dict(zip(paths, hashes))
+
+
+class SyncPlan:
+    """The files a sync uploads and deletes, and the manifest it publishes"""
+
+    def __init__(self, manifest):
+        self.manifest = manifest
+        self.upload = []
+        self.delete = []
+        self.unchanged = 0
+
+
+def plan_sync(manifest, published):
+    """Compare a local manifest with the one last published"""
+    plan = SyncPlan(manifest=manifest)
+    for path, digest in sorted(manifest.items()):
+        if published.get(path) == digest:
+            plan.unchanged += 1
+        else:
+            plan.upload.append(path)
+    plan.delete = sorted(set(published) - set(manifest))
+    return plan
+
+
+def sync(root, target, workers=8, delete=False, dry_run=False):
+    """
+    Publish the files under `root` that changed since the last sync.
+    The manifest is written last, so an interrupted sync uploads the
+    remaining files next time. Returns the SyncPlan.
+    """
+    published = target.read_manifest()
+    plan = plan_sync(build_manifest(root, workers), published)
+    if not delete:
+        # Files left in place stay in the manifest for a later delete
+        plan.manifest = {
+            **{path: published[path] for path in plan.delete},
+            **plan.manifest
+        }
+        plan.delete = []
+    if dry_run:
+        return plan
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # list() re-raises the first failed upload
+        list(executor.map(
+            lambda path: target.upload(os.path.join(root, path), path),
+            plan.upload
+        ))
+    if plan.delete:
+        target.delete(plan.delete)
+    target.write_manifest(plan.manifest)
+    return plan
+
+
+def content_headers(path, cache_control):
+    content_type, encoding = mimetypes.guess_type(path)
+    headers = {
+        'ContentType': content_type or 'application/octet-stream',
+        'CacheControl': cache_control,
+    }
+    if encoding:
+        headers['ContentEncoding'] = encoding
+    return headers
+
+
+class S3Target:
+    """Static files in an S3 bucket, under `prefix`"""
+
+    def __init__(self, bucket, prefix, client=None,
+                 cache_control='max-age=86400'):
+        if client is None:
+            import boto3
+            client = boto3.client('s3')
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.cache_control = cache_control
+
+    def key(self, path):
+        return posixpath.join(self.prefix, path)
+
+    def read_manifest(self):
+        try:
+            response = self.client.get_object(
+                Bucket=self.bucket, Key=self.key(MANIFEST_NAME)
+            )
+        except self.client.exceptions.NoSuchKey:
+            return {}
+        return json.loads(response['Body'].read())
+
+    def upload(self, source, path):
+        from boto3.s3.transfer import TransferConfig
+        logger.info(f"Uploading static file: {path}")
+        self.client.upload_file(
+            source,
+            self.bucket,
+            self.key(path),
+            ExtraArgs=content_headers(path, self.cache_control),
+            Config=TransferConfig(
+                multipart_threshold=MULTIPART_THRESHOLD,
+                multipart_chunksize=MULTIPART_THRESHOLD
+            )
+        )
+
+    def delete(self, paths):
+        # S3 deletes at most 1000 keys per request
+        for start in range(0, len(paths), 1000):
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={'Objects': [
+                    {'Key': self.key(path)}
+                    for path in paths[start:start + 1000]
+                ]}
+            )
+
+    def write_manifest(self, manifest):
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self.key(MANIFEST_NAME),
+            Body=json.dumps(manifest, sort_keys=True).encode(),
+            ContentType='application/json',
+            CacheControl='no-cache'
+        )
+
+
+class LocalTarget:
+    """Static files in a local directory, standing in for S3"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def read_manifest(self):
+        try:
+            with open(os.path.join(self.directory, MANIFEST_NAME)) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def upload(self, source, path):
+        destination = os.path.join(self.directory, path)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copyfile(source, destination)
+
+    def delete(self, paths):
+        for path in paths:
+            try:
+                os.remove(os.path.join(self.directory, path))
+            except FileNotFoundError:
+                pass
+
+    def write_manifest(self, manifest):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, MANIFEST_NAME), 'w') as file:
+            json.dump(manifest, file, sort_keys=True)
@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'newsletter',
     'profiles',
     'community',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -163,6 +164,45 @@ EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
 # Crispy forms
 CRISPY_TEMPLATE_PACK = 'bootstrap5'
 
+# Cart settings
+CART_SUMMARY_CACHE_TIMEOUT = 300
+
+# Subscription settings
+SUBSCRIPTION_PROTECTED_PATHS = [
+    '/workouts/premium/',
+    '/nutrition/premium/',
+    '/community/premium/',
+]
+SUBSCRIPTION_ENTITLEMENT_CACHE_TIMEOUT = 300
+
+# Stripe webhook settings
+STRIPE_WEBHOOK_BATCH_SIZE = 100
+STRIPE_WEBHOOK_MAX_ATTEMPTS = 8
+STRIPE_WEBHOOK_RETRY_DELAY = 60
+
+# Background job settings
+JOBS_BATCH_SIZE = 10
+JOBS_RETRY_DELAY = 30
+JOBS_STALE_AFTER = 600
+
+# Product image settings
+PRODUCT_IMAGE_INGEST_URLS = False
+PRODUCT_IMAGE_MAX_DOWNLOAD_BYTES = 10 * 1024 * 1024
+
+# Newsletter campaign settings
+NEWSLETTER_BATCH_SIZE = 100
+NEWSLETTER_RATE_LIMITS = {}
+NEWSLETTER_JOB_TIME_LIMIT = 300
+
+# Community timeline settings
+COMMUNITY_TIMELINE_LENGTH = 500
+COMMUNITY_FANOUT_LIMIT = 1000
+COMMUNITY_TIMELINE_REDIS_URL = ''
+
+# Like buffer settings
+LIKE_FLUSH_INTERVAL = 5
+LIKE_FLUSH_BATCH_SIZE = 1000
+
 # Disable password hashing for faster tests
 PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.MD5PasswordHasher',
@@ -177,6 +217,7 @@ CSRF_COOKIE_SECURE = False
 STRIPE_PUBLIC_KEY = 'pk_test_mock123'
 STRIPE_SECRET_KEY = 'sk_test_mock456'
 STRIPE_WH_SECRET = 'whsec_mock789'
+STRIPE_WEBHOOK_SECRET = STRIPE_WH_SECRET
 
 # AWS settings - Using mock/test values
 USE_AWS = False  # Disable AWS for testing
@@ -188,3 +229,4 @@ AWS_SECRET_ACCESS_KEY = 'test-secret'
 # Static files storage
 STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
 DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
+MEDIA_CONTENT_HASHED = False
@@ -0,0 +1,196 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from django.core.cache.backends.redis import RedisCache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase
+from .custom_storages import HashedFileSystemStorage, HashedMediaStorage
+from .static_sync import MANIFEST_NAME, LocalTarget, S3Target, sync
+
+
+class ContentHashedStorageTests(TestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.storage = HashedFileSystemStorage(
+            location=self.location,
+            base_url='/media/'
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.location)
+
+    def test_names_include_content_digest(self):
+        """Test that stored names change with the content"""
+        first = self.storage.save('images/photo.jpg', ContentFile(b'one'))
+        second = self.storage.save('images/photo.jpg', ContentFile(b'two'))
+        self.assertRegex(first, r'^images/photo\.[0-9a-f]{16}\.jpg$')
+        self.assertNotEqual(first, second)
+        with self.storage.open(first) as stored:
+            self.assertEqual(stored.read(), b'one')
+
+    def test_identical_uploads_share_one_file(self):
+        """Test that saving stored content again writes nothing"""
+        name = self.storage.save('images/photo.jpg', ContentFile(b'same'))
+        path = self.storage.path(name)
+        os.utime(path, (0, 0))
+
+        again = self.storage.save('images/photo.jpg', ContentFile(b'same'))
+        self.assertEqual(again, name)
+        self.assertEqual(os.path.getmtime(path), 0)
+        self.assertEqual(os.listdir(os.path.dirname(path)), [
+            os.path.basename(path)
+        ])
+
+    def test_names_respect_max_length(self):
+        """Test that long names are shortened to fit the field"""
+        name = self.storage.save(
+            'images/' + 'a' * 80 + '.jpg', ContentFile(b'long'), max_length=50
+        )
+        self.assertEqual(len(name), 50)
+        self.assertTrue(name.endswith('.jpg'))
+
+    def test_shared_files_are_not_deleted(self):
+        """Test that deleting leaves files other uploads may share"""
+        name = self.storage.save('images/photo.jpg', ContentFile(b'kept'))
+        self.storage.delete(name)
+        self.assertTrue(self.storage.exists(name))
+
+    def test_s3_objects_are_cached_as_immutable(self):
+        """Test that hashed S3 media is served with a year-long cache"""
+        self.assertEqual(
+            HashedMediaStorage.object_parameters['CacheControl'],
+            'public, max-age=31536000, immutable'
+        )
+
+
+class FakeS3:
+    """Just enough of a boto3 S3 client, keeping objects in a dict"""
+
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self):
+        self.objects = {}
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
+        return {'Body': io.BytesIO(self.objects[(Bucket, Key)]['Body'])}
+
+    def put_object(self, Bucket, Key, Body, **headers):
+        self.objects[(Bucket, Key)] = {'Body': Body, **headers}
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs, Config):
+        with open(Filename, 'rb') as source:
+            self.put_object(Bucket, Key, source.read(), **ExtraArgs)
+
+    def delete_objects(self, Bucket, Delete):
+        for deleted in Delete['Objects']:
+            self.objects.pop((Bucket, deleted['Key']), None)
+
+
+class StaticSyncTests(TestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.published = tempfile.mkdtemp()
+        self.target = LocalTarget(self.published)
+        self._write('css/base.css', 'body {}')
+        self._write('js/app.js', 'run();')
+
+    def tearDown(self):
+        shutil.rmtree(self.source)
+        shutil.rmtree(self.published)
+
+    def _write(self, path, text):
+        path = os.path.join(self.source, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            file.write(text)
+
+    def test_only_changed_files_are_uploaded(self):
+        """Test that syncs upload new and modified files only"""
+        plan = sync(self.source, self.target, workers=2)
+        self.assertEqual(plan.upload, ['css/base.css', 'js/app.js'])
+        self.assertTrue(
+            os.path.exists(os.path.join(self.published, 'js/app.js'))
+        )
+
+        plan = sync(self.source, self.target, workers=2)
+        self.assertEqual((plan.upload, plan.unchanged), ([], 2))
+
+        self._write('js/app.js', 'run(1);')
+        self._write('img/logo.svg', '<svg/>')
+        plan = sync(self.source, self.target, workers=2)
+        self.assertEqual(plan.upload, ['img/logo.svg', 'js/app.js'])
+        with open(os.path.join(self.published, 'js/app.js')) as file:
+            self.assertEqual(file.read(), 'run(1);')
+
+    def test_dry_run_changes_nothing(self):
+        """Test that dry runs report uploads without publishing"""
+        plan = sync(self.source, self.target, dry_run=True)
+        self.assertEqual(len(plan.upload), 2)
+        self.assertEqual(os.listdir(self.published), [])
+
+    def test_removed_files_are_deleted_on_request(self):
+        """Test that stale files are only removed with delete=True"""
+        sync(self.source, self.target)
+        os.remove(os.path.join(self.source, 'js/app.js'))
+
+        plan = sync(self.source, self.target)
+        self.assertEqual(plan.delete, [])
+        self.assertIn('js/app.js', self.target.read_manifest())
+
+        plan = sync(self.source, self.target, delete=True)
+        self.assertEqual(plan.delete, ['js/app.js'])
+        self.assertFalse(
+            os.path.exists(os.path.join(self.published, 'js/app.js'))
+        )
+
+    def test_s3_target_uploads_under_prefix_with_headers(self):
+        """Test that S3 objects get the prefix and content headers"""
+        client = FakeS3()
+        target = S3Target('bucket', 'static', client=client)
+        sync(self.source, target)
+
+        uploaded = client.objects[('bucket', 'static/css/base.css')]
+        self.assertEqual(uploaded['Body'], b'body {}')
+        self.assertEqual(uploaded['ContentType'], 'text/css')
+        self.assertEqual(uploaded['CacheControl'], 'max-age=86400')
+        manifest = client.objects[('bucket', f'static/{MANIFEST_NAME}')]
+        self.assertEqual(
+            set(json.loads(manifest['Body'])), {'css/base.css', 'js/app.js'}
+        )
+        self.assertEqual(sync(self.source, target).upload, [])
+
+    def test_command_syncs_to_local_directory(self):
+        """Test that sync_static publishes to a stand-in directory"""
+        out = io.StringIO()
+        call_command(
+            'sync_static',
+            source=self.source,
+            target_dir=self.published,
+            dry_run=True,
+            stdout=out
+        )
+        self.assertIn('Would upload css/base.css', out.getvalue())
+
+        call_command(
+            'sync_static',
+            source=self.source,
+            target_dir=self.published,
+            stdout=out
+        )
+        self.assertIn('Successfully uploaded 2 static files', out.getvalue())
+
+
+class SharedCacheTests(TestCase):
+    def test_redis_cache_backend_loads(self):
+        """Test that the REDIS_URL cache backend has its client library"""
+        cache = RedisCache('redis://localhost:6379/0', {})
+        # Builds the connection pool without connecting to the server
+        pool = cache._cache._get_connection_pool(write=True)
+        self.assertEqual(pool.connection_kwargs['port'], 6379)
@@ -0,0 +1,15 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'name', 'status', 'attempts', 'run_at', 'created_at', 'finished_at'
+    )
+    list_filter = ('status', 'name')
+    readonly_fields = (
+        'name', 'args', 'kwargs', 'attempts', 'last_error', 'created_at',
+        'started_at', 'finished_at'
+    )
+    ordering = ('-created_at',)
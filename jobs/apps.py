@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'jobs'
+    verbose_name = 'Background Jobs'
+
+    def ready(self):
+        # Register the jobs defined in each app's jobs module
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('jobs')
@@ -0,0 +1,81 @@
+import multiprocessing
+import signal
+import time
+from django.core.management.base import BaseCommand
+from django.db import connections
+from jobs.queue import run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs, in one or more worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Number of worker processes to run'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Number of jobs each worker runs between queue checks'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait before checking an empty queue again'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once no jobs are due instead of waiting for more'
+        )
+
+    def handle(self, *args, **options):
+        if options['processes'] > 1:
+            # Each forked worker must open its own database connection
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            workers = [
+                context.Process(target=self.work, args=(options,))
+                for _ in range(options['processes'])
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Successfully stopped {len(workers)} workers'
+                )
+            )
+            return
+
+        processed_count = self.work(options)
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully ran {processed_count} jobs')
+        )
+
+    def work(self, options):
+        stopping = []
+        # Finish the current batch before stopping
+        previous_handler = signal.signal(
+            signal.SIGTERM, lambda *args: stopping.append(True)
+        )
+
+        processed_count = 0
+        try:
+            while not stopping:
+                processed = run_pending_jobs(options['batch_size'])
+                processed_count += processed
+                if processed:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        finally:
+            signal.signal(signal.SIGTERM, previous_handler)
+        return processed_count
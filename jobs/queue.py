@@ -0,0 +1,148 @@
+import functools
+import logging
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Registered job functions by name
+REGISTRY = {}
+
+
+class JobFunction:
+    """
+    A registered job. Calling it runs the function inline; delay() and
+    schedule() queue it for the worker instead. Arguments must be JSON
+    serializable, so pass IDs rather than model instances.
+    """
+
+    def __init__(self, func, max_attempts, retry_delay):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = f'{func.__module__}.{func.__name__}'
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Queue the job to run as soon as a worker is free"""
+        return self.schedule(timezone.now(), *args, **kwargs)
+
+    def schedule(self, run_at, *args, **kwargs):
+        """Queue the job to run at or after `run_at`"""
+        return Job.objects.create(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            run_at=run_at,
+            max_attempts=self.max_attempts
+        )
+
+
+def job(max_attempts=5, retry_delay=None):
+    """
+    Register a function as a background job. Failed runs are retried
+    after `retry_delay` seconds (JOBS_RETRY_DELAY by default), doubling
+    each time, until `max_attempts` runs have failed.
+    """
+    def decorator(func):
+        job_function = JobFunction(func, max_attempts, retry_delay)
+        REGISTRY[job_function.name] = job_function
+        return job_function
+    return decorator
+
+
+def _due_jobs(now, batch_size):
+    """Jobs that are due, or were left running past JOBS_STALE_AFTER"""
+    stale = now - timedelta(seconds=settings.JOBS_STALE_AFTER)
+    return list(
+        Job.objects.select_for_update(skip_locked=True).filter(
+            Q(status='queued', run_at__lte=now) |
+            Q(status='running', started_at__lt=stale)
+        ).order_by('run_at', 'id')[:batch_size]
+    )
+
+
+def claim_jobs(batch_size):
+    """
+    Mark a batch of due jobs as running and return them. Rows are locked
+    with SKIP LOCKED where the database supports it. Elsewhere (SQLite)
+    two workers can read the same jobs, so each job is claimed with an
+    UPDATE that only matches the row as it was read, and only the worker
+    whose UPDATE changed it gets the job. Jobs left running by a worker
+    that died are claimed again after JOBS_STALE_AFTER seconds.
+    """
+    now = timezone.now()
+    claimed_jobs = []
+    with transaction.atomic():
+        for candidate in _due_jobs(now, batch_size):
+            # attempts goes up on every claim, so it tells claims apart
+            claimed = Job.objects.filter(
+                id=candidate.id,
+                status=candidate.status,
+                attempts=candidate.attempts
+            ).update(
+                status='running',
+                started_at=now,
+                attempts=F('attempts') + 1
+            )
+            if not claimed:
+                continue
+            candidate.status = 'running'
+            candidate.started_at = now
+            candidate.attempts += 1
+            claimed_jobs.append(candidate)
+    return claimed_jobs
+
+
+def run_job(claimed):
+    """Run a claimed job and record the outcome"""
+    job_function = REGISTRY.get(claimed.name)
+    try:
+        if job_function is None:
+            raise LookupError(f'No job is registered as {claimed.name}')
+        job_function(*claimed.args, **claimed.kwargs)
+    except Exception:
+        logger.exception('Job %s (%s) failed', claimed.id, claimed.name)
+        claimed.last_error = traceback.format_exc()
+        if job_function and claimed.attempts < claimed.max_attempts:
+            retry_delay = (
+                job_function.retry_delay or settings.JOBS_RETRY_DELAY
+            )
+            claimed.status = 'queued'
+            claimed.run_at = timezone.now() + timedelta(
+                seconds=retry_delay * 2 ** (claimed.attempts - 1)
+            )
+        else:
+            claimed.status = 'failed'
+            claimed.finished_at = timezone.now()
+    else:
+        claimed.status = 'done'
+        claimed.finished_at = timezone.now()
+    claimed.save(update_fields=[
+        'status', 'run_at', 'last_error', 'finished_at'
+    ])
+
+
+def run_pending_jobs(batch_size=None):
+    """
+    Run up to `batch_size` due jobs. Each job is claimed just before it
+    runs, so jobs never sit claimed behind slower ones, where they could
+    pass JOBS_STALE_AFTER and be claimed by another worker.
+    Returns the number of jobs run.
+    """
+    processed_count = 0
+    for _ in range(batch_size or settings.JOBS_BATCH_SIZE):
+        jobs = claim_jobs(1)
+        if not jobs:
+            break
+        run_job(jobs[0])
+        processed_count += 1
+    return processed_count
@@ -0,0 +1,119 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from .models import Job
+from .queue import claim_jobs, job, run_pending_jobs
+
+CALLS = []
+
+
+@job()
+def record_call(value):
+    CALLS.append(value)
+
+
+@job()
+def record_statuses():
+    CALLS.append(sorted(Job.objects.values_list('status', flat=True)))
+
+
+@job(max_attempts=2, retry_delay=60)
+def always_fails():
+    raise ValueError('Broken job')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_delayed_job_runs_in_worker(self):
+        """Test that delay() queues the job for the worker"""
+        queued = record_call.delay('hello')
+        self.assertEqual(CALLS, [])
+        self.assertEqual(queued.name, 'jobs.tests.record_call')
+
+        self.assertEqual(run_pending_jobs(), 1)
+        self.assertEqual(CALLS, ['hello'])
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'done')
+        self.assertEqual(queued.attempts, 1)
+
+    def test_scheduled_job_waits_until_due(self):
+        """Test that scheduled jobs are not run early"""
+        queued = record_call.schedule(
+            timezone.now() + timedelta(hours=1), 'later'
+        )
+        self.assertEqual(run_pending_jobs(), 0)
+        Job.objects.filter(id=queued.id).update(run_at=timezone.now())
+        self.assertEqual(run_pending_jobs(), 1)
+        self.assertEqual(CALLS, ['later'])
+
+    def test_failed_job_is_retried_with_backoff(self):
+        """Test that failures are retried later, then given up"""
+        queued = always_fails.delay()
+        run_pending_jobs()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'queued')
+        self.assertIn('Broken job', queued.last_error)
+        self.assertGreater(
+            queued.run_at, timezone.now() + timedelta(seconds=50)
+        )
+
+        Job.objects.filter(id=queued.id).update(run_at=timezone.now())
+        run_pending_jobs()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'failed')
+        self.assertEqual(queued.attempts, 2)
+
+    def test_unknown_job_fails(self):
+        """Test that jobs with no registered function are marked failed"""
+        queued = Job.objects.create(name='jobs.tests.missing')
+        run_pending_jobs()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'failed')
+
+    @override_settings(JOBS_STALE_AFTER=60)
+    def test_abandoned_job_is_claimed_again(self):
+        """Test that jobs left running by a dead worker are picked up"""
+        queued = record_call.delay('again')
+        self.assertEqual(len(claim_jobs(10)), 1)
+        # Nothing else to claim while the first worker holds the job
+        self.assertEqual(claim_jobs(10), [])
+
+        Job.objects.filter(id=queued.id).update(
+            started_at=timezone.now() - timedelta(minutes=5)
+        )
+        self.assertEqual(run_pending_jobs(), 1)
+        self.assertEqual(CALLS, ['again'])
+
+    def test_job_read_by_two_workers_is_claimed_once(self):
+        """Test that only one worker claims a job both of them read"""
+        record_call.delay('once')
+        # Without SKIP LOCKED, a second worker reads the same queued row
+        seen_by_both = list(Job.objects.all())
+        self.assertEqual(len(claim_jobs(1)), 1)
+        with patch('jobs.queue._due_jobs', return_value=seen_by_both):
+            self.assertEqual(claim_jobs(1), [])
+        self.assertEqual(Job.objects.get().attempts, 1)
+
+    def test_jobs_are_claimed_one_at_a_time(self):
+        """Test that queued jobs stay unclaimed until they run"""
+        record_statuses.delay()
+        record_statuses.delay()
+        self.assertEqual(run_pending_jobs(10), 2)
+        self.assertEqual(CALLS, [
+            ['queued', 'running'],
+            ['done', 'running'],
+        ])
+
+    def test_runworker_drains_queue(self):
+        """Test that runworker --once runs every due job and exits"""
+        for number in range(3):
+            record_call.delay(number)
+        out = StringIO()
+        call_command('runworker', once=True, batch_size=2, stdout=out)
+        self.assertIn('ran 3 jobs', out.getvalue())
+        self.assertEqual(sorted(CALLS), [0, 1, 2])
@@ -1 +1,47 @@
-# Register your models here.
+from django.contrib import admin
+from .jobs import send_newsletter_campaign
+from .models import (
+    NewsletterCampaign, NewsletterSubscription, RefusedRecipient
+)
+
+
+@admin.register(NewsletterSubscription)
+class NewsletterSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ('email', 'is_active', 'date_subscribed', 'confirmed_at')
+    list_filter = ('is_active',)
+    search_fields = ('email',)
+    ordering = ('-date_subscribed',)
+
+
+class RefusedRecipientInline(admin.TabularInline):
+    model = RefusedRecipient
+    readonly_fields = ('email', 'error', 'refused_at')
+    extra = 0
+    can_delete = False
+
+
+@admin.register(NewsletterCampaign)
+class NewsletterCampaignAdmin(admin.ModelAdmin):
+    list_display = (
+        'subject', 'status', 'sent_count', 'refused_count', 'created_at',
+        'finished_at'
+    )
+    list_filter = ('status',)
+    readonly_fields = (
+        'status', 'last_subscription_id', 'sent_count', 'refused_count',
+        'last_error', 'created_at', 'started_at', 'progress_at',
+        'finished_at'
+    )
+    ordering = ('-created_at',)
+    inlines = [RefusedRecipientInline]
+    actions = ['send_campaigns']
+
+    @admin.action(description='Send selected draft or failed campaigns')
+    def send_campaigns(self, request, queryset):
+        queued_count = 0
+        for campaign in queryset.filter(status__in=['draft', 'failed']):
+            campaign.status = 'queued'
+            campaign.save(update_fields=['status'])
+            send_newsletter_campaign.delay(campaign.id)
+            queued_count += 1
+        self.message_user(request, f'Queued {queued_count} campaigns')
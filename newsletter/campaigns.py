@@ -0,0 +1,178 @@
+import smtplib
+import time
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from django.template import Context, Template
+from django.utils import timezone
+from django.utils.html import escape, strip_tags
+from .models import (
+    NewsletterCampaign, NewsletterSubscription, RefusedRecipient
+)
+
+# Stands in for the recipient's email while the body is rendered, and is
+# replaced for each recipient afterwards
+EMAIL_PLACEHOLDER = '__newsletter_recipient_email__'
+
+
+class ProviderRateLimiter:
+    """
+    Spaces out sends to each email provider (the recipient's domain) so
+    no provider receives more than its NEWSLETTER_RATE_LIMITS messages
+    per second; 'default' applies to unlisted providers. Call wait()
+    right before each message is sent.
+    """
+
+    def __init__(self, rates, clock=time.monotonic, sleep=time.sleep):
+        self.rates = rates
+        self.clock = clock
+        self.sleep = sleep
+        self.next_send = {}
+
+    def wait(self, email):
+        provider = email.rpartition('@')[2].lower()
+        rate = self.rates.get(provider, self.rates.get('default'))
+        if not rate:
+            return
+        now = self.clock()
+        send_at = max(now, self.next_send.get(provider, now))
+        if send_at > now:
+            self.sleep(send_at - now)
+        self.next_send[provider] = send_at + 1 / rate
+
+
+def render_campaign(campaign):
+    """Render the campaign body once, leaving a per-recipient placeholder"""
+    html = Template(campaign.body).render(
+        Context({'email': EMAIL_PLACEHOLDER})
+    )
+    return html, strip_tags(html)
+
+
+def build_message(campaign, html, text, email, connection):
+    message = EmailMultiAlternatives(
+        campaign.subject,
+        text.replace(EMAIL_PLACEHOLDER, email),
+        settings.DEFAULT_FROM_EMAIL,
+        [email],
+        connection=connection
+    )
+    message.attach_alternative(
+        html.replace(EMAIL_PLACEHOLDER, escape(email)), 'text/html'
+    )
+    return message
+
+
+def _claim_campaign(campaign_id):
+    """
+    Mark a campaign as sending for this run. Campaigns left sending by
+    a run that stopped saving progress are claimed again after
+    JOBS_STALE_AFTER seconds. Returns False if another run has it.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_STALE_AFTER)
+    return NewsletterCampaign.objects.filter(
+        Q(status__in=['queued', 'failed']) |
+        Q(status='sending', progress_at__lt=stale),
+        id=campaign_id
+    ).update(
+        status='sending',
+        started_at=Coalesce('started_at', now),
+        progress_at=now
+    )
+
+
+def send_campaign(campaign_id, time_limit=None, rate_limiter=None):
+    """
+    Send a queued campaign to the active subscribers it hasn't reached
+    yet, over one SMTP connection. Subscribers are read and progress is
+    saved NEWSLETTER_BATCH_SIZE at a time, so a failed or interrupted
+    run resumes where it stopped. Refused addresses are recorded and
+    skipped; any other error marks the campaign failed. Stops after
+    `time_limit` seconds, leaving the campaign queued.
+    Returns False if the campaign stopped early and needs another run.
+    """
+    if not _claim_campaign(campaign_id):
+        # Sent, still a draft, or being sent by another run
+        return True
+    campaign = NewsletterCampaign.objects.get(id=campaign_id)
+
+    html, text = render_campaign(campaign)
+    if rate_limiter is None:
+        rate_limiter = ProviderRateLimiter(settings.NEWSLETTER_RATE_LIMITS)
+    batch_size = settings.NEWSLETTER_BATCH_SIZE
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+
+    recipients = NewsletterSubscription.objects.filter(
+        is_active=True,
+        id__gt=campaign.last_subscription_id
+    ).order_by('id').values_list('id', 'email')
+
+    try:
+        with get_connection() as connection:
+            batch = []
+            for recipient in recipients.iterator(chunk_size=batch_size):
+                batch.append(recipient)
+                if len(batch) < batch_size:
+                    continue
+                _send_batch(
+                    connection, campaign, html, text, batch, rate_limiter
+                )
+                batch = []
+                if deadline is not None and time.monotonic() >= deadline:
+                    NewsletterCampaign.objects.filter(id=campaign.id).update(
+                        status='queued'
+                    )
+                    return False
+            if batch:
+                _send_batch(
+                    connection, campaign, html, text, batch, rate_limiter
+                )
+    except Exception:
+        NewsletterCampaign.objects.filter(id=campaign.id).update(
+            status='failed',
+            last_error=traceback.format_exc()
+        )
+        raise
+
+    NewsletterCampaign.objects.filter(id=campaign.id).update(
+        status='sent',
+        finished_at=timezone.now()
+    )
+    return True
+
+
+def _send_batch(connection, campaign, html, text, batch, rate_limiter):
+    """
+    Send to a batch of (subscription ID, email) pairs, one message at a
+    time so each send is paced for its provider. Progress up to the
+    last attempted recipient is saved even if sending fails midway.
+    """
+    sent_count = 0
+    refused = []
+    last_id = None
+    try:
+        for subscription_id, email in batch:
+            message = build_message(campaign, html, text, email, connection)
+            rate_limiter.wait(email)
+            try:
+                sent_count += connection.send_messages([message]) or 0
+            except smtplib.SMTPRecipientsRefused as error:
+                refused.append(RefusedRecipient(
+                    campaign=campaign,
+                    email=email,
+                    error=str(error.recipients.get(email, error))
+                ))
+            last_id = subscription_id
+    finally:
+        RefusedRecipient.objects.bulk_create(refused)
+        if last_id is not None:
+            NewsletterCampaign.objects.filter(id=campaign.id).update(
+                last_subscription_id=last_id,
+                sent_count=F('sent_count') + sent_count,
+                refused_count=F('refused_count') + len(refused),
+                progress_at=timezone.now()
+            )
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.mail import send_mail
+from django.template.loader import render_to_string
+from jobs.queue import job
+from .campaigns import send_campaign
+
+
+def _send(subject, template_name, context, email):
+    message = render_to_string(template_name, context)
+    send_mail(
+        subject,
+        message,
+        settings.DEFAULT_FROM_EMAIL,
+        [email],
+        html_message=message,
+        fail_silently=False,
+    )
+
+
+@job()
+def send_confirmation_email(email, confirmation_url):
+    _send(
+        'Confirm Your Newsletter Subscription',
+        'newsletter/email/newsletter_confirmation.html',
+        {'confirmation_url': confirmation_url},
+        email
+    )
+
+
+@job()
+def send_welcome_email(email, profile_url):
+    _send(
+        'Welcome to Our Newsletter',
+        'newsletter/email/newsletter_welcome.html',
+        {'profile_url': profile_url},
+        email
+    )
+
+
+@job()
+def send_newsletter_campaign(campaign_id):
+    # Long campaigns are sent over several short runs so other jobs get a
+    # turn; each run picks up where the last one stopped
+    if not send_campaign(
+        campaign_id, time_limit=settings.NEWSLETTER_JOB_TIME_LIMIT
+    ):
+        send_newsletter_campaign.delay(campaign_id)
@@ -35,3 +35,59 @@ class NewsletterSubscription(models.Model):
         self.is_active = True
         self.confirmed_at = timezone.now()
         self.save()
+
+
+class NewsletterCampaign(models.Model):
+    """
+    A newsletter sent to every active subscriber by the
+    send_newsletter_campaign job. The body is a template rendered once
+    per campaign; {{ email }} is filled in for each recipient.
+    """
+    STATUS_CHOICES = [
+        ('draft', 'Draft'),
+        ('queued', 'Queued'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=200)
+    body = models.TextField(
+        help_text='HTML template; {{ email }} is replaced per recipient'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='draft'
+    )
+    # Subscribers are sent to in ID order; sending resumes after this ID
+    last_subscription_id = models.PositiveBigIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    refused_count = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Last saved progress of the run sending the campaign
+    progress_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.subject
+
+
+class RefusedRecipient(models.Model):
+    """A subscriber address the mail server refused for a campaign"""
+    campaign = models.ForeignKey(
+        NewsletterCampaign,
+        on_delete=models.CASCADE,
+        related_name='refused_recipients'
+    )
+    email = models.EmailField(max_length=254)
+    error = models.TextField(blank=True)
+    refused_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.email} ({self.campaign})'
@@ -1,4 +1,10 @@
-from django.test import TestCase, Client
+import os
+import shutil
+import smtplib
+import tempfile
+from django.test import TestCase, Client, override_settings
+from django.core.mail.backends.locmem import EmailBackend
+from django.contrib.auth.models import User
 from django.urls import reverse
 from django.contrib.sessions.middleware import SessionMiddleware
 from django.contrib.messages.middleware import MessageMiddleware
@@ -6,7 +12,10 @@ from django.http import HttpRequest
 from django.core import mail
 from django.utils import timezone
 from datetime import timedelta
-from .models import NewsletterSubscription
+from jobs.queue import run_pending_jobs
+from .campaigns import ProviderRateLimiter, send_campaign
+from .jobs import send_newsletter_campaign
+from .models import NewsletterCampaign, NewsletterSubscription
 from .forms import NewsletterForm
 
 # Create your tests here.
@@ -103,6 +112,8 @@ class NewsletterViewTests(TestCase):
         self.assertIsNotNone(subscription.confirmation_token)
 
         # Check that confirmation email was sent
+        self.assertEqual(len(mail.outbox), 0)
+        run_pending_jobs()
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(
             mail.outbox[0].subject,
@@ -139,6 +150,7 @@ class NewsletterViewTests(TestCase):
         self.assertIsNotNone(subscription.confirmed_at)
 
         # Check welcome email was sent
+        run_pending_jobs()
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(
             mail.outbox[0].subject,
@@ -174,3 +186,241 @@ class NewsletterViewTests(TestCase):
         # Check subscription is still inactive
         subscription.refresh_from_db()
         self.assertFalse(subscription.is_active)
+
+
+class CountingBackend(EmailBackend):
+    """locmem backend recording how connections are used"""
+    opened = 0
+    send_calls = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        CountingBackend.send_calls += 1
+        return super().send_messages(messages)
+
+
+class FailingBackend(EmailBackend):
+    """locmem backend refusing or dropping the connection on addresses"""
+    refused = set()
+    disconnect_on = set()
+    log = []
+
+    def send_messages(self, messages):
+        for message in messages:
+            email = message.to[0]
+            if email in self.refused:
+                raise smtplib.SMTPRecipientsRefused(
+                    {email: (550, b'No such user')}
+                )
+            if email in self.disconnect_on:
+                raise smtplib.SMTPServerDisconnected('Connection lost')
+            FailingBackend.log.append(('send', email))
+        return super().send_messages(messages)
+
+
+class RecordingRateLimiter:
+    def wait(self, email):
+        FailingBackend.log.append(('wait', email))
+
+
+@override_settings(NEWSLETTER_BATCH_SIZE=2)
+class NewsletterCampaignTests(TestCase):
+    def setUp(self):
+        for number in range(5):
+            NewsletterSubscription.objects.create(
+                email=f'reader{number}@example.com',
+                confirmation_token=f'token{number}',
+                is_active=True
+            )
+        NewsletterSubscription.objects.create(
+            email='pending@example.com',
+            confirmation_token='pending'
+        )
+        self.campaign = NewsletterCampaign.objects.create(
+            subject='Spring training',
+            body=(
+                '<p>Hi {{ email }}</p>'
+                '{% if True %}<p>New plans</p>{% endif %}'
+            ),
+            status='queued'
+        )
+        CountingBackend.opened = CountingBackend.send_calls = 0
+        FailingBackend.refused = set()
+        FailingBackend.disconnect_on = set()
+        FailingBackend.log = []
+
+    def test_campaign_reaches_active_subscribers_once(self):
+        """Test that every active subscriber gets a personalised copy"""
+        self.assertTrue(send_campaign(self.campaign.id))
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            [f'reader{number}@example.com' for number in range(5)]
+        )
+        message = mail.outbox[0]
+        self.assertEqual(message.subject, 'Spring training')
+        self.assertEqual(message.body, 'Hi reader0@example.comNew plans')
+        self.assertEqual(
+            message.alternatives[0],
+            ('<p>Hi reader0@example.com</p><p>New plans</p>', 'text/html')
+        )
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, 'sent')
+        self.assertEqual(self.campaign.sent_count, 5)
+        self.assertTrue(send_campaign(self.campaign.id))
+        self.assertEqual(len(mail.outbox), 5)
+
+    @override_settings(
+        EMAIL_BACKEND='newsletter.tests.CountingBackend'
+    )
+    def test_messages_share_one_connection(self):
+        """Test that the whole campaign is sent over one connection"""
+        send_campaign(self.campaign.id)
+        self.assertEqual(CountingBackend.opened, 1)
+        self.assertEqual(CountingBackend.send_calls, 5)
+
+    def test_only_queued_campaigns_are_sent(self):
+        """Test that drafts and campaigns another run holds are skipped"""
+        NewsletterCampaign.objects.update(status='draft')
+        self.assertTrue(send_campaign(self.campaign.id))
+        NewsletterCampaign.objects.update(
+            status='sending', progress_at=timezone.now()
+        )
+        self.assertTrue(send_campaign(self.campaign.id))
+        self.assertEqual(mail.outbox, [])
+
+        # A run that stopped saving progress is taken over
+        NewsletterCampaign.objects.update(
+            progress_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertTrue(send_campaign(self.campaign.id))
+        self.assertEqual(len(mail.outbox), 5)
+
+    @override_settings(EMAIL_BACKEND='newsletter.tests.FailingBackend')
+    def test_refused_recipients_are_recorded_and_skipped(self):
+        """Test that a refused address doesn't stop the campaign"""
+        FailingBackend.refused = {'reader1@example.com'}
+        self.assertTrue(send_campaign(self.campaign.id))
+        self.assertEqual(len(mail.outbox), 4)
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, 'sent')
+        self.assertEqual(
+            (self.campaign.sent_count, self.campaign.refused_count), (4, 1)
+        )
+        refused = self.campaign.refused_recipients.get()
+        self.assertEqual(refused.email, 'reader1@example.com')
+        self.assertIn('No such user', refused.error)
+
+    @override_settings(EMAIL_BACKEND='newsletter.tests.FailingBackend')
+    def test_failed_campaign_resumes_without_duplicates(self):
+        """Test that progress before an error is kept for the retry"""
+        FailingBackend.disconnect_on = {'reader3@example.com'}
+        with self.assertRaises(smtplib.SMTPServerDisconnected):
+            send_campaign(self.campaign.id)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, 'failed')
+        self.assertEqual(self.campaign.sent_count, 3)
+        self.assertIn('Connection lost', self.campaign.last_error)
+
+        FailingBackend.disconnect_on = set()
+        self.assertTrue(send_campaign(self.campaign.id))
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            [f'reader{number}@example.com' for number in range(5)]
+        )
+        self.campaign.refresh_from_db()
+        self.assertEqual(
+            (self.campaign.status, self.campaign.sent_count), ('sent', 5)
+        )
+
+    def test_admin_requeues_failed_campaigns(self):
+        """Test that the admin action queues draft and failed campaigns"""
+        NewsletterCampaign.objects.update(status='failed')
+        admin_user = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='adminpass123'
+        )
+        self.client.force_login(admin_user)
+        self.client.post(
+            reverse('admin:newsletter_newslettercampaign_changelist'),
+            {
+                'action': 'send_campaigns',
+                '_selected_action': [self.campaign.id],
+            }
+        )
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, 'queued')
+        run_pending_jobs()
+        self.assertEqual(len(mail.outbox), 5)
+
+    @override_settings(EMAIL_BACKEND='newsletter.tests.FailingBackend')
+    def test_each_send_is_paced(self):
+        """Test that the rate limiter runs right before every send"""
+        send_campaign(
+            self.campaign.id, rate_limiter=RecordingRateLimiter()
+        )
+        self.assertEqual(FailingBackend.log[:4], [
+            ('wait', 'reader0@example.com'),
+            ('send', 'reader0@example.com'),
+            ('wait', 'reader1@example.com'),
+            ('send', 'reader1@example.com'),
+        ])
+
+    def test_interrupted_campaign_resumes(self):
+        """Test that a stopped run leaves the rest for the next job"""
+        self.assertFalse(send_campaign(self.campaign.id, time_limit=0))
+        self.campaign.refresh_from_db()
+        self.assertEqual(
+            (self.campaign.status, self.campaign.sent_count), ('queued', 2)
+        )
+
+        with override_settings(NEWSLETTER_JOB_TIME_LIMIT=0):
+            send_newsletter_campaign.delay(self.campaign.id)
+            while run_pending_jobs():
+                pass
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, 'sent')
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(
+            len({message.to[0] for message in mail.outbox}), 5
+        )
+
+    def test_file_backend(self):
+        """Test that campaigns can be written out with the file backend"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.filebased.EmailBackend',
+            EMAIL_FILE_PATH=directory
+        ):
+            send_campaign(self.campaign.id)
+        # The file backend writes one file per connection
+        self.assertEqual(len(os.listdir(directory)), 1)
+        with open(os.path.join(directory, os.listdir(directory)[0])) as log:
+            self.assertEqual(log.read().count('Subject: Spring training'), 5)
+
+    def test_rate_limits_are_per_provider(self):
+        """Test that each recipient domain is throttled separately"""
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        limiter = ProviderRateLimiter(
+            {'default': 2, 'gmail.com': 1},
+            clock=lambda: now[0],
+            sleep=sleep
+        )
+        limiter.wait('a@gmail.com')
+        limiter.wait('a@example.com')
+        limiter.wait('b@example.com')
+        self.assertEqual(sleeps, [0.5])
+        limiter.wait('b@GMAIL.com')
+        self.assertEqual(sleeps, [0.5, 0.5])
@@ -1,11 +1,9 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.conf import settings
 from django.urls import reverse
 from .forms import NewsletterForm
 from .models import NewsletterSubscription
+from .jobs import send_confirmation_email, send_welcome_email
 from django.utils import timezone
 from datetime import timedelta
 
@@ -29,20 +27,9 @@ def newsletter_signup(request):
                     )
                 )
 
-                # Send confirmation email
-                subject = 'Confirm Your Newsletter Subscription'
-                message = render_to_string(
-                    'newsletter/email/newsletter_confirmation.html',
-                    {'confirmation_url': confirmation_url}
-                )
-
-                send_mail(
-                    subject,
-                    message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [subscription.email],
-                    html_message=message,
-                    fail_silently=False,
+                # Send confirmation email in the background
+                send_confirmation_email.delay(
+                    subscription.email, confirmation_url
                 )
 
                 messages.success(
@@ -95,24 +82,11 @@ def confirm_subscription(request, token):
         # Confirm subscription
         subscription.confirm_subscription()
 
-        # Send welcome email
+        # Send welcome email in the background
         profile_url = request.build_absolute_uri(
             reverse('profiles:profile')
         )
-        subject = 'Welcome to Our Newsletter'
-        message = render_to_string(
-            'newsletter/email/newsletter_welcome.html',
-            {'profile_url': profile_url}
-        )
-
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [subscription.email],
-            html_message=message,
-            fail_silently=False,
-        )
+        send_welcome_email.delay(subscription.email, profile_url)
 
         messages.success(
             request,
@@ -34,20 +34,30 @@ def main():
         'fitness_ecommerce.settings'
     )
 
-    # Clear staticfiles directory
-    static_dir = os.path.join(os.getcwd(), 'staticfiles')
-    if os.path.exists(static_dir):
-        logger.info("Clearing staticfiles directory...")
-        run_command(f"rm -rf {static_dir}/*")
+    # The shared cache lives in the database unless REDIS_URL is set
+    if not os.environ.get('REDIS_URL'):
+        logger.info("Creating cache table...")
+        if not run_command("python manage.py createcachetable"):
+            logger.error("createcachetable failed")
+            sys.exit(1)
 
-    # Run collectstatic with verbose output
+    # Collect into the local staticfiles directory; unchanged files
+    # from the previous deploy are skipped
     logger.info("Running collectstatic...")
     if not run_command(
-        "python manage.py collectstatic --noinput --verbosity 2"
+        "DISABLE_S3_DURING_COLLECTSTATIC=True "
+        "python manage.py collectstatic --noinput"
     ):
         logger.error("collectstatic failed")
         sys.exit(1)
 
+    # Upload only the files that changed since the last deploy
+    if 'USE_AWS' in os.environ:
+        logger.info("Syncing static files to S3...")
+        if not run_command("python manage.py sync_static"):
+            logger.error("sync_static failed")
+            sys.exit(1)
+
     logger.info("Deployment completed successfully")
 
 
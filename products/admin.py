@@ -8,6 +8,8 @@ class ProductAdmin(admin.ModelAdmin):
         'category',
         'price',
         'stock',
+        'rating',
+        'review_count',
         'is_featured',
         'created_at'
     )
@@ -0,0 +1,64 @@
+import re
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from .models import UserSubscription
+
+ENTITLEMENT_KEY = 'entitlement:{}'
+
+
+class PathPrefixMatcher:
+    """Match request paths against a fixed set of prefixes in one regex"""
+
+    def __init__(self, prefixes):
+        prefixes = sorted(set(prefixes), key=len, reverse=True)
+        self.pattern = (
+            re.compile('|'.join(re.escape(prefix) for prefix in prefixes))
+            if prefixes else None
+        )
+
+    def matches(self, path):
+        return bool(self.pattern and self.pattern.match(path))
+
+
+def _load_entitlement(user_id):
+    subscription = UserSubscription.objects.filter(
+        user_id=user_id,
+        is_active=True
+    ).select_related('plan').order_by('-end_date').first()
+    if subscription is None:
+        return None
+    return {
+        'plan_id': subscription.plan_id,
+        'plan_name': subscription.plan.name,
+        'end_date': subscription.end_date,
+    }
+
+
+def get_entitlement(user_id):
+    """
+    Return the user's current plan and expiry, or None when they have
+    no active subscription. Entitlements are cached until the
+    subscription ends at the latest. Refusals are not cached, because a
+    payment handled by another process would only clear that process's
+    cache, and the user who just paid would stay refused.
+    """
+    key = ENTITLEMENT_KEY.format(user_id)
+    entitlement = cache.get(key)
+    if entitlement is not None:
+        return entitlement
+
+    entitlement = _load_entitlement(user_id)
+    if entitlement is not None:
+        remaining = (entitlement['end_date'] - timezone.now()).total_seconds()
+        timeout = max(
+            min(settings.SUBSCRIPTION_ENTITLEMENT_CACHE_TIMEOUT,
+                int(remaining)),
+            1
+        )
+        cache.set(key, entitlement, timeout)
+    return entitlement
+
+
+def invalidate_entitlement(user_id):
+    cache.delete(ENTITLEMENT_KEY.format(user_id))
@@ -0,0 +1,73 @@
+from decimal import Decimal
+from django.db.models import Count, Q
+
+# Minimum star ratings offered by the rating filter
+RATING_BUCKETS = [4, 3, 2, 1]
+
+# Price ranges as (low, high), both included, None means no limit.
+# Prices have two decimal places, so ranges end a cent below the next
+PRICE_BUCKETS = [
+    (0, Decimal('24.99')),
+    (25, Decimal('49.99')),
+    (50, Decimal('99.99')),
+    (100, Decimal('199.99')),
+    (200, None),
+]
+
+
+def price_filter(low=None, high=None):
+    """
+    Match prices from low to high, both included, None meaning no
+    limit. Shared by the price facets and the listing's min_price and
+    max_price filters, so a facet's count is what its link shows.
+    """
+    price_range = Q()
+    if low is not None:
+        price_range &= Q(price__gte=low)
+    if high is not None:
+        price_range &= Q(price__lte=high)
+    return price_range
+
+
+def compute_facets(queryset, categories):
+    """
+    Count the products in a queryset per category, minimum rating
+    and price range with a single conditional aggregation query.
+    """
+    aggregates = {}
+    for category in categories:
+        aggregates[f'category_{category.id}'] = Count(
+            'id', filter=Q(category_id=category.id)
+        )
+    for rating in RATING_BUCKETS:
+        aggregates[f'rating_{rating}'] = Count(
+            'id', filter=Q(rating__gte=rating)
+        )
+    for index, (low, high) in enumerate(PRICE_BUCKETS):
+        aggregates[f'price_{index}'] = Count(
+            'id', filter=price_filter(low, high)
+        )
+
+    counts = queryset.order_by().aggregate(**aggregates)
+
+    return {
+        'categories': [
+            {
+                'category': category,
+                'count': counts[f'category_{category.id}'],
+            }
+            for category in categories
+        ],
+        'ratings': [
+            {'rating': rating, 'count': counts[f'rating_{rating}']}
+            for rating in RATING_BUCKETS
+        ],
+        'prices': [
+            {
+                'min': low,
+                'max': high,
+                'count': counts[f'price_{index}'],
+            }
+            for index, (low, high) in enumerate(PRICE_BUCKETS)
+        ],
+    }
@@ -0,0 +1,92 @@
+import posixpath
+from io import BytesIO
+from django.conf import settings
+from django.db.models import Q
+from PIL import Image, ImageOps
+import requests
+from fitness_ecommerce.renditions import store_renditions
+from jobs.queue import job
+from .models import Product
+
+# Rendition widths in pixels; narrower images are never enlarged
+PRODUCT_IMAGE_WIDTHS = {
+    'thumbnail': 150,
+    'card': 400,
+    'detail': 800,
+}
+# Each product has its own directory, so products sharing an image
+# never share (and delete) each other's renditions
+RENDITIONS_DIRECTORY = 'images/product_images/renditions'
+DOWNLOAD_TIMEOUT = 10
+
+
+def render_product_images(content):
+    """
+    Scale an image to every rendition width, as WebP and JPEG.
+    Returns {'<width>.<extension>': bytes}.
+    """
+    with Image.open(BytesIO(content)) as img:
+        img = ImageOps.exif_transpose(img)
+        img = img.convert('RGB')
+
+    widths = {
+        min(width, img.width) for width in PRODUCT_IMAGE_WIDTHS.values()
+    }
+    renditions = {}
+    for width in widths:
+        height = max(round(img.height * width / img.width), 1)
+        scaled = img.resize((width, height), Image.LANCZOS)
+        for image_format, extension in [('WEBP', 'webp'), ('JPEG', 'jpg')]:
+            output = BytesIO()
+            scaled.save(
+                output, format=image_format, quality=82, optimize=True
+            )
+            renditions[f'{width}.{extension}'] = output.getvalue()
+    return renditions
+
+
+def _download(url):
+    """Fetch an external image, refusing anything over the size limit"""
+    limit = settings.PRODUCT_IMAGE_MAX_DOWNLOAD_BYTES
+    with requests.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+        response.raise_for_status()
+        content = BytesIO()
+        for chunk in response.iter_content(64 * 1024):
+            content.write(chunk)
+            if content.tell() > limit:
+                raise ValueError(f'{url} is larger than {limit} bytes')
+    return content.getvalue()
+
+
+def _read_source(product):
+    if product.image:
+        with product.image.open('rb') as image:
+            return image.read()
+    if product.image_url and settings.PRODUCT_IMAGE_INGEST_URLS:
+        return _download(product.image_url)
+    return None
+
+
+@job(max_attempts=3)
+def generate_product_images(product_id):
+    """Store the sized renditions of a product's image"""
+    product = Product.objects.get(id=product_id)
+    content = _read_source(product)
+    if content is None:
+        return
+    if product.image:
+        unchanged = Q(image=product.image.name)
+    else:
+        unchanged = (Q(image='') | Q(image__isnull=True)) & Q(
+            image_url=product.image_url
+        )
+    store_renditions(
+        product,
+        content,
+        render_product_images,
+        product.image.storage,
+        posixpath.join(RENDITIONS_DIRECTORY, str(product_id)),
+        unchanged,
+        'image_hash',
+        'image_renditions'
+    )
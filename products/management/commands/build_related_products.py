@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from products.recommendations import (
+    RELATED_PRODUCTS_LIMIT, build_related_products
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the related products shown on product pages from '
+        'products bought together, falling back to the same category'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=RELATED_PRODUCTS_LIMIT,
+            help='Number of related products to keep per product'
+        )
+
+    def handle(self, *args, **options):
+        count = build_related_products(options['limit'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully stored {count} related products'
+            )
+        )
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.db.models import Q
+from fitness_ecommerce.renditions import RenditionsCommand
+from products.jobs import generate_product_images
+from products.models import Product
+
+
+class Command(RenditionsCommand):
+    help = (
+        'Queues image renditions for products whose images were added '
+        'before renditions existed'
+    )
+    job = generate_product_images
+    hash_field = 'image_hash'
+
+    def get_queryset(self):
+        has_source = ~Q(image='') & Q(image__isnull=False)
+        if settings.PRODUCT_IMAGE_INGEST_URLS:
+            has_source |= ~Q(image_url='') & Q(image_url__isnull=False)
+        return Product.objects.filter(has_source)
@@ -0,0 +1,95 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:53
+
+import re
+
+from django.db import migrations, models
+
+
+FTS_TABLE = 'products_product_fts'
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            "ALTER TABLE products_product ADD COLUMN search_vector tsvector "
+            "GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            "setweight("
+            "to_tsvector('english', coalesce(search_document, '')), 'B'"
+            ")) STORED"
+        )
+        schema_editor.execute(
+            "CREATE INDEX products_product_search_vector_idx "
+            "ON products_product USING GIN (search_vector)"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} "
+            f"USING fts5(name, document)"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            "ALTER TABLE products_product DROP COLUMN search_vector"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def clean_search_query(query):
+    cleaned = re.sub(r'[^\w\s]', '', query.lower())
+    return re.sub(r'\s+', ' ', cleaned).strip()
+
+
+def populate_search_documents(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    products = list(Product.objects.select_related('category'))
+    for product in products:
+        parts = [product.description, product.sku]
+        if product.category is not None:
+            parts += [
+                product.category.name,
+                product.category.friendly_name
+            ]
+        product.search_document = clean_search_query(
+            ' '.join(part for part in parts if part)
+        )
+    Product.objects.bulk_update(products, ['search_document'])
+
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.connection.cursor().executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, document) "
+            f"VALUES (%s, %s, %s)",
+            [
+                (
+                    product.id,
+                    clean_search_query(product.name),
+                    product.search_document
+                )
+                for product in products
+            ]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_alter_product_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(
+            populate_search_documents,
+            migrations.RunPython.noop
+        ),
+    ]
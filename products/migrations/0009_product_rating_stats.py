@@ -0,0 +1,87 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:06
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_rating_stats(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    products = list(
+        Product.objects.annotate(**{
+            f'counted_{stars}': Count(
+                'reviews',
+                filter=Q(reviews__active=True, reviews__rating=stars)
+            )
+            for stars in range(1, 6)
+        })
+    )
+    for product in products:
+        counts = {
+            stars: getattr(product, f'counted_{stars}')
+            for stars in range(1, 6)
+        }
+        product.review_count = sum(counts.values())
+        for stars, count in counts.items():
+            setattr(product, f'rating_{stars}_count', count)
+        # Products nobody has reviewed keep their existing rating
+        if product.review_count:
+            product.rating = round(
+                sum(stars * count for stars, count in counts.items()) /
+                product.review_count,
+                2
+            )
+    Product.objects.bulk_update(
+        products,
+        ['rating', 'review_count'] +
+        [f'rating_{stars}_count' for stars in range(1, 6)],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_product_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='rating',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, max_digits=6, null=True),
+        ),
+        migrations.RunPython(
+            populate_rating_stats,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def reset_nested_renditions(apps, schema_editor):
+    # Renditions used to be stored as {format: [[width, name], ...]};
+    # clearing them lets generate_product_images store the flat keys
+    Product = apps.get_model('products', 'Product')
+    products = [
+        product for product in Product.objects.exclude(image_renditions={})
+        if any(isinstance(names, list)
+               for names in product.image_renditions.values())
+    ]
+    for product in products:
+        product.image_hash = ''
+        product.image_renditions = {}
+    Product.objects.bulk_update(
+        products, ['image_hash', 'image_renditions'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_product_image_renditions'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            reset_nested_renditions, migrations.RunPython.noop
+        ),
+    ]
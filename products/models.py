@@ -3,6 +3,8 @@ from django.core.validators import MinValueValidator
 from django.contrib.auth.models import User
 from django.utils.text import slugify
 from django.urls import reverse
+from fitness_ecommerce.renditions import rendition_widths
+from .search import build_search_document
 
 
 class Category(models.Model):
@@ -39,13 +41,28 @@ class Product(models.Model):
     price = models.DecimalField(
         max_digits=6, decimal_places=2, validators=[MinValueValidator(0)]
     )
+    # Average of the active reviews, see products.ratings
     rating = models.DecimalField(
-        max_digits=6, decimal_places=2, null=True, blank=True
+        max_digits=6, decimal_places=2, null=True, blank=True, db_index=True
     )
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
     image_url = models.URLField(max_length=1024, null=True, blank=True)
     image = models.ImageField(
         upload_to='images/product_images/', null=True, blank=True
     )
+    # SHA-256 of the source the image renditions were made from
+    image_hash = models.CharField(max_length=64, blank=True, editable=False)
+    # Rendition storage names keyed by '<width>.<extension>'
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False
+    )
     stock = models.IntegerField(
         default=0, validators=[MinValueValidator(0)]
     )
@@ -53,18 +70,108 @@ class Product(models.Model):
     is_available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Precomputed text indexed by the search backend
+    search_document = models.TextField(blank=True, editable=False)
+
+    # Kept by products.ratings; only written when passed in update_fields
+    RATING_FIELDS = (
+        'rating', 'review_count', 'rating_1_count', 'rating_2_count',
+        'rating_3_count', 'rating_4_count', 'rating_5_count'
+    )
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        product = super().from_db(db, field_names, values)
+        # Remember the stored image source to spot changes on save
+        product._saved_image_source = product.image_source()
+        return product
+
+    def image_source(self):
+        """The uploaded image name or external URL renditions come from"""
+        image = self.__dict__.get('image')
+        return str(image or '') or self.__dict__.get('image_url') or None
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        if not self.image_source():
+            self.image_hash = ''
+            self.image_renditions = {}
+        self.search_document = build_search_document(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'search_document'}
+        elif not self._state.adding and not kwargs.get('force_insert'):
+            # The rating fields are moved with F() updates as reviews
+            # land, so edits must not write back the values loaded here
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.RATING_FIELDS
+            ]
         super().save(*args, **kwargs)
+        source = self.image_source()
+        if source and source != getattr(self, '_saved_image_source', None):
+            # Decoding and resizing happen in the background
+            from .jobs import generate_product_images
+            generate_product_images.delay(self.pk)
+        self._saved_image_source = source
+
+    def image_rendition_widths(self, webp=False):
+        """[(width, name), ...] of the WebP or JPEG renditions"""
+        return rendition_widths(
+            self.image_renditions, 'webp' if webp else 'jpg'
+        )
+
+    def image_srcset(self, webp=False):
+        """srcset of the stored renditions, empty until they exist"""
+        return ', '.join(
+            f'{self.image.storage.url(name)} {width}w'
+            for width, name in self.image_rendition_widths(webp)
+        )
 
     def get_absolute_url(self):
         return reverse('products:product_detail', args=[self.id])
 
+    def rating_histogram(self):
+        """Star counts from 5 down to 1, with their share of reviews"""
+        histogram = []
+        for stars in range(5, 0, -1):
+            count = getattr(self, f'rating_{stars}_count')
+            percent = (
+                round(count * 100 / self.review_count)
+                if self.review_count else 0
+            )
+            histogram.append(
+                {'stars': stars, 'count': count, 'percent': percent}
+            )
+        return histogram
+
+
+class RelatedProduct(models.Model):
+    """
+    Precomputed recommendation shown on a product's detail page,
+    rebuilt by the build_related_products command.
+    """
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='recommendations'
+    )
+    related = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='+'
+    )
+    position = models.PositiveSmallIntegerField()
+    score = models.FloatField(default=0)
+
+    class Meta:
+        ordering = ['product', 'position']
+        unique_together = ('product', 'position')
+
+    def __str__(self):
+        return f'{self.related_id} for {self.product_id}'
+
 
 class Review(models.Model):
     RATING_CHOICES = [
@@ -100,6 +207,20 @@ class Review(models.Model):
             f'for {self.product.name}'
         )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        review = super().from_db(db, field_names, values)
+        # Remember what the product's rating counts currently include
+        if {'product_id', 'rating', 'active'} <= set(field_names):
+            review._counted = review.rating_contribution()
+        return review
+
+    def rating_contribution(self):
+        """The (product_id, stars) this review counts for, if active"""
+        if not self.active or self.rating is None:
+            return None
+        return (self.product_id, self.rating)
+
 
 class SubscriptionPlan(models.Model):
     PLAN_TYPES = [
@@ -0,0 +1,53 @@
+from django.db.models import Case, DecimalField, F, FloatField, When
+from django.db.models.functions import Cast
+from django.db.models.lookups import GreaterThan
+from .models import Product
+
+STARS = range(1, 6)
+
+
+def _stars_total():
+    """Sum of the stars of every counted review, from the histogram"""
+    return sum(
+        (F(f'rating_{stars}_count') * stars for stars in STARS[1:]),
+        F('rating_1_count')
+    )
+
+
+def move_rating(product_id, removed=None, added=None):
+    """
+    Take a review's stars out of and/or into a product's histogram
+    and update its review count and average in the same UPDATE,
+    without re-aggregating its reviews.
+    """
+    deltas = {}
+    if removed is not None:
+        deltas[removed] = deltas.get(removed, 0) - 1
+    if added is not None:
+        deltas[added] = deltas.get(added, 0) + 1
+    deltas = {stars: delta for stars, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    # Every F() below refers to the values before this UPDATE
+    review_count = F('review_count') + sum(deltas.values())
+    stars_total = _stars_total() + sum(
+        stars * delta for stars, delta in deltas.items()
+    )
+    Product.objects.filter(pk=product_id).update(
+        review_count=review_count,
+        rating=Case(
+            When(
+                GreaterThan(review_count, 0),
+                then=Cast(
+                    Cast(stars_total, FloatField()) / review_count,
+                    DecimalField(max_digits=6, decimal_places=2)
+                )
+            ),
+            default=None
+        ),
+        **{
+            f'rating_{stars}_count': F(f'rating_{stars}_count') + delta
+            for stars, delta in deltas.items()
+        }
+    )
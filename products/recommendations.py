@@ -0,0 +1,113 @@
+import heapq
+import math
+from django.db import transaction
+from django.db.models import Count, F
+from checkout.models import OrderItem
+from .models import Product, RelatedProduct
+
+RELATED_PRODUCTS_LIMIT = 4
+
+
+def _order_counts():
+    """Number of paid orders containing each product"""
+    return dict(
+        OrderItem.objects.filter(order__paid=True).values(
+            'product_id'
+        ).annotate(
+            orders=Count('order_id', distinct=True)
+        ).values_list('product_id', 'orders')
+    )
+
+
+def _co_purchases():
+    """
+    Stream (product_id, other_product_id, orders) for every pair of
+    products bought together, counted by the database in one
+    self-join of the order items.
+    """
+    # Filtering on the annotation reuses its join; spelling out
+    # order__items__ in each clause would join the items again every time
+    return OrderItem.objects.filter(order__paid=True).annotate(
+        other_id=F('order__items__product_id')
+    ).filter(
+        other_id__isnull=False
+    ).exclude(
+        other_id=F('product_id')
+    ).values(
+        'product_id', 'other_id'
+    ).annotate(
+        orders=Count('order_id', distinct=True)
+    ).values_list('product_id', 'other_id', 'orders').order_by().iterator()
+
+
+def similar_products(limit=RELATED_PRODUCTS_LIMIT, available_ids=None):
+    """
+    Rank each product's co-purchased products by cosine similarity of
+    their order vectors, keeping the top ones per product.
+    Returns {product_id: [(other_id, score), ...]}, best first.
+    """
+    order_counts = _order_counts()
+    neighbours = {}
+    for product_id, other_id, orders in _co_purchases():
+        if available_ids is not None and other_id not in available_ids:
+            continue
+        score = orders / math.sqrt(
+            order_counts[product_id] * order_counts[other_id]
+        )
+        heap = neighbours.setdefault(product_id, [])
+        entry = (score, -other_id)
+        if len(heap) < limit:
+            heapq.heappush(heap, entry)
+        else:
+            heapq.heappushpop(heap, entry)
+    return {
+        product_id: [
+            (-negative_id, score)
+            for score, negative_id in sorted(heap, reverse=True)
+        ]
+        for product_id, heap in neighbours.items()
+    }
+
+
+def build_related_products(limit=RELATED_PRODUCTS_LIMIT):
+    """
+    Rebuild the related products table from co-purchases, topping up
+    products with too few from the newest products in their category.
+    Returns the number of rows written.
+    """
+    products = list(
+        Product.objects.filter(is_available=True).order_by(
+            '-created_at', '-id'
+        ).values_list('id', 'category_id')
+    )
+    by_category = {}
+    for product_id, category_id in products:
+        by_category.setdefault(category_id, []).append(product_id)
+    similar = similar_products(
+        limit, available_ids={product_id for product_id, _ in products}
+    )
+
+    rows = []
+    for product_id, category_id in products:
+        picks = similar.get(product_id, [])
+        chosen = {other_id for other_id, _ in picks} | {product_id}
+        for other_id in by_category.get(category_id, []):
+            if len(picks) >= limit:
+                break
+            if other_id not in chosen:
+                picks.append((other_id, 0.0))
+                chosen.add(other_id)
+        rows.extend(
+            RelatedProduct(
+                product_id=product_id,
+                related_id=other_id,
+                position=position,
+                score=score
+            )
+            for position, (other_id, score) in enumerate(picks)
+        )
+
+    with transaction.atomic():
+        RelatedProduct.objects.all().delete()
+        RelatedProduct.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
@@ -0,0 +1,280 @@
+import re
+import threading
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'products_product_fts'
+
+
+def clean_search_query(query):
+    """Clean the search query by removing special characters
+    and extra spaces."""
+    cleaned = re.sub(r'[^\w\s]', '', query.lower())
+    return re.sub(r'\s+', ' ', cleaned).strip()
+
+
+def build_search_document(product):
+    """
+    Flatten everything a shopper might search for on a product,
+    other than its name, into a single text document normalised
+    the same way as search queries.
+    """
+    parts = [product.description, product.sku]
+    if product.category is not None:
+        parts += [product.category.name, product.category.friendly_name]
+    return clean_search_query(' '.join(part for part in parts if part))
+
+
+class RegexSearchBackend:
+    """
+    Fallback backend that matches whole words in the name and
+    description with a regex scan. Results are not ranked.
+    """
+    ranked = False
+
+    def search(self, queryset, query):
+        search_filter = Q()
+        for term in clean_search_query(query).split():
+            name_match = Q(name__iregex=r'\b' + term + r'\b')
+            desc_match = Q(description__iregex=r'\b' + term + r'\b')
+            search_filter &= (
+                name_match | desc_match
+            )
+        return queryset.filter(search_filter)
+
+    def index(self, products):
+        pass
+
+    def remove(self, product_ids):
+        pass
+
+
+class SQLiteSearchBackend:
+    """
+    SQLite FTS5 backend. Each product has a row in the
+    products_product_fts virtual table keyed by its id.
+    """
+    ranked = True
+
+    def _match_expression(self, query):
+        # Quote every term so FTS5 treats them as plain tokens
+        return ' '.join(
+            f'"{term}"' for term in clean_search_query(query).split()
+        )
+
+    def search(self, queryset, query):
+        match = self._match_expression(query)
+        matching_ids = RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            (match,)
+        )
+        # bm25 is lower for better matches, and names weigh the most
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE}.rowid = products_product.id '
+            f'AND {FTS_TABLE} MATCH %s',
+            (match,),
+            output_field=FloatField()
+        )
+        return queryset.filter(id__in=matching_ids).alias(
+            search_rank=rank
+        )
+
+    def index(self, products):
+        self.remove([product.id for product in products])
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, document) '
+                f'VALUES (%s, %s, %s)',
+                [
+                    (
+                        product.id,
+                        clean_search_query(product.name),
+                        product.search_document
+                    )
+                    for product in products
+                ]
+            )
+
+    def remove(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(product_id,) for product_id in product_ids]
+            )
+
+
+class PostgresSearchBackend:
+    """
+    PostgreSQL backend using the generated search_vector column
+    and its GIN index. Postgres keeps the vector in sync itself.
+    """
+    ranked = True
+
+    def search(self, queryset, query):
+        cleaned = clean_search_query(query)
+        tsquery = "plainto_tsquery('english', %s)"
+        return queryset.alias(
+            search_match=RawSQL(
+                f'search_vector @@ {tsquery}',
+                (cleaned,),
+                output_field=BooleanField()
+            )
+        ).filter(search_match=True).alias(
+            search_rank=RawSQL(
+                f'ts_rank(search_vector, {tsquery})',
+                (cleaned,),
+                output_field=FloatField()
+            )
+        )
+
+    def index(self, products):
+        pass
+
+    def remove(self, product_ids):
+        pass
+
+
+class InMemorySearchBackend:
+    """
+    Pure-Python inverted index over every product, for SQLite
+    deployments. Built on first use and updated from the product
+    signals. The index lives in the process that built it, so only
+    use it where a single process serves the site.
+    """
+    ranked = False
+    # Broader matches fall back to the database to keep the IN list small
+    max_ids = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = None
+        self._terms = {}
+
+    @property
+    def is_built(self):
+        return self._postings is not None
+
+    def _tokenize(self, product):
+        text = f'{product.name} {product.search_document}'
+        return set(clean_search_query(text).split())
+
+    def _add(self, product):
+        terms = self._tokenize(product)
+        self._terms[product.id] = terms
+        for term in terms:
+            self._postings.setdefault(term, set()).add(product.id)
+
+    def _discard(self, product_id):
+        for term in self._terms.pop(product_id, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.discard(product_id)
+                if not postings:
+                    del self._postings[term]
+
+    def build(self):
+        from .models import Product
+        with self._lock:
+            self._postings = {}
+            self._terms = {}
+            products = Product.objects.only(
+                'id', 'name', 'search_document'
+            )
+            for product in products.iterator(chunk_size=2000):
+                self._add(product)
+
+    def reset(self):
+        """Forget the index so it is rebuilt on next use"""
+        with self._lock:
+            self._postings = None
+            self._terms = {}
+
+    def lookup(self, query):
+        """Return the ids of products matching every query term"""
+        if not self.is_built:
+            self.build()
+        terms = clean_search_query(query).split()
+        with self._lock:
+            postings = [self._postings.get(term, set()) for term in terms]
+            # Intersect starting from the rarest term
+            postings.sort(key=len)
+            matches = set(postings[0]) if postings else set()
+            for other in postings[1:]:
+                matches &= other
+                if not matches:
+                    break
+        return matches
+
+    def search(self, queryset, query):
+        matches = self.lookup(query)
+        if len(matches) > self.max_ids:
+            return get_database_backend().search(queryset, query)
+        return queryset.filter(id__in=matches)
+
+    def index(self, products):
+        if not self.is_built:
+            return
+        with self._lock:
+            for product in products:
+                self._discard(product.id)
+                self._add(product)
+
+    def remove(self, product_ids):
+        if not self.is_built:
+            return
+        with self._lock:
+            for product_id in product_ids:
+                self._discard(product_id)
+
+
+_database_backend = None
+_memory_backend = InMemorySearchBackend()
+
+
+def get_database_backend():
+    """Pick the best search backend the database supports"""
+    global _database_backend
+    if _database_backend is None:
+        if connection.vendor == 'postgresql':
+            _database_backend = PostgresSearchBackend()
+        elif (
+            connection.vendor == 'sqlite' and
+            FTS_TABLE in connection.introspection.table_names()
+        ):
+            _database_backend = SQLiteSearchBackend()
+        else:
+            _database_backend = RegexSearchBackend()
+    return _database_backend
+
+
+def get_search_backend():
+    """Return the backend configured by PRODUCT_SEARCH_BACKEND"""
+    if getattr(settings, 'PRODUCT_SEARCH_BACKEND', 'database') == 'memory':
+        return _memory_backend
+    return get_database_backend()
+
+
+def index_products(products):
+    """Refresh the search index entries of the given products"""
+    get_database_backend().index(products)
+    _memory_backend.index(products)
+
+
+def remove_products(product_ids):
+    """Drop products from the search index"""
+    get_database_backend().remove(product_ids)
+    _memory_backend.remove(product_ids)
+
+
+def search_products(queryset, query):
+    """
+    Filter a product queryset down to the matches for a search query.
+    Returns the queryset and whether it carries a search_rank.
+    """
+    if not clean_search_query(query):
+        return queryset, False
+    backend = get_search_backend()
+    return backend.search(queryset, query), backend.ranked
@@ -0,0 +1,77 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from .models import Category, Product, Review, UserSubscription
+from .entitlements import invalidate_entitlement
+from .ratings import move_rating
+from .search import build_search_document, index_products, remove_products
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    """Keep the search index in step with the saved product"""
+    index_products([instance])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    remove_products([instance.id])
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, **kwargs):
+    """Category names are part of the search document of its products"""
+    if created:
+        return
+    products = list(Product.objects.filter(category=instance))
+    for product in products:
+        product.category = instance
+        product.search_document = build_search_document(product)
+    Product.objects.bulk_update(products, ['search_document'])
+    index_products(products)
+
+
+@receiver(pre_save, sender=Review)
+def load_counted_rating(sender, instance, **kwargs):
+    """Look up what an existing review counts for if it was not loaded"""
+    if instance._state.adding or hasattr(instance, '_counted'):
+        return
+    old = Review.objects.filter(pk=instance.pk).first()
+    instance._counted = old.rating_contribution() if old else None
+
+
+@receiver(post_save, sender=Review)
+def update_product_rating(sender, instance, **kwargs):
+    """Apply a created, edited or (de)activated review to its product"""
+    before = getattr(instance, '_counted', None)
+    after = instance.rating_contribution()
+    if before == after:
+        return
+    if before and after and before[0] == after[0]:
+        move_rating(after[0], removed=before[1], added=after[1])
+    else:
+        if before:
+            move_rating(before[0], removed=before[1])
+        if after:
+            move_rating(after[0], added=after[1])
+    instance._counted = after
+
+
+@receiver(post_delete, sender=Review)
+def remove_product_rating(sender, instance, **kwargs):
+    # Nothing to update when the product itself is being deleted
+    origin = kwargs.get('origin')
+    if (
+        isinstance(origin, Product) or
+        getattr(origin, 'model', None) is Product
+    ):
+        return
+    counted = getattr(instance, '_counted', instance.rating_contribution())
+    if counted:
+        move_rating(counted[0], removed=counted[1])
+
+
+@receiver(post_save, sender=UserSubscription)
+@receiver(post_delete, sender=UserSubscription)
+def refresh_entitlement(sender, instance, **kwargs):
+    """Drop the cached entitlement whenever a subscription changes"""
+    invalidate_entitlement(instance.user_id)
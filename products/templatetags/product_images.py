@@ -0,0 +1,43 @@
+from django import template
+from django.templatetags.static import static
+from fitness_ecommerce.renditions import covering_rendition
+from products.jobs import PRODUCT_IMAGE_WIDTHS
+
+register = template.Library()
+
+# How wide each rendition is laid out, for the browser to pick a width
+RENDITION_SIZES = {
+    'thumbnail': '150px',
+    'card': '(max-width: 767px) 100vw, 400px',
+    'detail': '(max-width: 767px) 100vw, 50vw',
+}
+
+
+@register.inclusion_tag('product/includes/product_image.html')
+def product_image(product, rendition='card', css_class='card-img-top',
+                  default=None):
+    """
+    Render a product image sized for `rendition`, letting the browser
+    pick a width from the stored renditions and offering WebP where it
+    exists. Falls back to the original image, the external image URL,
+    then the static `default` image.
+    """
+    context = {
+        'product': product,
+        'css_class': css_class,
+        'sizes': RENDITION_SIZES[rendition],
+    }
+    jpegs = product.image_rendition_widths()
+    if jpegs:
+        name = covering_rendition(jpegs, PRODUCT_IMAGE_WIDTHS[rendition])
+        context['src'] = product.image.storage.url(name)
+        context['srcset'] = product.image_srcset()
+        context['webp_srcset'] = product.image_srcset(webp=True)
+    elif product.image:
+        context['src'] = product.image.url
+    elif product.image_url:
+        context['src'] = product.image_url
+    elif default:
+        context['src'] = static(default)
+        context['is_default'] = True
+    return context
@@ -1,8 +1,38 @@
-from django.test import TestCase, Client
+import os
+import shutil
+import tempfile
+from django.db import connection
+from django.http import QueryDict
+from django.test import (
+    TestCase, Client, modify_settings, override_settings
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
-from .models import Product, Category
+from datetime import timedelta
+from io import StringIO
+from django.core.cache import cache
+from django.utils import timezone
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from PIL import Image
+from checkout.models import Order, OrderItem
+from jobs.models import Job
+from jobs.queue import run_pending_jobs
+from .models import (
+    Product, Category, RelatedProduct, Review, SubscriptionPlan,
+    UserSubscription
+)
+from .entitlements import PathPrefixMatcher
+from .jobs import _download
+from .recommendations import _co_purchases, build_related_products
+from .search import get_search_backend
+from .facets import compute_facets
+from fitness_ecommerce.pagination import paginate_by_cursor
 from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
 
 
 class ProductTests(TestCase):
@@ -112,3 +142,818 @@ class ProductTests(TestCase):
     def test_category_friendly_name(self):
         """Test the friendly name property of the Category model"""
         self.assertEqual(self.category1.friendly_name, 'Test Category 1')
+
+    def test_product_search_matches_category_and_sku(self):
+        """Test that the search document covers category names and SKU"""
+        self.product2.sku = 'ZX-900'
+        self.product2.save()
+        response = self.client.get(
+            reverse('products:products'),
+            {'q': 'ZX-900'}
+        )
+        self.assertContains(response, 'Test Product 2')
+        self.assertNotContains(response, 'Test Product 1')
+
+        self.category1.name = 'Kettlebells'
+        self.category1.save()
+        response = self.client.get(
+            reverse('products:products'),
+            {'q': 'kettlebells'}
+        )
+        self.assertContains(response, 'Test Product 1')
+        self.assertNotContains(response, 'Test Product 2')
+
+    def test_product_search_ranks_name_matches_first(self):
+        """Test that products named after the query rank highest"""
+        Product.objects.create(
+            name='Yoga Mat',
+            description='A mat for yoga and stretching',
+            price=25.00,
+            stock=3
+        )
+        Product.objects.create(
+            name='Foam Roller',
+            description='Pairs well with a yoga mat',
+            price=15.00,
+            stock=3
+        )
+        response = self.client.get(
+            reverse('products:products'),
+            {'q': 'yoga'}
+        )
+        products = [p.name for p in response.context['products']]
+        self.assertEqual(products, ['Yoga Mat', 'Foam Roller'])
+
+    def test_product_search_index_follows_updates(self):
+        """Test that renamed and deleted products leave the index"""
+        self.product1.name = 'Resistance Band'
+        self.product1.save()
+        response = self.client.get(
+            reverse('products:products'),
+            {'q': 'resistance'}
+        )
+        self.assertContains(response, 'Resistance Band')
+
+        self.product1.delete()
+        response = self.client.get(
+            reverse('products:products'),
+            {'q': 'resistance'}
+        )
+        self.assertNotContains(response, 'Resistance Band')
+
+
+@override_settings(PRODUCT_SEARCH_BACKEND='memory')
+class InMemorySearchTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Cardio')
+        self.rope = Product.objects.create(
+            category=self.category,
+            name='Speed Rope',
+            description='A light skipping rope',
+            price=12.00,
+            stock=5
+        )
+        self.bike = Product.objects.create(
+            name='Spin Bike',
+            description='Indoor bike for cardio sessions',
+            price=499.00,
+            stock=2
+        )
+        self.backend = get_search_backend()
+        self.backend.reset()
+
+    def tearDown(self):
+        self.backend.reset()
+
+    def test_lookup_intersects_terms(self):
+        """Test that every query term has to match"""
+        self.assertEqual(self.backend.lookup('cardio'), {
+            self.rope.id, self.bike.id
+        })
+        self.assertEqual(self.backend.lookup('Cardio, bike!'), {
+            self.bike.id
+        })
+        self.assertEqual(self.backend.lookup('rowing'), set())
+
+    def test_lookup_needs_no_queries_once_built(self):
+        """Test that lookups are answered from memory"""
+        self.backend.build()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.backend.lookup('rope'), {self.rope.id})
+
+    def test_index_updated_incrementally(self):
+        """Test that saves and deletes update a built index"""
+        self.backend.build()
+        self.rope.name = 'Weighted Rope'
+        self.rope.save()
+        self.assertEqual(self.backend.lookup('speed'), set())
+        self.assertEqual(self.backend.lookup('weighted'), {self.rope.id})
+
+        self.bike.delete()
+        self.assertEqual(self.backend.lookup('bike'), set())
+
+    def test_products_view_uses_index(self):
+        """Test that the listing resolves q through the index"""
+        response = self.client.get(
+            reverse('products:products'),
+            {'q': 'rope'}
+        )
+        self.assertContains(response, 'Speed Rope')
+        self.assertNotContains(response, 'Spin Bike')
+
+
+class ProductFacetTests(TestCase):
+    def setUp(self):
+        self.running = Category.objects.create(name='Running')
+        self.strength = Category.objects.create(name='Strength')
+        for name, category, price, rating in [
+            ('Trail Shoes', self.running, 80, 4.5),
+            ('Road Shoes', self.running, 120, 3.5),
+            ('Shoe Bag', self.strength, 20, 2.0),
+            ('Barbell', self.strength, 250, 4.8),
+        ]:
+            Product.objects.create(
+                category=category,
+                name=name,
+                description=f'{name} description',
+                price=price,
+                rating=rating,
+                stock=5
+            )
+
+    def test_facets_computed_in_one_query(self):
+        """Test that all facet counts come from a single query"""
+        categories = list(Category.objects.all())
+        with self.assertNumQueries(1):
+            facets = compute_facets(
+                Product.objects.filter(is_available=True), categories
+            )
+        counts = {
+            facet['category'].name: facet['count']
+            for facet in facets['categories']
+        }
+        self.assertEqual(counts, {'Running': 2, 'Strength': 2})
+        ratings = {f['rating']: f['count'] for f in facets['ratings']}
+        self.assertEqual(ratings, {4: 2, 3: 3, 2: 4, 1: 4})
+        prices = [facet['count'] for facet in facets['prices']]
+        self.assertEqual(prices, [1, 0, 1, 1, 1])
+
+    def test_facets_follow_search_not_filters(self):
+        """Test that facets count the search, ignoring other filters"""
+        response = self.client.get(
+            reverse('products:products'),
+            {'q': 'shoes', 'category': 'strength'}
+        )
+        counts = {
+            facet['category'].name: facet['count']
+            for facet in response.context['facets']['categories']
+        }
+        self.assertEqual(counts, {'Running': 2, 'Strength': 0})
+        self.assertContains(response, 'Running (2)')
+
+    def test_price_facet_links_match_their_counts(self):
+        """Test that a price facet link lists exactly what it counted"""
+        Product.objects.create(
+            category=self.running,
+            name='Race Shoes',
+            description='Race Shoes description',
+            price=100,
+            stock=5
+        )
+        params = {'q': 'shoes', 'category': 'running', 'sort': 'price'}
+        response = self.client.get(reverse('products:products'), params)
+        for facet in response.context['facets']['prices']:
+            query = QueryDict(facet['query_string'])
+            for name, value in params.items():
+                self.assertEqual(query[name], value)
+
+            listed = self.client.get(
+                reverse('products:products'), query
+            ).context['products']
+            self.assertEqual(len(listed), facet['count'])
+        self.assertEqual(
+            [facet['count'] for facet in response.context['facets']['prices']],
+            [0, 0, 1, 2, 0]
+        )
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Equipment')
+        # Duplicate prices force the id tiebreaker to do its job
+        for index in range(30):
+            Product.objects.create(
+                category=self.category,
+                name=f'Kettlebell {index:02d}',
+                description='Cast iron kettlebell',
+                price=10 + index % 5,
+                stock=5
+            )
+
+    def _walk(self, params, direction='next_cursor'):
+        seen = []
+        cursor = None
+        while True:
+            query = dict(params, cursor=cursor) if cursor else params
+            response = self.client.get(reverse('products:products'), query)
+            page = response.context['page_obj']
+            seen.extend(product.id for product in page)
+            cursor = getattr(page, direction)
+            if cursor is None:
+                return seen, page
+
+    def test_pages_cover_every_product_once(self):
+        """Test that following next cursors visits each product once"""
+        seen, last_page = self._walk({'sort': 'price'})
+        expected = list(
+            Product.objects.order_by('price', 'id').values_list(
+                'id', flat=True
+            )
+        )
+        self.assertEqual(seen, expected)
+        self.assertFalse(last_page.has_next)
+        self.assertTrue(last_page.has_previous)
+
+    def test_previous_cursor_returns_earlier_page(self):
+        """Test that the previous cursor leads back to the same rows"""
+        first = self.client.get(reverse('products:products'))
+        first_ids = [product.id for product in first.context['products']]
+        second = self.client.get(
+            reverse('products:products'),
+            {'cursor': first.context['page_obj'].next_cursor}
+        )
+        back = self.client.get(
+            reverse('products:products'),
+            {'cursor': second.context['page_obj'].previous_cursor}
+        )
+        self.assertEqual(
+            [product.id for product in back.context['products']],
+            first_ids
+        )
+        self.assertFalse(back.context['page_obj'].has_previous)
+
+    def test_deep_page_is_single_query_without_count(self):
+        """Test that a page costs one query and never counts rows"""
+        products = Product.objects.filter(is_available=True)
+        page = paginate_by_cursor(products, ['-created_at', '-id'])
+        with self.assertNumQueries(1) as captured:
+            page = paginate_by_cursor(
+                products, ['-created_at', '-id'], page.next_cursor
+            )
+        self.assertEqual(len(page), 10)
+        self.assertNotIn('COUNT', captured.captured_queries[0]['sql'])
+        self.assertNotIn('OFFSET', captured.captured_queries[0]['sql'])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        """Test that a tampered cursor shows the first page"""
+        response = self.client.get(
+            reverse('products:products'),
+            {'cursor': 'not-a-cursor', 'sort': 'name'}
+        )
+        self.assertEqual(response.status_code, 200)
+        products = list(response.context['products'])
+        self.assertEqual(products[0].name, 'Kettlebell 00')
+
+
+class ProductRatingTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            category=Category.objects.create(name='Recovery'),
+            name='Foam Roller',
+            description='High density foam roller',
+            price=25,
+            stock=5
+        )
+        self.users = [
+            User.objects.create_user(username=f'reviewer{number}')
+            for number in range(4)
+        ]
+
+    def _review(self, user, rating, **kwargs):
+        return Review.objects.create(
+            product=self.product,
+            user=user,
+            rating=rating,
+            comment='Review',
+            **kwargs
+        )
+
+    def _histogram(self):
+        self.product.refresh_from_db()
+        return {
+            bar['stars']: bar['count']
+            for bar in self.product.rating_histogram()
+        }
+
+    def test_new_reviews_update_aggregates(self):
+        """Test that each review updates the product in one query"""
+        self._review(self.users[0], 5)
+        with self.assertNumQueries(2):
+            self._review(self.users[1], 4)
+        self._review(self.users[2], 2, active=False)
+
+        self.assertEqual(self._histogram(), {5: 1, 4: 1, 3: 0, 2: 0, 1: 0})
+        self.assertEqual(self.product.review_count, 2)
+        self.assertEqual(self.product.rating, Decimal('4.50'))
+
+    def test_edits_and_active_toggle_move_ratings(self):
+        """Test that edits and (de)activation adjust the histogram"""
+        review = self._review(self.users[0], 5)
+        self._review(self.users[1], 3)
+
+        review.rating = 1
+        review.save()
+        self.assertEqual(self._histogram()[1], 1)
+        self.assertEqual(self.product.rating, Decimal('2.00'))
+
+        review = Review.objects.get(pk=review.pk)
+        review.active = False
+        review.save()
+        self.assertEqual(self._histogram()[1], 0)
+        self.assertEqual(self.product.review_count, 1)
+        self.assertEqual(self.product.rating, Decimal('3.00'))
+
+        review.active = True
+        review.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.review_count, 2)
+
+    def test_product_edit_keeps_concurrent_rating(self):
+        """Test that saving a product loaded earlier keeps new reviews"""
+        product = Product.objects.get(pk=self.product.pk)
+        self._review(self.users[0], 4)
+
+        product.price = 30
+        product.save()
+        self.assertEqual(self._histogram()[4], 1)
+        self.assertEqual(self.product.review_count, 1)
+        self.assertEqual(self.product.rating, Decimal('4.00'))
+        self.assertEqual(self.product.price, 30)
+
+    def test_deleting_reviews_clears_rating(self):
+        """Test that deleting the last review leaves no average"""
+        review = self._review(self.users[0], 4)
+        review.delete()
+        self.assertEqual(self._histogram()[4], 0)
+        self.assertEqual(self.product.review_count, 0)
+        self.assertIsNone(self.product.rating)
+
+    def test_detail_page_shows_histogram(self):
+        """Test that the detail page renders the rating summary"""
+        self._review(self.users[0], 5)
+        self._review(self.users[1], 5)
+        self._review(self.users[2], 2)
+        response = self.client.get(
+            reverse('products:product_detail', args=[self.product.id])
+        )
+        self.assertContains(response, '4.00')
+        self.assertContains(response, 'width: 67%;')
+        self.assertContains(response, 'width: 33%;')
+
+
+class ProductReviewPageTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            category=Category.objects.create(name='Cardio'),
+            name='Jump Rope',
+            description='Speed jump rope',
+            price=15,
+            stock=5
+        )
+        self.url = reverse(
+            'products:product_detail', args=[self.product.id]
+        )
+
+    def _add_reviews(self, count):
+        start = Review.objects.count()
+        for number in range(start, start + count):
+            Review.objects.create(
+                product=self.product,
+                user=User.objects.create_user(username=f'jumper{number}'),
+                rating=4,
+                comment=f'Review number {number}'
+            )
+
+    def _detail_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(self.url)
+        return len(captured), response
+
+    def test_first_page_is_bounded(self):
+        """Test that the detail page costs the same for 3 or 30 reviews"""
+        self._add_reviews(3)
+        self._detail_queries()
+        few, _ = self._detail_queries()
+        self._add_reviews(27)
+        many, response = self._detail_queries()
+
+        self.assertEqual(few, many)
+        reviews = response.context['reviews']
+        self.assertEqual(len(reviews), 10)
+        self.assertTrue(reviews.has_next)
+
+    def test_endpoint_returns_following_pages(self):
+        """Test that the XHR endpoint walks through every review"""
+        self._add_reviews(25)
+        cursor = self.client.get(self.url).context['reviews'].next_cursor
+        seen = 10
+        while cursor:
+            data = self.client.get(
+                reverse('products:product_reviews', args=[self.product.id]),
+                {'cursor': cursor}
+            ).json()
+            seen += data['html'].count('class="review mb-4"')
+            cursor = data['next_cursor']
+        self.assertEqual(seen, 25)
+        self.assertIn('Review number 0', data['html'])
+
+    def test_second_review_is_refused(self):
+        """Test that a user cannot review the same product twice"""
+        user = User.objects.create_user(
+            username='reviewer',
+            password='testpass123'
+        )
+        Review.objects.create(
+            product=self.product, user=user, rating=5, comment='Great'
+        )
+        self.client.login(username='reviewer', password='testpass123')
+        response = self.client.get(self.url)
+        self.assertContains(response, 'You have already reviewed')
+
+        response = self.client.post(
+            self.url, {'rating': 1, 'comment': 'Changed my mind'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Review.objects.filter(user=user).count(), 1)
+
+
+class RelatedProductTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='shopper')
+        self.gym = Category.objects.create(name='Gym')
+        self.food = Category.objects.create(name='Food')
+        self.products = {
+            name: Product.objects.create(
+                category=category,
+                name=name,
+                description=name,
+                price=10,
+                stock=5
+            )
+            for name, category in [
+                ('Shaker', self.food),
+                ('Protein', self.food),
+                ('Creatine', self.food),
+                ('Gloves', self.gym),
+                ('Belt', self.gym),
+                ('Chalk', self.gym),
+            ]
+        }
+
+    def _order(self, *names, paid=True):
+        order = Order.objects.create(
+            user=self.user,
+            first_name='Test',
+            last_name='User',
+            email='test@example.com',
+            address='123 Test St',
+            postal_code='12345',
+            city='Test City',
+            country='Test Country',
+            paid=paid
+        )
+        for name in names:
+            OrderItem.objects.create(
+                order=order,
+                product=self.products[name],
+                price=10
+            )
+
+    def _related(self, name):
+        return [
+            recommendation.related.name
+            for recommendation in RelatedProduct.objects.filter(
+                product=self.products[name]
+            )
+        ]
+
+    def test_co_purchases_rank_first(self):
+        """Test that products bought together are recommended first"""
+        self._order('Protein', 'Shaker')
+        self._order('Protein', 'Shaker', 'Gloves')
+        self._order('Protein', 'Gloves')
+        self._order('Protein', 'Chalk')
+        self._order('Protein', 'Belt', paid=False)
+
+        build_related_products(limit=3)
+        self.assertEqual(
+            self._related('Protein'), ['Shaker', 'Gloves', 'Chalk']
+        )
+        # Creatine has no orders and falls back to its category
+        self.assertEqual(
+            self._related('Creatine'), ['Protein', 'Shaker']
+        )
+
+    def test_co_purchases_join_order_items_once(self):
+        """Test that pairs come from a single self-join of order items"""
+        self._order('Protein', 'Shaker', 'Gloves')
+        with CaptureQueriesContext(connection) as captured:
+            pairs = list(_co_purchases())
+        sql = captured.captured_queries[0]['sql']
+        self.assertEqual(sql.count('JOIN "checkout_orderitem"'), 1)
+        self.assertEqual(len(pairs), 6)
+        self.assertTrue(all(orders == 1 for _, _, orders in pairs))
+
+    def test_detail_page_reads_precomputed_products(self):
+        """Test that the detail page shows the stored recommendations"""
+        self._order('Belt', 'Shaker')
+        call_command('build_related_products', stdout=StringIO())
+
+        product = self.products['Belt']
+        response = self.client.get(
+            reverse('products:product_detail', args=[product.id])
+        )
+        related = [item.name for item in response.context['related_products']]
+        self.assertEqual(related[0], 'Shaker')
+        self.assertEqual(len(related), 3)
+
+
+@modify_settings(MIDDLEWARE={
+    'append': 'products.middleware.SubscriptionMiddleware'
+})
+class SubscriptionEntitlementTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='member',
+            password='testpass123'
+        )
+        self.plan = SubscriptionPlan.objects.create(
+            name='Premium',
+            description='Premium plan',
+            price=10,
+            plan_type='monthly',
+            features='Everything'
+        )
+        self.premium_url = '/workouts/premium/strength/'
+
+    def _subscribe(self, days=30):
+        return UserSubscription.objects.create(
+            user=self.user,
+            plan=self.plan,
+            end_date=timezone.now() + timedelta(days=days)
+        )
+
+    def _subscription_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(self.premium_url)
+        queries = [
+            query for query in captured.captured_queries
+            if 'products_usersubscription' in query['sql']
+        ]
+        return response, len(queries)
+
+    def test_path_matcher(self):
+        """Test that only protected prefixes are matched"""
+        matcher = PathPrefixMatcher(['/workouts/premium/', '/nutrition/'])
+        self.assertTrue(matcher.matches('/workouts/premium/legs/'))
+        self.assertTrue(matcher.matches('/nutrition/'))
+        self.assertFalse(matcher.matches('/workouts/'))
+        self.assertFalse(PathPrefixMatcher([]).matches('/nutrition/'))
+
+    def test_anonymous_user_is_sent_to_login(self):
+        """Test that logged out users must log in first"""
+        response = self.client.get(self.premium_url)
+        self.assertRedirects(
+            response, reverse('accounts:login'), fetch_redirect_response=False
+        )
+
+    def test_entitlement_is_cached(self):
+        """Test that gated pages skip the database once cached"""
+        self._subscribe()
+        self.client.login(username='member', password='testpass123')
+
+        response, queries = self._subscription_queries()
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(queries, 1)
+        response, queries = self._subscription_queries()
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(queries, 0)
+
+    def test_missing_or_expired_subscription_is_refused(self):
+        """Test that users without a current plan are redirected"""
+        self.client.login(username='member', password='testpass123')
+        response, _ = self._subscription_queries()
+        self.assertRedirects(
+            response,
+            reverse('products:subscription_plans'),
+            fetch_redirect_response=False
+        )
+
+        self._subscribe(days=-1)
+        response, _ = self._subscription_queries()
+        self.assertRedirects(
+            response,
+            reverse('products:subscription_plans'),
+            fetch_redirect_response=False
+        )
+
+    def test_refusal_is_not_cached(self):
+        """Test that a subscription saved elsewhere applies at once"""
+        self.client.login(username='member', password='testpass123')
+        response, queries = self._subscription_queries()
+        self.assertEqual((response.status_code, queries), (302, 1))
+
+        # bulk_create skips the signal, like a save in another process
+        # whose cache invalidation never reaches this one
+        UserSubscription.objects.bulk_create([UserSubscription(
+            user=self.user,
+            plan=self.plan,
+            end_date=timezone.now() + timedelta(days=30)
+        )])
+        response, queries = self._subscription_queries()
+        self.assertEqual((response.status_code, queries), (404, 1))
+
+    def test_cancellation_invalidates_entitlement(self):
+        """Test that cancelling takes effect on the next request"""
+        subscription = self._subscribe()
+        self.client.login(username='member', password='testpass123')
+        self.assertEqual(self._subscription_queries()[0].status_code, 404)
+
+        subscription.is_active = False
+        subscription.save()
+        response, _ = self._subscription_queries()
+        self.assertEqual(response.status_code, 302)
+
+
+class ProductImageTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.category = Category.objects.create(
+            name='images',
+            friendly_name='Images'
+        )
+        self.product = Product.objects.create(
+            category=self.category,
+            name='Pictured Product',
+            description='Has an image',
+            price=Decimal('10.00')
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def _upload(self, color='red', size=(1000, 500)):
+        output = BytesIO()
+        Image.new('RGB', size, color=color).save(output, format='PNG')
+        self.product.image = SimpleUploadedFile(
+            'product.png', output.getvalue()
+        )
+        self.product.save()
+
+    def _render(self, *args):
+        return Template(
+            '{% load product_images %}{% product_image product ' +
+            ' '.join(f"'{arg}'" for arg in args) + ' %}'
+        ).render(Context({'product': self.product}))
+
+    def test_renditions_are_generated_in_background(self):
+        """Test that uploads queue WebP and JPEG renditions per width"""
+        self._upload()
+        self.assertEqual(self.product.image_renditions, {})
+        self.assertEqual(run_pending_jobs(), 1)
+
+        self.product.refresh_from_db()
+        for webp, image_format in [(True, 'WEBP'), (False, 'JPEG')]:
+            renditions = self.product.image_rendition_widths(webp)
+            self.assertEqual(
+                [width for width, _ in renditions], [150, 400, 800]
+            )
+            path = os.path.join(self.media_root, renditions[0][1])
+            with Image.open(path) as img:
+                self.assertEqual(
+                    (img.format, img.size), (image_format, (150, 75))
+                )
+
+    def test_small_images_are_not_enlarged(self):
+        """Test that renditions never exceed the original width"""
+        self._upload(size=(300, 300))
+        run_pending_jobs()
+        self.product.refresh_from_db()
+        self.assertEqual(
+            [width for width, _ in self.product.image_rendition_widths()],
+            [150, 300]
+        )
+
+    def test_unchanged_image_keeps_renditions(self):
+        """Test that saves and identical uploads reuse the renditions"""
+        self._upload()
+        run_pending_jobs()
+        self.product.refresh_from_db()
+        renditions = self.product.image_renditions
+
+        self.product.stock = 3
+        self.product.save()
+        self.assertFalse(Job.objects.filter(status='queued').exists())
+
+        self._upload()
+        run_pending_jobs()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image_renditions, renditions)
+
+        self._upload(color='blue')
+        run_pending_jobs()
+        self.product.refresh_from_db()
+        self.assertNotEqual(self.product.image_renditions, renditions)
+        self.assertFalse(os.path.exists(
+            os.path.join(self.media_root, renditions['150.jpg'])
+        ))
+
+    def test_products_sharing_an_image_keep_their_renditions(self):
+        """Test that one product's new image leaves the other's alone"""
+        self._upload()
+        other = Product.objects.create(
+            category=self.category,
+            name='Same Picture',
+            description='Uses the same image',
+            price=Decimal('12.00'),
+            image=self.product.image.name
+        )
+        run_pending_jobs()
+        other.refresh_from_db()
+        self.product.refresh_from_db()
+        for product in (self.product, other):
+            for name in product.image_renditions.values():
+                self.assertIn(f'/renditions/{product.id}/', name)
+
+        self._upload(color='blue')
+        run_pending_jobs()
+        for name in other.image_renditions.values():
+            self.assertTrue(
+                os.path.exists(os.path.join(self.media_root, name))
+            )
+
+    def test_image_url_download_is_size_capped(self):
+        """Test that oversized external images are refused"""
+        class Response:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                pass
+
+            def raise_for_status(self):
+                pass
+
+            def iter_content(self, chunk_size):
+                return iter([b'x' * 600, b'x' * 600])
+
+        get = patch('products.jobs.requests.get', return_value=Response())
+        with override_settings(PRODUCT_IMAGE_MAX_DOWNLOAD_BYTES=1000), get:
+            with self.assertRaises(ValueError):
+                _download('https://example.com/large.png')
+
+    def test_image_url_is_only_downloaded_when_enabled(self):
+        """Test that external images are left alone by default"""
+        self.product.image_url = 'https://example.com/product.png'
+        self.product.save()
+        run_pending_jobs()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image_renditions, {})
+
+    def test_template_tag_uses_renditions(self):
+        """Test that the tag offers every width with layout sizes"""
+        self._upload()
+        run_pending_jobs()
+        self.product.refresh_from_db()
+        html = self._render('card')
+        self.assertIn('type="image/webp"', html)
+        self.assertIn(self.product.image_srcset(webp=True), html)
+        self.assertIn(self.product.image_srcset(), html)
+        self.assertIn('sizes="(max-width: 767px) 100vw, 400px"', html)
+        self.assertIn(
+            'src="/media/' + self.product.image_renditions['400.jpg'],
+            html
+        )
+
+    def test_template_tag_fallbacks(self):
+        """Test that products without renditions keep a usable image"""
+        self.assertEqual(self._render('card').strip(), '')
+        self.assertIn(
+            '/static/images/no-image.png',
+            self._render('card', 'card-img-top', 'images/no-image.png')
+        )
+
+        self.product.image_url = 'https://example.com/product.png'
+        self.product.save()
+        self.assertIn(
+            'src="https://example.com/product.png"', self._render('card')
+        )
+
+        self._upload()
+        self.assertIn(
+            f'src="{self.product.image.url}"', self._render('detail')
+        )
@@ -58,12 +58,32 @@ urlpatterns = [
         views.subscription_success,
         name='subscription_success'
     ),
+    path(
+        'subscription-management/',
+        views.subscription_management,
+        name='subscription_management'
+    ),
+    path(
+        'subscription-management/payment-method/',
+        views.update_payment_method,
+        name='update_payment_method'
+    ),
+    path(
+        'subscription-management/cancel/',
+        views.cancel_subscription,
+        name='cancel_subscription'
+    ),
     path(
         'debug/stripe-config/',
         views.debug_stripe_config,
         name='debug_stripe_config'
     ),
     # Reviews
+    path(
+        '<int:product_id>/reviews/',
+        views.product_reviews,
+        name='product_reviews'
+    ),
     path(
         'reviews/<int:review_id>/delete/',
         views.delete_review,
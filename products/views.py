@@ -4,36 +4,37 @@ from django.shortcuts import (
 )
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
-from django.core.paginator import (
-    Paginator, EmptyPage, PageNotAnInteger
-)
 from django.conf import settings
 from django.urls import reverse
+from django.utils import timezone
 from django.http import JsonResponse
+from django.db.models import Exists, OuterRef
+from django.template.loader import render_to_string
 
 # Standard library imports
-from datetime import datetime, timedelta
-import re
+from datetime import timedelta
 
 # Third-party imports
 import stripe
 from cart.forms import CartAddProductForm
+from checkout.models import (
+    StripeInvoice, StripePaymentMethod, StripeSubscription
+)
+from checkout.stripe_sync import mirror_subscription
+from fitness_ecommerce.pagination import paginate_by_cursor
 
 # Local imports
 from .models import (
-    Product, Category, Review, SubscriptionPlan, UserSubscription
+    Product, Category, RelatedProduct, Review, SubscriptionPlan,
+    UserSubscription
 )
 from .forms import ReviewForm, ProductForm
+from .search import search_products
+from .facets import compute_facets, price_filter
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
-
-def clean_search_query(query):
-    """Clean the search query by removing special characters
-    and extra spaces."""
-    cleaned = re.sub(r'[^\w\s]', '', query.lower())
-    return re.sub(r'\s+', ' ', cleaned).strip()
+REVIEWS_PAGE_SIZE = 10
 
 
 def products(request):
@@ -42,19 +43,12 @@ def products(request):
     categories = Category.objects.all()
     search_query = request.GET.get('q', '')
 
+    ranked = False
     if search_query:
-        cleaned_query = clean_search_query(search_query)
-        search_terms = cleaned_query.split()
-        search_filter = Q()
-
-        for term in search_terms:
-            name_match = Q(name__iregex=r'\b' + term + r'\b')
-            desc_match = Q(description__iregex=r'\b' + term + r'\b')
-            search_filter &= (
-                name_match | desc_match
-            )
+        products, ranked = search_products(products, search_query)
 
-        products = products.filter(search_filter)
+    # Facet counts cover the whole search, before the filters below
+    facets = compute_facets(products, categories)
 
     category_param = request.GET.get('category', '')
     if category_param:
@@ -77,60 +71,103 @@ def products(request):
     # Price range filtering
     min_price = request.GET.get('min_price', '')
     max_price = request.GET.get('max_price', '')
-    if min_price:
+    price_range = []
+    for price in (min_price, max_price):
         try:
-            products = products.filter(price__gte=float(min_price))
-        except (TypeError, ValueError):
-            pass
-    if max_price:
-        try:
-            products = products.filter(price__lte=float(max_price))
-        except (TypeError, ValueError):
-            pass
+            price_range.append(float(price) if price else None)
+        except ValueError:
+            price_range.append(None)
+    products = products.filter(price_filter(*price_range))
 
     sort = request.GET.get('sort', '')
+    # Every ordering ends on a unique key so cursors are unambiguous
     sort_options = {
-        'price': 'price',
-        '-price': '-price',
-        'name': 'name',
-        '-name': '-name',
+        'price': ['price', 'id'],
+        '-price': ['-price', '-id'],
+        'name': ['name', 'id'],
+        '-name': ['-name', '-id'],
     }
-    products = products.order_by(sort_options.get(sort, '-created_at'))
-
-    paginator = Paginator(products, 12)
-    page = request.GET.get('page')
-
-    try:
-        page_obj = paginator.page(page)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
+    if sort in sort_options:
+        ordering = sort_options[sort]
+    elif ranked:
+        # Best search matches first
+        ordering = ['-search_rank', '-created_at', '-id']
+    else:
+        ordering = ['-created_at', '-id']
+
+    page_obj = paginate_by_cursor(
+        products, ordering, request.GET.get('cursor'), page_size=12
+    )
+    query_params = request.GET.copy()
+    query_params.pop('cursor', None)
+    query_params.pop('page', None)
+
+    # Price facet links keep every other filter and the sort order
+    for facet in facets['prices']:
+        facet_params = query_params.copy()
+        facet_params['min_price'] = facet['min']
+        if facet['max'] is None:
+            facet_params.pop('max_price', None)
+        else:
+            facet_params['max_price'] = facet['max']
+        facet['query_string'] = facet_params.urlencode()
 
     context = {
         'products': page_obj,
         'page_obj': page_obj,
         'categories': categories,
+        'facets': facets,
         'search_query': search_query,
         'selected_category': category_param,
+        'selected_rating': rating,
         'min_price': min_price,
         'max_price': max_price,
         'sort': sort,
-        'is_paginated': paginator.num_pages > 1
+        'query_string': query_params.urlencode(),
+        'is_paginated': page_obj.has_other_pages
     }
     return render(request, 'product/products.html', context)
 
 
-def product_detail(request, product_id):
-    """Display individual product details with reviews and related products."""
-    product = get_object_or_404(Product, id=product_id, is_available=True)
+def _review_page(request, product):
+    """One page of a product's active reviews, newest first."""
+    reviews = Review.objects.filter(
+        product=product, active=True
+    ).select_related('user')
+    return paginate_by_cursor(
+        reviews,
+        ['-created_at', '-id'],
+        request.GET.get('cursor'),
+        page_size=REVIEWS_PAGE_SIZE
+    )
 
-    related_products = Product.objects.filter(
-        category=product.category,
-        is_available=True
-    ).exclude(id=product.id)[:4]
 
-    reviews = Review.objects.filter(product=product, active=True)
+def product_detail(request, product_id):
+    """Display individual product details with reviews and related products."""
+    products = Product.objects.filter(is_available=True)
+    if request.user.is_authenticated:
+        products = products.annotate(
+            user_has_reviewed=Exists(
+                Review.objects.filter(
+                    product=OuterRef('pk'), user=request.user
+                )
+            )
+        )
+    product = get_object_or_404(products, id=product_id)
+
+    # Precomputed by the build_related_products command
+    related_products = [
+        recommendation.related
+        for recommendation in RelatedProduct.objects.filter(
+            product=product,
+            related__is_available=True
+        ).select_related('related')
+    ]
+    if not related_products:
+        related_products = Product.objects.filter(
+            category=product.category,
+            is_available=True
+        ).exclude(id=product.id)[:4]
 
     if request.method == 'POST':
         if not request.user.is_authenticated:
@@ -138,10 +175,7 @@ def product_detail(request, product_id):
             return redirect('account_login')
 
         # Prevent multiple reviews per user per product
-        existing = Review.objects.filter(
-            product=product, user=request.user
-        ).exists()
-        if existing:
+        if product.user_has_reviewed:
             messages.info(request, 'You have already reviewed this product.')
             return redirect('products:product_detail', product_id=product.id)
 
@@ -159,13 +193,25 @@ def product_detail(request, product_id):
     context = {
         'product': product,
         'related_products': related_products,
-        'reviews': reviews,
+        'reviews': _review_page(request, product),
         'review_form': review_form,
         'cart_product_form': CartAddProductForm(),
     }
     return render(request, 'product/product_detail.html', context)
 
 
+def product_reviews(request, product_id):
+    """Return the next page of a product's reviews as an HTML fragment."""
+    product = get_object_or_404(Product, id=product_id, is_available=True)
+    reviews = _review_page(request, product)
+    html = render_to_string(
+        'product/includes/review_list.html',
+        {'reviews': reviews},
+        request=request
+    )
+    return JsonResponse({'html': html, 'next_cursor': reviews.next_cursor})
+
+
 def category_list(request):
     """Display all categories."""
     categories = Category.objects.all()
@@ -414,10 +460,14 @@ def subscription_success(request):
             messages.error(request, 'Invalid subscription data')
             return redirect('products:subscription_plans')
 
+        # The webhook has usually mirrored the subscription by now
+        period_end = StripeSubscription.objects.filter(
+            stripe_id=session.subscription
+        ).values_list('current_period_end', flat=True).first()
         defaults = {
             'stripe_subscription_id': session.subscription,
             'stripe_customer_id': session.customer,
-            'end_date': datetime.now() + timedelta(days=30),
+            'end_date': period_end or timezone.now() + timedelta(days=30),
         }
 
         subscription, created = UserSubscription.objects.update_or_create(
@@ -470,27 +520,19 @@ def subscription_management(request):
             user=request.user,
             is_active=True
         )
-        stripe_sub = stripe.Subscription.retrieve(
-            subscription.stripe_subscription_id
-        )
-        customer = stripe.Customer.retrieve(
-            subscription.stripe_customer_id
-        )
-        payment_methods = stripe.PaymentMethod.list(
-            customer=customer.id,
-            type="card"
-        )
-        invoices = stripe.Invoice.list(
-            customer=customer.id,
-            limit=5
-        )
+        customer_id = subscription.stripe_customer_id
         context = {
             'subscription': subscription,
-            'stripe_subscription': stripe_sub,
-            'payment_methods': payment_methods.data,
-            'invoices': invoices.data,
+            'stripe_subscription': mirror_subscription(subscription),
+            'payment_methods': StripePaymentMethod.objects.filter(
+                customer_id=customer_id,
+                type='card'
+            ),
+            'invoices': StripeInvoice.objects.filter(
+                customer_id=customer_id
+            )[:5],
         }
-        return render(request, 'product/subscription_management.html', context)
+        return render(request, 'product/subscription_managment.html', context)
     except UserSubscription.DoesNotExist:
         messages.info(request, "No active subscription found.")
     except stripe.error.StripeError as e:
@@ -595,7 +637,7 @@ def cancel_subscription(request):
         except UserSubscription.DoesNotExist:
             messages.error(request, "No active subscription found.")
 
-    return render(request, 'product/cancel_subscription.html')
+    return render(request, 'product/subscription_cancel.html')
 
 
 @login_required
@@ -0,0 +1,61 @@
+import posixpath
+from io import BytesIO
+from django.db.models import Q
+from PIL import Image, ImageOps
+from fitness_ecommerce.renditions import store_renditions
+from jobs.queue import job
+from .models import AVATAR_SIZES, UserProfile
+
+# Formats browsers without WebP support can show, with their extension
+FALLBACK_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif'}
+
+
+def render_avatars(content):
+    """
+    Make a square rendition of an image for every avatar size, in WebP
+    and in the image's own format (PNG or JPEG for other formats).
+    Returns {'<size>.<extension>': bytes}.
+    """
+    with Image.open(BytesIO(content)) as img:
+        image_format = img.format
+        img = ImageOps.exif_transpose(img)
+        has_alpha = img.mode in ('RGBA', 'LA', 'P')
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+
+    if image_format not in FALLBACK_FORMATS:
+        image_format = 'PNG' if has_alpha else 'JPEG'
+    if image_format == 'JPEG':
+        img = img.convert('RGB')
+
+    renditions = {}
+    for size in AVATAR_SIZES:
+        square = ImageOps.fit(img, (size, size), Image.LANCZOS)
+        for output_format, extension in [
+            ('WEBP', 'webp'),
+            (image_format, FALLBACK_FORMATS[image_format]),
+        ]:
+            output = BytesIO()
+            square.save(output, format=output_format, quality=85)
+            renditions[f'{size}.{extension}'] = output.getvalue()
+    return renditions
+
+
+@job(max_attempts=3)
+def generate_avatar_renditions(profile_id):
+    """Store the avatar renditions of a newly uploaded profile picture"""
+    profile = UserProfile.objects.get(id=profile_id)
+    if not profile.profile_picture:
+        return
+    picture_name = profile.profile_picture.name
+    with profile.profile_picture.open('rb') as picture:
+        content = picture.read()
+    store_renditions(
+        profile,
+        content,
+        render_avatars,
+        profile.profile_picture.storage,
+        posixpath.join(posixpath.dirname(picture_name), 'renditions'),
+        Q(profile_picture=picture_name),
+        'picture_hash',
+        'picture_renditions'
+    )
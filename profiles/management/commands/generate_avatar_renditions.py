@@ -0,0 +1,17 @@
+from fitness_ecommerce.renditions import RenditionsCommand
+from profiles.jobs import generate_avatar_renditions
+from profiles.models import UserProfile
+
+
+class Command(RenditionsCommand):
+    help = (
+        'Queues avatar renditions for profile pictures uploaded before '
+        'renditions existed'
+    )
+    job = generate_avatar_renditions
+    hash_field = 'picture_hash'
+
+    def get_queryset(self):
+        return UserProfile.objects.exclude(
+            profile_picture=''
+        ).exclude(profile_picture__isnull=True)
@@ -2,9 +2,11 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.core.files.base import ContentFile
-from PIL import Image
-import os
+from fitness_ecommerce.renditions import covering_rendition, rendition_widths
+
+
+# Square avatar renditions made from each profile picture, in pixels
+AVATAR_SIZES = (48, 96, 300)
 
 
 def user_profile_picture_path(instance, filename):
@@ -27,40 +29,70 @@ class UserProfile(models.Model):
         blank=True,
         null=True
     )
+    # SHA-256 of the picture the renditions were made from
+    picture_hash = models.CharField(max_length=64, blank=True, editable=False)
+    # Rendition storage names keyed by '<size>.<extension>'
+    picture_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.user.username
 
-    def save(self, *args, **kwargs):
-        # If profile picture is being updated
-        if self.profile_picture:
-            try:
-                # Open the image
-                img = Image.open(self.profile_picture)
-
-                # Resize the image to 300x300
-                if img.height > 300 or img.width > 300:
-                    output_size = (300, 300)
-                    img.thumbnail(output_size)
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored picture to spot new uploads on save
+        instance._saved_picture = (
+            instance.__dict__.get('profile_picture') or None
+        )
+        return instance
 
-                    # Save the resized image
-                    temp_file = ContentFile(b'')
-                    img.save(temp_file, format=img.format)
-                    temp_file.seek(0)
+    def avatar_url(self, size, webp=False):
+        """
+        URL of the smallest rendition at least `size` pixels wide, as WebP
+        or in the picture's own format. Until the renditions exist the
+        original picture is used, or None is returned for WebP.
+        """
+        if not self.profile_picture:
+            return None
+        widths = self.picture_rendition_widths(webp)
+        if not widths:
+            return None if webp else self.profile_picture.url
+        return self.profile_picture.storage.url(
+            covering_rendition(widths, size)
+        )
 
-                    # Save the resized image to the profile_picture field
-                    self.profile_picture.save(
-                        os.path.basename(self.profile_picture.name),
-                        temp_file,
-                        save=False
-                    )
-            except Exception:
-
-                pass
+    def picture_rendition_widths(self, webp=False):
+        """[(size, name), ...] of the WebP or own-format renditions"""
+        # Renditions not in WebP share the picture's own format
+        extension = 'webp' if webp else next(
+            (
+                key.split('.')[1] for key in self.picture_renditions
+                if not key.endswith('.webp')
+            ),
+            None
+        )
+        if extension is None:
+            return []
+        return rendition_widths(self.picture_renditions, extension)
 
+    def save(self, *args, **kwargs):
+        if not self.profile_picture:
+            self.picture_hash = ''
+            self.picture_renditions = {}
         super().save(*args, **kwargs)
+        picture = self.profile_picture.name or None
+        if picture and picture != getattr(self, '_saved_picture', None):
+            # Decoding and resizing happen in the background; saves that
+            # don't upload a new picture never touch the image
+            from .jobs import generate_avatar_renditions
+            generate_avatar_renditions.delay(self.pk)
+        self._saved_picture = picture
 
 
 @receiver(post_save, sender=User)
@@ -0,0 +1,30 @@
+from django import template
+
+register = template.Library()
+
+
+@register.inclusion_tag('profiles/includes/avatar.html')
+def avatar(user, size, css_class='rounded-circle mr-2',
+           default='images/favicon/favicon-32x32.png'):
+    """
+    Render a user's avatar `size` pixels wide, picking renditions for
+    standard and high density screens and offering WebP where it exists.
+    """
+    context = {
+        'user': user,
+        'size': size,
+        'css_class': css_class,
+        'default': default,
+    }
+    profile = getattr(user, 'userprofile', None)
+    if profile is not None and profile.profile_picture:
+        context['src'] = profile.avatar_url(size)
+        context['srcset'] = (
+            f'{context["src"]} 1x, {profile.avatar_url(size * 2)} 2x'
+        )
+        webp = profile.avatar_url(size, webp=True)
+        if webp:
+            context['webp_srcset'] = (
+                f'{webp} 1x, {profile.avatar_url(size * 2, webp=True)} 2x'
+            )
+    return context
@@ -1,3 +1,4 @@
+from django.db import IntegrityError, transaction
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth.models import User
@@ -70,7 +71,8 @@ class DataManagementTests(TestCase):
                 'state': 'Test State',
                 'country': 'Test Country',
                 'postal_code': '12345',
-                'newsletter_subscription': True
+                'newsletter_subscription': True,
+                'update_shipping': 'Save'
             }
         )
         self.assertEqual(response.status_code, 200)
@@ -98,21 +100,24 @@ class DataManagementTests(TestCase):
         """Test data validation in profile updates"""
         self.client.login(username='testuser', password='testpass123')
 
-        # Test invalid phone number
+        # Test phone number longer than the field allows
         response = self.client.post(
             reverse('profiles:profile'),
             {
-                'phone_number': 'invalid',
+                'phone_number': '1' * 16,
                 'address_line_1': '123 Test St',
                 'city': 'Test City',
                 'country': 'Test Country',
-                'postal_code': '12345'
+                'postal_code': '12345',
+                'update_shipping': 'Save'
             }
         )
         self.assertEqual(response.status_code, 200)
-        self.assertContains(response, 'Enter a valid phone number')
+        self.assertContains(response, 'Failed to update shipping information')
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.phone_number, '')
 
-        # Test invalid postal code
+        # Test postal code longer than the field allows
         response = self.client.post(
             reverse('profiles:profile'),
             {
@@ -120,11 +125,14 @@ class DataManagementTests(TestCase):
                 'address_line_1': '123 Test St',
                 'city': 'Test City',
                 'country': 'Test Country',
-                'postal_code': 'invalid'
+                'postal_code': 'invalid-postal',
+                'update_shipping': 'Save'
             }
         )
         self.assertEqual(response.status_code, 200)
-        self.assertContains(response, 'Enter a valid postal code')
+        self.assertContains(response, 'Failed to update shipping information')
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.postal_code, '')
 
     def test_data_deletion(self):
         """Test that related data is handled properly on deletion"""
@@ -149,17 +157,16 @@ class DataManagementTests(TestCase):
 
     def test_data_integrity(self):
         """Test data integrity constraints"""
-        # Test unique email constraint
-        with self.assertRaises(Exception):
-            User.objects.create_user(
-                username='anotheruser',
-                email='test@example.com',  # Same email as existing user
-                password='anotherpass123'
-            )
-
-        # Test required fields
-        with self.assertRaises(Exception):
-            Order.objects.create(
-                user=self.user,
-                # Missing required fields
-            )
+        # Test one profile per user
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                UserProfile.objects.create(user=self.user)
+
+        # Test required relations
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                OrderItem.objects.create(
+                    product=self.product,
+                    price=self.product.price,
+                    quantity=1
+                )